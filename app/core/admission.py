@@ -0,0 +1,229 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError, jwt
+from decouple import config
+from app.core.auth import ALGORITHM, SECRET_KEY
+from app.core.metrics import admission_rejections_total
+from app.core.shared_cache import SHARED_CACHE_BACKEND, InMemoryBroker, get_shared_cache
+from app.core.token_cache import token_cache
+
+
+RATE_LIMIT_BACKEND = config("RATE_LIMIT_BACKEND", default=SHARED_CACHE_BACKEND)
+AUTH_RATE_LIMIT = config("AUTH_RATE_LIMIT", default="20/60")
+AUTH_MAX_CONCURRENCY = config("AUTH_MAX_CONCURRENCY", default=8, cast=int)
+UPLOAD_RATE_LIMIT = config("UPLOAD_RATE_LIMIT", default="60/60")
+UPLOAD_USER_RATE_LIMIT = config("UPLOAD_USER_RATE_LIMIT", default="30/60")
+UPLOAD_MAX_CONCURRENCY = config("UPLOAD_MAX_CONCURRENCY", default=4, cast=int)
+ADMISSION_RETRY_AFTER = config("ADMISSION_RETRY_AFTER", default=1, cast=int)
+
+
+def parse_rate(value: str) -> Optional[tuple[float, float]]:
+    """
+    Interpreta un limite con el formato "peticiones/segundos", por ejemplo "20/60": se admiten rafagas de hasta
+    20 peticiones y se recupera una cada 3 segundos.
+
+    Args:
+        value: el limite configurado, vacio o "0" lo desactiva.
+
+    Returns:
+        una tupla con la capacidad del bucket y las fichas recuperadas por segundo, None si esta desactivado.
+    """
+    if not value or value.strip() == "0":
+        return None
+    requests, _, seconds = value.partition("/")
+    capacity = float(requests)
+    return capacity, capacity / float(seconds or 1)
+
+
+@dataclass(frozen=True)
+class EndpointClass:
+    """
+    Grupo de rutas costosas que comparten los limites de frecuencia por cliente y por usuario y el limite de
+    peticiones simultaneas en cada worker.
+    """
+
+    name: str
+    routes: tuple[tuple[str, re.Pattern], ...]
+    client_rate: Optional[tuple[float, float]]
+    user_rate: Optional[tuple[float, float]]
+    max_concurrency: int
+
+    def matches(self, method: str, path: str) -> bool:
+        return any(method == route_method and pattern.match(path) for route_method, pattern in self.routes)
+
+
+ENDPOINT_CLASSES = (
+    EndpointClass(
+        "auth",
+        (("POST", re.compile(r"^/auth/(login|register)/?$")),),
+        parse_rate(AUTH_RATE_LIMIT),
+        None,
+        AUTH_MAX_CONCURRENCY,
+    ),
+    EndpointClass(
+        "upload",
+        (("POST", re.compile(r"^/legends(/bulk)?/?$")), ("PATCH", re.compile(r"^/legends/\d+/?$"))),
+        parse_rate(UPLOAD_RATE_LIMIT),
+        parse_rate(UPLOAD_USER_RATE_LIMIT),
+        UPLOAD_MAX_CONCURRENCY,
+    ),
+)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_key(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def user_key(scope) -> Optional[str]:
+    """
+    Identifica al usuario del token Bearer de la peticion sin consultar la base de datos: los tokens ya
+    verificados se resuelven desde el cache y los demas solo se decodifican.
+
+    Args:
+        scope: el scope ASGI de la peticion.
+
+    Returns:
+        el id o el email del usuario, None si la peticion no trae un token valido.
+    """
+    authorization = _header(scope, b"authorization") or ""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    principal = token_cache.get(token)
+    if principal is not None:
+        return str(principal.id)
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    user_id = payload.get("uid") or payload.get("sub")
+    return str(user_id) if user_id is not None else None
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware ASGI que protege las rutas costosas (bcrypt en /auth, cargas de imagenes en /legends) antes de leer
+    el cuerpo de la peticion: limita la frecuencia con token buckets por cliente y por usuario, guardados en el
+    backend RATE_LIMIT_BACKEND, y la cantidad de peticiones simultaneas de cada grupo en el worker. Las peticiones
+    que superan la frecuencia reciben 429 y las que superan la concurrencia 503, ambas con Retry-After, en lugar de
+    esperar en una cola sin limite mientras las rutas de lectura se vuelven lentas.
+    Las peticiones en curso se cuentan en la instancia, que al iniciar la aplicacion se registra en
+    app.state.admission_control para que admission_status las informe.
+    """
+
+    def __init__(self, app, endpoint_classes: tuple[EndpointClass, ...] = ENDPOINT_CLASSES, backend: Optional[str] = None):
+        self.app = app
+        self.endpoint_classes = endpoint_classes
+        self.backend = get_shared_cache(backend or RATE_LIMIT_BACKEND)
+        self.in_flight = {endpoint_class.name: 0 for endpoint_class in endpoint_classes}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan" and "app" in scope:
+            scope["app"].state.admission_control = self
+        endpoint_class = self._match(scope) if scope["type"] == "http" else None
+        if endpoint_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight[endpoint_class.name] >= endpoint_class.max_concurrency:
+            await self._reject(send, endpoint_class, "concurrency", ADMISSION_RETRY_AFTER)
+            return
+        self.in_flight[endpoint_class.name] += 1
+        try:
+            retry_after = await self._take(endpoint_class, scope)
+            if retry_after:
+                await self._reject(send, endpoint_class, "rate", retry_after)
+                return
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[endpoint_class.name] -= 1
+
+    def _match(self, scope) -> Optional[EndpointClass]:
+        for endpoint_class in self.endpoint_classes:
+            if endpoint_class.matches(scope["method"], scope["path"]):
+                return endpoint_class
+        return None
+
+    async def _take(self, endpoint_class: EndpointClass, scope) -> float:
+        """
+        Consume una ficha de cada bucket de la peticion, si el backend falla la peticion se admite.
+
+        Args:
+            endpoint_class: el grupo de la ruta.
+            scope: el scope ASGI de la peticion.
+
+        Returns:
+            0 si la peticion se admite, si no los segundos que el cliente debe esperar.
+        """
+        buckets = []
+        if endpoint_class.client_rate:
+            buckets.append((f"rate:{endpoint_class.name}:client:{client_key(scope)}", endpoint_class.client_rate))
+        if endpoint_class.user_rate:
+            user = user_key(scope)
+            if user is not None:
+                buckets.append((f"rate:{endpoint_class.name}:user:{user}", endpoint_class.user_rate))
+
+        retry_after = 0.0
+        for key, (capacity, refill_per_second) in buckets:
+            try:
+                if isinstance(self.backend, InMemoryBroker):
+                    wait = self.backend.take(key, capacity, refill_per_second)
+                else:
+                    wait = await run_in_threadpool(self.backend.take, key, capacity, refill_per_second)
+            except Exception as e:
+                print(f"Error checking rate limit {key}: {e}")
+                continue
+            retry_after = max(retry_after, wait)
+        return retry_after
+
+    async def _reject(self, send, endpoint_class: EndpointClass, reason: str, retry_after: float):
+        admission_rejections_total.inc((endpoint_class.name, reason))
+        if reason == "rate":
+            status_code, body = 429, b'{"detail":"Too many requests"}'
+        else:
+            status_code, body = 503, b'{"detail":"Server busy, retry later"}'
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def admission_status(app) -> dict:
+    """
+    Obtiene el estado de los grupos de rutas protegidos en este worker.
+
+    Args:
+        app: la aplicacion, con el middleware registrado en app.state.admission_control.
+
+    Returns:
+        por grupo, las peticiones en curso, el limite de concurrencia y los limites de frecuencia configurados.
+    """
+    middleware = getattr(app.state, "admission_control", None)
+    endpoint_classes = middleware.endpoint_classes if middleware is not None else ENDPOINT_CLASSES
+    in_flight = middleware.in_flight if middleware is not None else {}
+    return {
+        endpoint_class.name: {
+            "in_flight": in_flight.get(endpoint_class.name, 0),
+            "max_concurrency": endpoint_class.max_concurrency,
+            "client_rate": endpoint_class.client_rate,
+            "user_rate": endpoint_class.user_rate,
+        }
+        for endpoint_class in endpoint_classes
+    }
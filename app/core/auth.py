@@ -1,19 +1,21 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from decouple import config 
+from decouple import config, Csv
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
-from app.core.db import get_session
+from sqlalchemy import event
+from sqlmodel import select
+from app.core.db import async_session_maker
+from app.core.password_hashing import pwd_context, password_hasher
+from app.core.token_cache import token_cache
+from app.core.shared_cache import on_invalidation, publish_invalidation
 from app.models.user_model import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 SECRET_KEY = config("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ADMIN_EMAILS = {email.lower() for email in config("ADMIN_EMAILS", default="", cast=Csv())}
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -23,6 +25,12 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -33,7 +41,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """
+    Obtiene el usuario autenticado a partir del token, los tokens ya verificados se resuelven desde el cache
+    hasta su expiracion y solo en el primer uso se consulta la base de datos.
+
+    Args:
+        token: el token de acceso recibido en la peticion.
+
+    Returns:
+        el usuario del token, lanza HTTPException 401 si el token no es valido.
+    """
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -42,12 +64,59 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
+        user_id: Optional[int] = payload.get("uid")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = session.exec(select(User).where(User.email == email)).first()
-    if user is None:
+    async with async_session_maker() as session:
+        if user_id is not None:
+            user = await session.get(User, user_id)
+        else:
+            user = (await session.exec(select(User).where(User.email == email))).first()
+    if user is None or user.email != email:
         raise credentials_exception
-    return user
\ No newline at end of file
+
+    principal = User(id=user.id, email=user.email)
+    token_cache.put(token, principal, user.id, payload["exp"])
+    return principal
+
+async def get_current_admin(current_user: User = Depends(get_current_user)):
+    """
+    Obtiene el usuario autenticado si es administrador, es decir si su email esta en ADMIN_EMAILS. El registro es
+    abierto, por lo que un usuario autenticado no puede ver por si solo las rutas de /admin.
+
+    Args:
+        current_user: el usuario del token.
+
+    Returns:
+        el usuario, lanza HTTPException 403 si no es administrador.
+    """
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
+
+def invalidate_user_tokens(user_id: int) -> int:
+    """
+    Elimina del cache los tokens de un usuario, se debe llamar al eliminar o deshabilitar el usuario.
+
+    Args:
+        user_id: el id del usuario.
+
+    Returns:
+        la cantidad de tokens eliminados del cache.
+    """
+    return token_cache.invalidate_user(user_id)
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User):
+    invalidate_user_tokens(target.id)
+    publish_invalidation("users", user_id=target.id)
+
+@on_invalidation("users")
+def _apply_user_invalidation(message: dict):
+    invalidate_user_tokens(message["user_id"])
@@ -0,0 +1,110 @@
+import codecs
+import csv
+from typing import AsyncIterator, Optional, Union
+import orjson
+from decouple import config
+
+
+BULK_BATCH_SIZE = config("BULK_BATCH_SIZE", default=1000, cast=int)
+BULK_MAX_REPORTED_ERRORS = config("BULK_MAX_REPORTED_ERRORS", default=1000, cast=int)
+
+CSV_MEDIA_TYPES = ("text/csv", "application/csv")
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+
+class RecordError(ValueError):
+    """
+    Error de una fila que no se pudo leer, se reporta junto a su numero de fila.
+    """
+
+
+def record_format(content_type: Optional[str]) -> Optional[str]:
+    """
+    Determina el formato de un cuerpo de importacion a partir de su Content-Type.
+
+    Args:
+        content_type: el encabezado Content-Type de la peticion.
+
+    Returns:
+        "csv", "ndjson" o None si el formato no es soportado.
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_MEDIA_TYPES:
+        return "csv"
+    if media_type in NDJSON_MEDIA_TYPES:
+        return "ndjson"
+    return None
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _parse_csv_record(text: str) -> list[str]:
+    return next(csv.reader([text]), [])
+
+
+async def _iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Union[dict, RecordError]]]:
+    header: Optional[list[str]] = None
+    row_number = 0
+    record = ""
+    async for line in _iter_lines(chunks):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        text, record = record.rstrip("\r"), ""
+        if not text.strip():
+            continue
+        values = _parse_csv_record(text)
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, RecordError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield row_number, {key: (value if value != "" else None) for key, value in zip(header, values)}
+    if record:
+        yield row_number + 1, RecordError("Unterminated quoted field")
+
+
+async def _iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Union[dict, RecordError]]]:
+    row_number = 0
+    async for line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            value = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield row_number, RecordError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(value, dict):
+            yield row_number, RecordError("Each line must be a JSON object")
+            continue
+        yield row_number, value
+
+
+def iter_records(chunks: AsyncIterator[bytes], format: str) -> AsyncIterator[tuple[int, Union[dict, RecordError]]]:
+    """
+    Lee las filas de un cuerpo CSV (con encabezado) o NDJSON a medida que llega, sin cargarlo completo en memoria.
+
+    Args:
+        chunks: los bloques de bytes del cuerpo de la peticion.
+        format: "csv" o "ndjson".
+
+    Returns:
+        un iterador de tuplas (numero de fila, diccionario de la fila o RecordError si la fila no se pudo leer).
+    """
+    if format == "csv":
+        return _iter_csv(chunks)
+    return _iter_ndjson(chunks)
@@ -1,32 +1,59 @@
-from decouple import config 
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
-from fastapi import UploadFile
-from typing import Optional
+from functools import lru_cache
+from decouple import config
 
 
-cloudinary.config(
-    cloud_name=config("CLOUDINARY_CLOUD_NAME"),
-    api_key=config("CLOUDINARY_API_KEY"),
-    api_secret=config("CLOUDINARY_API_SECRET"),
-)
+@lru_cache
+def get_uploader():
+    """
+    Importa y configura el cliente de cloudinary la primera vez que se usa, para que importar la aplicacion
+    no dependa de las credenciales ni pague el costo del SDK.
 
+    Returns:
+        el modulo cloudinary.uploader configurado.
+    """
+    import cloudinary
+    import cloudinary.uploader
 
-async def upload_image(file: UploadFile)->Optional[str]:
-    try:
-        contents=await file.read()
-        upload_result=cloudinary.uploader.upload(contents, folder="legendsImages")
+    cloudinary.config(
+        cloud_name=config("CLOUDINARY_CLOUD_NAME"),
+        api_key=config("CLOUDINARY_API_KEY"),
+        api_secret=config("CLOUDINARY_API_SECRET"),
+    )
+    return cloudinary.uploader
 
+
+class CloudinaryStorage:
+    """
+    Almacenamiento de imagenes en el servicio de cloudinary.
+    """
+
+    def __init__(self):
+        self.uploader = get_uploader()
+
+    def upload(self, path: str, folder: str) -> tuple[str, str]:
+        """
+        Carga un archivo en cloudinary.
+
+        Args:
+            path: la ruta del archivo a cargar.
+            folder: la carpeta de cloudinary de destino.
+
+        Returns:
+            una tupla con la url segura y el public_id de la imagen.
+        """
+        upload_result = self.uploader.upload(path, folder=folder)
         return upload_result.get("secure_url"), upload_result.get("public_id")
-    except Exception as e:
-        print(f"Error uploading image: {e}")
-        return None;
 
-async def delete_image(public_id: str) -> bool:
-    try:
-        result = cloudinary.uploader.destroy(public_id)
+    def delete(self, public_id: str) -> bool:
+        """
+        Elimina una imagen de cloudinary.
+
+        Args:
+            public_id: el public_id de la imagen.
+
+        Returns:
+            True si la imagen se elimino, False en caso contrario.
+        """
+        result = self.uploader.destroy(public_id)
         print(f"Delete result: {result}")
-        return True
-    except Exception as e:
-        return False
\ No newline at end of file
+        return result.get("result") == "ok"
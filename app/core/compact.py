@@ -0,0 +1,204 @@
+from datetime import datetime
+from typing import AsyncIterator, Optional
+import orjson
+
+
+COMPACT_SCHEMA = "legends-compact/1"
+COMPACT_JSON_MEDIA_TYPE = "application/vnd.legends.compact+json"
+COMPACT_MSGPACK_MEDIA_TYPE = "application/vnd.legends.compact+msgpack"
+MSGPACK_MEDIA_TYPES = (COMPACT_MSGPACK_MEDIA_TYPE, "application/msgpack", "application/x-msgpack")
+
+COMPACT_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "legend_date",
+    "image_url",
+    "cloudinary_public_id",
+    "image_status",
+    "srcset",
+)
+
+
+def wants_compact(accept: Optional[str]) -> Optional[str]:
+    """
+    Determina si el cliente pidio el formato compacto mediante el encabezado Accept.
+
+    Args:
+        accept: el encabezado Accept de la peticion.
+
+    Returns:
+        el media type compacto en JSON o MessagePack, None si el cliente no lo pidio.
+    """
+    if not accept:
+        return None
+    media_types = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+    if COMPACT_JSON_MEDIA_TYPE in media_types:
+        return COMPACT_JSON_MEDIA_TYPE
+    if media_types.intersection(MSGPACK_MEDIA_TYPES):
+        return COMPACT_MSGPACK_MEDIA_TYPE
+    return None
+
+
+def _dictionary(ids: list, names: list, **parents) -> tuple[list[int], dict]:
+    """
+    Codifica una columna de ids con su nombre como diccionario: cada id distinto se guarda una vez, en orden de
+    aparicion, y las filas lo referencian por su posicion.
+
+    Args:
+        ids: la columna de ids.
+        names: la columna de nombres, alineada con ids.
+        parents: columnas adicionales alineadas con ids, por ejemplo la posicion del padre.
+
+    Returns:
+        una tupla con la posicion de cada fila y las columnas del diccionario.
+    """
+    unique = list(dict.fromkeys(ids))
+    positions = {item_id: position for position, item_id in enumerate(unique)}
+    name_by_id = dict(zip(ids, names))
+    columns = {"id": unique, "name": [name_by_id[item_id] for item_id in unique]}
+    for key, values in parents.items():
+        value_by_id = dict(zip(ids, values))
+        columns[key] = [value_by_id[item_id] for item_id in unique]
+    return list(map(positions.__getitem__, ids)), columns
+
+
+def _srcset(variants: Optional[dict]) -> dict:
+    return {width: variant["url"] for width, variant in variants.items()} if variants else {}
+
+
+def build_compact(rows: list, next_cursor: Optional[str] = None) -> dict:
+    """
+    Construye el documento compacto de una lista de leyendas: un arreglo por columna y las categorias, distritos,
+    cantones y provincias codificados como diccionarios, de modo que cada nombre aparece una sola vez. Las filas se
+    transponen y codifican por columnas, sin recorrerlas campo por campo.
+
+    Esquema (legends-compact/1):
+        schema: "legends-compact/1".
+        count: la cantidad de leyendas.
+        next_cursor: el cursor de la siguiente pagina o null.
+        columns: id, name, description, legend_date, image_url, cloudinary_public_id, image_status y srcset con un
+            valor por leyenda, y category y district con la posicion de la leyenda en su diccionario.
+        dictionaries:
+            category: {id: [...], name: [...]}.
+            district: {id: [...], name: [...], canton: [posicion en el diccionario canton]}.
+            canton: {id: [...], name: [...], province: [posicion en el diccionario province]}.
+            province: {id: [...], name: [...]}.
+
+    Args:
+        rows: las filas de la consulta de proyeccion de leyendas.
+        next_cursor: el cursor de la siguiente pagina.
+
+    Returns:
+        el documento compacto.
+    """
+    if rows:
+        data = dict(zip(rows[0]._fields, map(list, zip(*rows))))
+    else:
+        data = dict.fromkeys(
+            (*COMPACT_COLUMNS, "image_variants", "category_id", "category_name", "district_id", "district_name",
+             "canton_id", "canton_name", "province_id", "province_name"), [],
+        )
+    data["srcset"] = list(map(_srcset, data["image_variants"]))
+
+    province_positions, provinces = _dictionary(data["province_id"], data["province_name"])
+    canton_positions, cantons = _dictionary(data["canton_id"], data["canton_name"], province=province_positions)
+    district_positions, districts = _dictionary(data["district_id"], data["district_name"], canton=canton_positions)
+    category_positions, categories = _dictionary(data["category_id"], data["category_name"])
+
+    columns = {column: data[column] for column in COMPACT_COLUMNS}
+    columns["category"] = category_positions
+    columns["district"] = district_positions
+    return {
+        "schema": COMPACT_SCHEMA,
+        "count": len(rows),
+        "next_cursor": next_cursor,
+        "columns": columns,
+        "dictionaries": {
+            "category": categories,
+            "district": districts,
+            "canton": cantons,
+            "province": provinces,
+        },
+    }
+
+
+def decode_compact(document: dict) -> list[dict]:
+    """
+    Reconstruye las leyendas de un documento compacto con los campos de LegendRead, es la referencia para
+    los clientes que consumen el formato.
+
+    Args:
+        document: el documento compacto ya decodificado desde JSON o MessagePack.
+
+    Returns:
+        la lista de leyendas como diccionarios.
+    """
+    columns = document["columns"]
+    dictionaries = document["dictionaries"]
+    category, district = dictionaries["category"], dictionaries["district"]
+    canton, province = dictionaries["canton"], dictionaries["province"]
+    items = []
+    for index in range(document["count"]):
+        item = {column: columns[column][index] for column in COMPACT_COLUMNS}
+        c = columns["category"][index]
+        d = columns["district"][index]
+        k = district["canton"][d]
+        p = canton["province"][k]
+        item.update({
+            "category_id": category["id"][c],
+            "category_name": category["name"][c],
+            "district_id": district["id"][d],
+            "district_name": district["name"][d],
+            "canton_id": canton["id"][k],
+            "canton_name": canton["name"][k],
+            "province_id": province["id"][p],
+            "province_name": province["name"][p],
+        })
+        items.append(item)
+    return items
+
+
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_compact(document: dict, media_type: str) -> bytes:
+    """
+    Serializa un documento compacto como JSON o MessagePack, las fechas se envian en formato ISO 8601.
+
+    Args:
+        document: el documento construido mediante build_compact.
+        media_type: el media type negociado.
+
+    Returns:
+        el cuerpo de la respuesta.
+    """
+    if media_type == COMPACT_MSGPACK_MEDIA_TYPE:
+        import msgpack
+
+        columns = document["columns"]
+        dates = [value.isoformat() if isinstance(value, datetime) else value for value in columns["legend_date"]]
+        document = {**document, "columns": {**columns, "legend_date": dates}}
+        return msgpack.packb(document, default=_msgpack_default, use_bin_type=True)
+    return orjson.dumps(document)
+
+
+async def encode_compact_stream(batches: AsyncIterator[list], media_type: str) -> AsyncIterator[bytes]:
+    """
+    Codifica cada lote de filas de leyendas como un documento compacto independiente, separados por salto de linea en JSON
+    y concatenados en MessagePack (se leen con msgpack.Unpacker).
+
+    Args:
+        batches: los lotes de filas de la consulta de proyeccion.
+        media_type: el media type negociado.
+
+    Returns:
+        un iterador de bloques de bytes, uno por lote.
+    """
+    separator = b"" if media_type == COMPACT_MSGPACK_MEDIA_TYPE else b"\n"
+    async for batch in batches:
+        if batch:
+            yield encode_compact(build_compact(batch), media_type) + separator
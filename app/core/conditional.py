@@ -0,0 +1,133 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Response, status
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.table_version_model import TableVersion
+
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+def utcnow() -> datetime:
+    """
+    Obtiene la fecha actual en UTC sin zona horaria, el formato en que se guardan las fechas de modificacion.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def bump_version_statement(table_name: str):
+    """
+    Construye la sentencia que incrementa el contador de version de una tabla, debe ejecutarse en la misma
+    transaccion que la escritura para que la version cambie solo si la escritura se confirma.
+
+    Args:
+        table_name: el nombre de la tabla.
+
+    Returns:
+        la sentencia de actualizacion.
+    """
+    return (
+        update(TableVersion)
+        .where(TableVersion.table_name == table_name)
+        .values(version=TableVersion.version + 1, updated_at=utcnow())
+    )
+
+
+async def get_table_version(session: AsyncSession, table_name: str) -> Optional[TableVersion]:
+    """
+    Recupera el contador de version de una tabla.
+
+    Args:
+        session: la sesion de la base de datos.
+        table_name: el nombre de la tabla.
+
+    Returns:
+        la version de la tabla o None si la tabla no tiene contador.
+    """
+    return (await session.exec(select(TableVersion).where(TableVersion.table_name == table_name))).first()
+
+
+def make_etag(*parts) -> str:
+    """
+    Construye una ETag debil a partir de los valores que determinan el contenido de una respuesta.
+
+    Args:
+        parts: los valores, por ejemplo la version de la tabla y los parametros de la consulta.
+
+    Returns:
+        la ETag entre comillas.
+    """
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Compara el encabezado If-None-Match con una ETag usando la comparacion debil.
+
+    Args:
+        if_none_match: el valor del encabezado.
+        etag: la ETag actual.
+
+    Returns:
+        True si el cliente ya tiene la version actual.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def format_http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
+
+
+def conditional_response(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """
+    Resuelve una peticion condicional, If-None-Match tiene prioridad sobre If-Modified-Since.
+
+    Args:
+        if_none_match: el encabezado If-None-Match.
+        if_modified_since: el encabezado If-Modified-Since.
+        etag: la ETag actual.
+        last_modified: la fecha de la ultima modificacion.
+
+    Returns:
+        una respuesta 304 si el cliente ya tiene la version actual, None si se debe responder el contenido.
+    """
+    if if_none_match:
+        fresh = etag_matches(if_none_match, etag)
+    else:
+        fresh = not_modified_since(if_modified_since, last_modified)
+    if fresh:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag, last_modified))
+    return None
@@ -1,6 +1,11 @@
+from contextlib import AsyncExitStack, ExitStack
+from contextvars import ContextVar
 from typing import Annotated
-from fastapi import Depends,FastAPI
+from fastapi import Depends,FastAPI, Request
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from decouple import config 
 from app.models.legend_model import Legend
 from app.models.province_model import Province
@@ -8,24 +13,140 @@ from app.models.canton_model import Canton
 from app.models.district_model import District
 from app.models.category_model import Category
 from app.models.user_model import User
+from app.core.reference_cache import refresh_reference_cache
+from app.core.search_index import load_search_index
+from app.core.db_pool import PoolMetrics, pool_options, warmup_size
+from app.core.migrations import run_migrations
+from app.core.startup import startup_phase
+from app.core.metrics import instrument_engine
+from app.core.replicas import DATABASE_REPLICA_URLS, ReplicaRouter, WriteTrackingSession
 
 
 URL_DB=config("DATABASE_URL")
 if not URL_DB:
     raise ValueError("DATABASE_URL is not set in the environment variables.")
-engine = create_engine(URL_DB)
+sync_pool_metrics = PoolMetrics()
+engine = create_engine(URL_DB, **pool_options(URL_DB, sync_pool_metrics))
+instrument_engine(engine, "sync")
+
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def get_async_url(url: str) -> str:
+    """
+    Convierte la url de la base de datos a su equivalente con un driver asincrono.
+
+    Args:
+        url: la url de la base de datos con el driver sincrono.
+
+    Returns:
+        la url con el driver asincrono (aiomysql para MySQL, aiosqlite para SQLite).
+    """
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+ASYNC_URL_DB = config("ASYNC_DATABASE_URL", default=get_async_url(URL_DB))
+async_pool_metrics = PoolMetrics()
+async_engine = create_async_engine(ASYNC_URL_DB, **pool_options(ASYNC_URL_DB, async_pool_metrics, asynchronous=True))
+instrument_engine(async_engine.sync_engine, "async")
+async_session_maker = async_sessionmaker(
+    async_engine, class_=AsyncSession, sync_session_class=WriteTrackingSession, expire_on_commit=False
+)
+
+replica_engines = []
+for index, replica_url in enumerate(DATABASE_REPLICA_URLS):
+    async_replica_url = get_async_url(replica_url)
+    replica_engine = create_async_engine(async_replica_url, **pool_options(async_replica_url, PoolMetrics(), asynchronous=True))
+    instrument_engine(replica_engine.sync_engine, f"replica{index}")
+    replica_engines.append(replica_engine)
+replica_router = ReplicaRouter(async_engine, replica_engines)
+_read_engine = ContextVar("read_engine", default=async_engine)
+
+
+def named_engines() -> dict:
+    """
+    Obtiene los engines de la aplicacion por su nombre en las metricas.
+
+    Returns:
+        los engines sync, async y replicaN.
+    """
+    return {"sync": engine, "async": async_engine, **{f"replica{index}": item for index, item in enumerate(replica_engines)}}
 
 def create_all_tables(app: FastAPI):
-    SQLModel.metadata.create_all(engine)
-    print("All tables created successfully.")
+    with startup_phase("migrations"):
+        run_migrations(engine)
+    print("Database schema is up to date.")
+    with startup_phase("caches"), Session(engine) as session:
+        refresh_reference_cache(session)
+        load_search_index(session)
+    print("Reference data and search index loaded.")
     yield
     print("All tables creation process completed.")
 
 
 
+async def warm_up_pools() -> dict[str, int]:
+    """
+    Abre a la vez las conexiones iniciales de los pools sincrono y asincrono y las devuelve al pool, para que
+    las primeras peticiones no esperen a que se establezcan.
+
+    Returns:
+        las conexiones abiertas en cada pool, las de las replicas se suman en "replicas".
+    """
+    with ExitStack() as stack:
+        sync_connections = [stack.enter_context(engine.connect()) for _ in range(warmup_size(engine))]
+    async with AsyncExitStack() as stack:
+        async_connections = [
+            await stack.enter_async_context(async_engine.connect()) for _ in range(warmup_size(async_engine))
+        ]
+        replica_connections = [
+            await stack.enter_async_context(replica.connect())
+            for replica in replica_engines for _ in range(warmup_size(replica))
+        ]
+    return {"sync": len(sync_connections), "async": len(async_connections), "replicas": len(replica_connections)}
+
+
 def get_session():
     with Session(engine) as session:
         yield session
 
 
-SessionLocal= Annotated[Session, Depends(get_session)] 
\ No newline at end of file
+SessionLocal= Annotated[Session, Depends(get_session)]
+
+
+async def get_async_session(request: Request):
+    """
+    Abre la sesion de una peticion: las lecturas van a una replica si DATABASE_REPLICA_URLS esta configurada y
+    las escrituras, y las lecturas de quien confirmo una escritura recientemente, a la base principal.
+
+    Args:
+        request: la peticion.
+
+    Returns:
+        la sesion, que se cierra al terminar la peticion.
+    """
+    bind = await replica_router.engine_for(request)
+    _read_engine.set(bind)
+    async with async_session_maker(bind=bind) as session:
+        yield session
+    await replica_router.record_write(request, session)
+
+
+def read_session() -> AsyncSession:
+    """
+    Abre una sesion propia en el engine elegido para la peticion en curso, la usan las respuestas que se
+    transmiten despues de que la sesion de la peticion se cerro.
+
+    Returns:
+        la sesion, debe cerrarse con async with.
+    """
+    return async_session_maker(bind=_read_engine.get())
+
+
+AsyncSessionLocal= Annotated[AsyncSession, Depends(get_async_session)] 
\ No newline at end of file
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import deque
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from decouple import config
+
+
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=5, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30.0, cast=float)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+DB_WARMUP_CONNECTIONS = config("DB_WARMUP_CONNECTIONS", default=DB_POOL_SIZE, cast=int)
+POOL_WAIT_SAMPLES = 2048
+
+
+class PoolMetrics:
+    """
+    Metricas de un pool de conexiones: prestamos, devoluciones, tiempos de espera y esperas agotadas.
+    Los tiempos de espera se guardan en una ventana de las ultimas POOL_WAIT_SAMPLES muestras.
+    """
+
+    def __init__(self, samples: int = POOL_WAIT_SAMPLES):
+        self._lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=samples)
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self._waits.append(wait)
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checkins += 1
+
+    def record_timeout(self, wait: float):
+        with self._lock:
+            self.timeouts += 1
+            self.max_wait = max(self.max_wait, wait)
+
+    def percentile(self, value: float) -> float:
+        """
+        Calcula un percentil de los tiempos de espera recientes.
+
+        Args:
+            value: el percentil entre 0 y 100.
+
+        Returns:
+            el tiempo de espera en segundos, 0 si aun no hay muestras.
+        """
+        with self._lock:
+            waits = sorted(self._waits)
+        if not waits:
+            return 0.0
+        index = min(len(waits) - 1, max(0, round(value / 100 * len(waits)) - 1))
+        return waits[index]
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "timeouts": self.timeouts,
+            "wait_p50_ms": round(self.percentile(50) * 1000, 3),
+            "wait_p99_ms": round(self.percentile(99) * 1000, 3),
+            "wait_max_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class _InstrumentedPoolMixin:
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - start)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def _do_return_conn(self, record):
+        self.metrics.record_checkin()
+        super()._do_return_conn(record)
+
+
+def instrumented_pool_class(base: type[QueuePool], metrics: PoolMetrics) -> type[QueuePool]:
+    """
+    Crea una subclase del pool que registra sus prestamos, devoluciones y esperas en metrics.
+    Las metricas se asocian a la clase para que se conserven cuando el engine recrea el pool.
+
+    Args:
+        base: la clase del pool (QueuePool o AsyncAdaptedQueuePool).
+        metrics: las metricas donde se registran los eventos.
+
+    Returns:
+        la clase del pool instrumentado.
+    """
+    return type(f"Instrumented{base.__name__}", (_InstrumentedPoolMixin, base), {"metrics": metrics})
+
+
+def pool_options(url: str, metrics: PoolMetrics, asynchronous: bool = False) -> dict:
+    """
+    Construye los parametros del pool de conexiones de un engine a partir de la configuracion.
+
+    Args:
+        url: la url de la base de datos.
+        metrics: las metricas donde el pool registra sus eventos.
+        asynchronous: si el engine es asincrono.
+
+    Returns:
+        los parametros para create_engine o create_async_engine, vacios para SQLite en memoria.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    base = AsyncAdaptedQueuePool if asynchronous else QueuePool
+    return {
+        "poolclass": instrumented_pool_class(base, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def pool_status(engine) -> dict:
+    """
+    Obtiene la ocupacion actual del pool de un engine junto a sus metricas.
+
+    Args:
+        engine: el engine sincrono o asincrono.
+
+    Returns:
+        el tamaño, las conexiones prestadas, disponibles y de desborde, y las metricas de espera.
+    """
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
+
+
+def warmup_size(engine) -> int:
+    """
+    Calcula cuantas conexiones abrir al arrancar para que las primeras peticiones no paguen su establecimiento.
+
+    Args:
+        engine: el engine sincrono o asincrono.
+
+    Returns:
+        DB_WARMUP_CONNECTIONS limitado al tamaño permanente del pool, como maximo una si el pool no es un QueuePool.
+    """
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        return max(0, min(DB_WARMUP_CONNECTIONS, pool.size()))
+    return min(DB_WARMUP_CONNECTIONS, 1)
@@ -0,0 +1,102 @@
+import csv
+import io
+import re
+from datetime import datetime
+from typing import AsyncIterator, Optional
+import orjson
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "category_id",
+    "category_name",
+    "legend_date",
+    "district_id",
+    "district_name",
+    "canton_id",
+    "canton_name",
+    "province_id",
+    "province_name",
+    "image_url",
+    "image_status",
+)
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+COLUMNAR_MEDIA_TYPE = "application/x-ndjson"
+RANGE_UNIT = "id"
+
+_RANGE_PATTERN = re.compile(rf"^\s*{RANGE_UNIT}\s*=\s*(\d+)\s*-\s*$")
+
+
+class InvalidRangeError(ValueError):
+    pass
+
+
+def parse_id_range(range_header: Optional[str]) -> Optional[int]:
+    """
+    Interpreta el encabezado Range de una exportacion, con la forma "id=<primer id>-".
+
+    Args:
+        range_header: el valor del encabezado.
+
+    Returns:
+        el primer id a exportar o None si no hay encabezado, lanza InvalidRangeError si el formato no es valido.
+    """
+    if not range_header:
+        return None
+    match = _RANGE_PATTERN.match(range_header)
+    if match is None:
+        raise InvalidRangeError(f"Range must have the form {RANGE_UNIT}=<first id>-")
+    return int(match.group(1))
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def encode_csv(batches: AsyncIterator[list], columns: tuple[str, ...] = EXPORT_COLUMNS) -> AsyncIterator[bytes]:
+    """
+    Codifica los lotes de filas como CSV con encabezado, un bloque por lote.
+
+    Args:
+        batches: los lotes de filas de la consulta.
+        columns: las columnas a exportar.
+
+    Returns:
+        un iterador de bloques de bytes.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    yield buffer.getvalue().encode()
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(row._mapping[column]) for column in columns] for row in batch)
+        yield buffer.getvalue().encode()
+
+
+async def encode_columnar(batches: AsyncIterator[list], columns: tuple[str, ...] = EXPORT_COLUMNS) -> AsyncIterator[bytes]:
+    """
+    Codifica los lotes de filas en formato columnar: una primera linea con los nombres de las columnas y luego
+    una linea JSON por lote con un arreglo de valores por columna, lo que evita repetir los nombres en cada fila.
+
+    Args:
+        batches: los lotes de filas de la consulta.
+        columns: las columnas a exportar.
+
+    Returns:
+        un iterador de bloques de bytes.
+    """
+    yield orjson.dumps({"columns": columns}) + b"\n"
+    async for batch in batches:
+        if not batch:
+            continue
+        data = [[row._mapping[column] for row in batch] for column in columns]
+        yield orjson.dumps({"rows": len(batch), "data": data}) + b"\n"
@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    format: str
+    content_type: str
+    extension: str
+    width: int
+    height: int
+
+
+class InvalidImageError(ValueError):
+    pass
+
+
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+
+
+def _probe_png(data: bytes) -> Optional[ImageInfo]:
+    if len(data) < 24:
+        return None
+    if data[12:16] != b"IHDR":
+        raise InvalidImageError("PNG file without IHDR header")
+    width = int.from_bytes(data[16:20], "big")
+    height = int.from_bytes(data[20:24], "big")
+    return ImageInfo("png", "image/png", ".png", width, height)
+
+
+def _probe_gif(data: bytes) -> Optional[ImageInfo]:
+    if len(data) < 10:
+        return None
+    width = int.from_bytes(data[6:8], "little")
+    height = int.from_bytes(data[8:10], "little")
+    return ImageInfo("gif", "image/gif", ".gif", width, height)
+
+
+def _probe_webp(data: bytes) -> Optional[ImageInfo]:
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        width = int.from_bytes(data[26:28], "little") & 0x3FFF
+        height = int.from_bytes(data[28:30], "little") & 0x3FFF
+    elif chunk == b"VP8L":
+        bits = int.from_bytes(data[21:25], "little")
+        width = (bits & 0x3FFF) + 1
+        height = ((bits >> 14) & 0x3FFF) + 1
+    elif chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+    else:
+        raise InvalidImageError("Unknown WebP chunk")
+    return ImageInfo("webp", "image/webp", ".webp", width, height)
+
+
+def _probe_jpeg(data: bytes) -> Optional[ImageInfo]:
+    position = 2
+    while True:
+        while position < len(data) and data[position] == 0xFF:
+            position += 1
+        if position >= len(data):
+            return None
+        marker = data[position]
+        position += 1
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise InvalidImageError("JPEG file without frame header")
+        if position + 2 > len(data):
+            return None
+        length = int.from_bytes(data[position:position + 2], "big")
+        if length < 2:
+            raise InvalidImageError("Malformed JPEG segment")
+        if marker in _JPEG_SOF_MARKERS:
+            if position + 7 > len(data):
+                return None
+            height = int.from_bytes(data[position + 3:position + 5], "big")
+            width = int.from_bytes(data[position + 5:position + 7], "big")
+            return ImageInfo("jpeg", "image/jpeg", ".jpg", width, height)
+        position += length
+        if position < len(data) and data[position] != 0xFF:
+            raise InvalidImageError("Malformed JPEG segment")
+
+
+def probe_image(data: bytes) -> Optional[ImageInfo]:
+    """
+    Identifica el formato y las dimensiones de una imagen a partir de sus primeros bytes.
+
+    Args:
+        data: los primeros bytes del archivo.
+
+    Returns:
+        la informacion de la imagen o None si hacen falta mas bytes para identificarla,
+        lanza InvalidImageError si el formato no es soportado o el archivo esta corrupto.
+    """
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return _probe_png(data)
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return _probe_gif(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _probe_webp(data)
+    if data.startswith(b"\xff\xd8\xff"):
+        return _probe_jpeg(data)
+    if len(data) < 12:
+        return None
+    raise InvalidImageError("Unsupported image format")
@@ -0,0 +1,91 @@
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from decouple import config, Csv
+
+
+IMAGE_VARIANT_WIDTHS = config("IMAGE_VARIANT_WIDTHS", default="320,640,1280", cast=Csv(int))
+IMAGE_VARIANT_FORMAT = config("IMAGE_VARIANT_FORMAT", default="webp")
+IMAGE_VARIANT_QUALITY = config("IMAGE_VARIANT_QUALITY", default=80, cast=int)
+IMAGE_PROCESS_WORKERS = config("IMAGE_PROCESS_WORKERS", default=2, cast=int)
+
+_FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def generate_variants(path: str, output_dir: str, widths: list[int], image_format: str, quality: int) -> list[tuple[int, str]]:
+    """
+    Genera versiones redimensionadas de una imagen, sin ampliar imagenes mas pequeñas que el ancho pedido.
+    Se ejecuta en un proceso del pool de procesamiento de imagenes.
+
+    Args:
+        path: la ruta de la imagen original.
+        output_dir: la carpeta donde se guardan las versiones.
+        widths: los anchos de las versiones.
+        image_format: el formato de salida (webp o jpeg).
+        quality: la calidad de compresion.
+
+    Returns:
+        una lista de tuplas (ancho, ruta) de las versiones generadas.
+    """
+    from PIL import Image, ImageOps
+
+    pil_format, extension = _FORMATS[image_format]
+    variants = []
+    with Image.open(path) as original:
+        image = ImageOps.exif_transpose(original)
+        if pil_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        for width in sorted(set(widths)):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            variant_path = os.path.join(output_dir, f"{uuid.uuid4().hex}-{width}{extension}")
+            resized.save(variant_path, pil_format, quality=quality)
+            variants.append((width, variant_path))
+    return variants
+
+
+def get_variant_pool() -> ProcessPoolExecutor:
+    """
+    Obtiene el pool de procesos que genera las versiones de las imagenes, creandolo si no existe.
+
+    Returns:
+        el pool de procesos.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS)
+    return _pool
+
+
+def build_variants(path: str, output_dir: str) -> list[tuple[int, str]]:
+    """
+    Genera en el pool de procesos las versiones configuradas de una imagen.
+
+    Args:
+        path: la ruta de la imagen original.
+        output_dir: la carpeta donde se guardan las versiones.
+
+    Returns:
+        una lista de tuplas (ancho, ruta) de las versiones generadas.
+    """
+    future = get_variant_pool().submit(
+        generate_variants, path, output_dir, list(IMAGE_VARIANT_WIDTHS), IMAGE_VARIANT_FORMAT, IMAGE_VARIANT_QUALITY
+    )
+    return future.result()
+
+
+def shutdown_variant_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
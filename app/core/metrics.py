@@ -0,0 +1,295 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from decouple import config, Csv
+
+
+SLOW_QUERY_MS = config("SLOW_QUERY_MS", default=200.0, cast=float)
+SLOW_QUERY_LOG_SIZE = config("SLOW_QUERY_LOG_SIZE", default=100, cast=int)
+METRICS_LATENCY_BUCKETS = config(
+    "METRICS_LATENCY_BUCKETS", default="0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10", cast=Csv(float)
+)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "unmatched"
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Contador de Prometheus con etiquetas.
+    """
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_number(value)}"
+
+
+class Histogram:
+    """
+    Histograma de Prometheus con etiquetas y limites de cubeta fijos.
+    """
+
+    def __init__(self, name: str, description: str, buckets: Iterable[float], labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._samples: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        """
+        Registra una observacion.
+
+        Args:
+            labels: los valores de las etiquetas, en el orden de self.labels.
+            value: el valor observado.
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._samples.get(labels)
+            if sample is None:
+                sample = self._samples[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            samples = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._samples.items()]
+        for labels, counts, total, count in samples:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound if bound == float("inf") else float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_number(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {count}"
+
+
+REQUEST_LABELS = ("method", "route")
+
+requests_total = Counter("http_requests_total", "Peticiones HTTP atendidas.", ("method", "route", "status"))
+request_duration = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP.", METRICS_LATENCY_BUCKETS, REQUEST_LABELS
+)
+response_size = Histogram("http_response_size_bytes", "Tamaño del cuerpo de las respuestas.", SIZE_BUCKETS, REQUEST_LABELS)
+request_statements = Histogram(
+    "http_request_db_statements", "Sentencias SQL ejecutadas por peticion.", STATEMENT_BUCKETS, REQUEST_LABELS
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Tiempo total en la base de datos por peticion.", METRICS_LATENCY_BUCKETS, REQUEST_LABELS
+)
+db_statements_total = Counter("db_statements_total", "Sentencias SQL ejecutadas.", ("engine",))
+db_seconds_total = Counter("db_seconds_total", "Tiempo total de las sentencias SQL.", ("engine",))
+slow_queries_total = Counter("db_slow_queries_total", "Sentencias SQL que superaron SLOW_QUERY_MS.", ("engine",))
+admission_rejections_total = Counter(
+    "http_requests_rejected_total", "Peticiones rechazadas por el control de admision.", ("endpoint_class", "reason")
+)
+
+METRICS = (
+    requests_total, request_duration, response_size, request_statements, request_db_time,
+    db_statements_total, db_seconds_total, slow_queries_total, admission_rejections_total,
+)
+
+slow_query_log: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def describe_parameters(parameters) -> str:
+    """
+    Describe los parametros de una sentencia sin incluir sus valores, que pueden contener emails o hashes de
+    contraseñas.
+
+    Args:
+        parameters: los parametros enviados al cursor.
+
+    Returns:
+        los tipos de los parametros, o la cantidad de conjuntos si la sentencia se ejecuto con executemany.
+    """
+    if isinstance(parameters, dict):
+        values = parameters.values()
+    elif isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return f"{len(parameters)} parameter sets"
+        values = parameters
+    elif parameters is None:
+        return "()"
+    else:
+        return type(parameters).__name__
+    return "(" + ", ".join(type(value).__name__ for value in values) + ")"
+
+
+def _record_slow_query(engine_name: str, statement: str, parameters, elapsed: float):
+    slow_query_log.append({
+        "engine": engine_name,
+        "duration_ms": round(elapsed * 1000, 3),
+        "statement": statement,
+        "parameter_types": describe_parameters(parameters),
+        "at": time.time(),
+    })
+    slow_queries_total.inc((engine_name,))
+
+
+def instrument_engine(engine: Engine, engine_name: str, slow_query_ms: float = SLOW_QUERY_MS):
+    """
+    Registra los eventos de SQLAlchemy que cuentan las sentencias y su duracion, las atribuyen a la peticion
+    en curso y guardan en el registro de consultas lentas las que superan el umbral.
+
+    Args:
+        engine: el engine sincrono, para un engine asincrono se usa su sync_engine.
+        engine_name: el nombre del engine en las metricas.
+        slow_query_ms: el umbral en milisegundos de las consultas lentas, 0 lo desactiva.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_statements_total.inc((engine_name,))
+        db_seconds_total.inc((engine_name,), elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+        if slow_query_ms and elapsed * 1000 >= slow_query_ms:
+            _record_slow_query(engine_name, statement, parameters, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide por ruta la latencia, el tamaño de la respuesta y las sentencias SQL y el tiempo
+    en la base de datos de cada peticion. Las rutas se identifican por su plantilla (/legends/{legend_id})
+    para que la cantidad de series no crezca con los ids.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        size = 0
+        start = time.perf_counter()
+
+        async def instrumented_send(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, instrumented_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            labels = (scope["method"], _route_label(scope))
+            requests_total.inc((*labels, str(status_code)))
+            request_duration.observe(labels, elapsed)
+            response_size.observe(labels, size)
+            request_statements.observe(labels, stats.statements)
+            request_db_time.observe(labels, stats.db_seconds)
+
+
+def render_metrics(extra_lines: Iterable[str] = ()) -> str:
+    """
+    Genera el texto de las metricas en el formato de exposicion de Prometheus.
+
+    Args:
+        extra_lines: lineas adicionales, por ejemplo las metricas de los pools de conexiones.
+
+    Returns:
+        el texto de las metricas.
+    """
+    lines = [line for metric in METRICS for line in metric.render()]
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name: str, description: str, samples: Iterable[tuple[dict, float]]) -> list[str]:
+    """
+    Genera las lineas de una metrica de tipo gauge calculada al momento de la consulta.
+
+    Args:
+        name: el nombre de la metrica.
+        description: la descripcion.
+        samples: tuplas con las etiquetas y el valor.
+
+    Returns:
+        las lineas en el formato de Prometheus.
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_number(value)}")
+    return lines
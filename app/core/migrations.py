@@ -0,0 +1,155 @@
+import time
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel
+from app.models.legend_model import Legend
+from app.models.province_model import Province  # noqa: F401, registra la tabla para create_all
+from app.models.canton_model import Canton
+from app.models.district_model import District
+from app.models.category_model import Category  # noqa: F401
+from app.models.user_model import User  # noqa: F401
+from app.models.table_version_model import TableVersion
+from app.core.conditional import utcnow
+
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _create_tables(connection: Connection):
+    SQLModel.metadata.create_all(connection)
+
+
+def _add_missing_columns(table, columns: list[Column]):
+    def apply(connection: Connection):
+        existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+        preparer = connection.dialect.identifier_preparer
+        for column in columns:
+            if column.name in existing:
+                continue
+            definition = column.type.compile(dialect=connection.dialect)
+            if column.server_default is not None:
+                definition += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                definition += " NOT NULL"
+            connection.execute(text(
+                f"ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {preparer.quote(column.name)} {definition}"
+            ))
+    return apply
+
+
+def _create_missing_indexes(indexes: list[Index]):
+    def apply(connection: Connection):
+        inspector = inspect(connection)
+        for index in indexes:
+            existing = {item["name"] for item in inspector.get_indexes(index.table.name)}
+            if index.name not in existing:
+                index.create(connection)
+    return apply
+
+
+def _seed_table_versions(table_names: list[str]):
+    def apply(connection: Connection):
+        existing = set(connection.execute(text("SELECT table_name FROM table_versions")).scalars())
+        for table_name in table_names:
+            if table_name not in existing:
+                connection.execute(
+                    TableVersion.__table__.insert().values(table_name=table_name, version=0, updated_at=utcnow())
+                )
+    return apply
+
+
+def _index(table, name: str) -> Index:
+    return next(index for index in table.indexes if index.name == name)
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "initial schema", _create_tables),
+    Migration(2, "legend image and modification columns", _add_missing_columns(Legend.__table__, [
+        Column("image_status", String(10)),
+        Column("image_variants", JSON),
+        Column("updated_at", DateTime),
+    ])),
+    Migration(3, "legend keyset indexes", _create_missing_indexes([
+        _index(Legend.__table__, "ix_legends_legend_date_id"),
+        _index(Legend.__table__, "ix_legends_name_id"),
+    ])),
+    Migration(4, "table versions", _seed_table_versions(["legends"])),
+    Migration(5, "legend filter indexes", _create_missing_indexes([
+        _index(Legend.__table__, "ix_legends_category_id_legend_date"),
+        _index(Legend.__table__, "ix_legends_district_id_legend_date"),
+        _index(District.__table__, "ix_districts_canton_id"),
+        _index(Canton.__table__, "ix_cantons_province_id"),
+    ])),
+    Migration(6, "legend row version", _add_missing_columns(Legend.__table__, [
+        Column("version", Integer, nullable=False, server_default="0"),
+    ])),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _ensure_version_table(connection: Connection):
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+        "version INTEGER NOT NULL PRIMARY KEY, "
+        "name VARCHAR(100) NOT NULL, "
+        "applied_at DATETIME NOT NULL)"
+    ))
+
+
+def get_schema_version(engine: Engine) -> int:
+    """
+    Obtiene la version del esquema registrada en la base de datos.
+
+    Args:
+        engine: el engine de la base de datos.
+
+    Returns:
+        la ultima migracion aplicada, 0 si no se ha aplicado ninguna.
+    """
+    with engine.begin() as connection:
+        _ensure_version_table(connection)
+        return connection.execute(text(f"SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE}")).scalar() or 0
+
+
+def run_migrations(engine: Engine) -> list[int]:
+    """
+    Aplica las migraciones pendientes, cada una en su propia transaccion. Si la version del esquema ya es la
+    ultima no se inspecciona la base de datos, por lo que el arranque solo cuesta una consulta.
+    Las migraciones son idempotentes, una base creada con db.sql o con create_all se actualiza sin errores.
+
+    Args:
+        engine: el engine de la base de datos.
+
+    Returns:
+        las versiones aplicadas.
+    """
+    current = get_schema_version(engine)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        start = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                migration.apply(connection)
+                connection.execute(
+                    text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                    {"version": migration.version, "name": migration.name, "applied_at": utcnow()},
+                )
+        except IntegrityError:
+            print(f"Migration {migration.version} was applied by another process")
+            continue
+        applied.append(migration.version)
+        print(f"Applied migration {migration.version} ({migration.name}) in {time.perf_counter() - start:.3f}s")
+    return applied
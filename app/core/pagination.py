@@ -0,0 +1,81 @@
+import base64
+import json
+import math
+from datetime import datetime
+from typing import Any, Optional
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value: Any) -> bool:
+    return _is_int(value) or (isinstance(value, float) and math.isfinite(value))
+
+
+CURSOR_VALUE_CHECKS = {
+    "id": _is_int,
+    "name": lambda value: isinstance(value, str),
+    "legend_date": lambda value: isinstance(value, str),
+    "relevance": _is_number,
+}
+
+
+def encode_cursor(sort: str, order: str, value: Any, last_id: int) -> str:
+    """
+    Codifica la posicion de la ultima fila de una pagina en un cursor opaco.
+
+    Args:
+        sort: el campo de ordenamiento.
+        order: la direccion del ordenamiento.
+        value: el valor del campo de ordenamiento en la ultima fila.
+        last_id: el id de la ultima fila.
+
+    Returns:
+        el cursor codificado en base64 url-safe.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, order, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], sort: str, order: str) -> Optional[tuple[Any, int]]:
+    """
+    Decodifica un cursor generado por encode_cursor y valida que corresponda al ordenamiento pedido.
+
+    Args:
+        cursor: el cursor recibido del cliente.
+        sort: el campo de ordenamiento de la peticion.
+        order: la direccion del ordenamiento de la peticion.
+
+    Returns:
+        una tupla (valor, id) de la ultima fila vista o None si no hay cursor, lanza InvalidCursorError si es invalido,
+        incluso si el valor no tiene el tipo del campo de ordenamiento.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+    if cursor_sort != sort or cursor_order != order:
+        raise InvalidCursorError("Cursor does not match the requested sort order")
+    check = CURSOR_VALUE_CHECKS.get(sort)
+    if not _is_int(last_id) or check is None or not check(value):
+        raise InvalidCursorError("Malformed cursor")
+    if sort == "legend_date":
+        try:
+            value = datetime.fromisoformat(value)
+        except (ValueError, TypeError) as e:
+            raise InvalidCursorError("Malformed cursor") from e
+    return value, last_id
@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from decouple import config
+from passlib.context import CryptContext
+
+
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=2, cast=int)
+PASSWORD_HASH_CONCURRENCY = config("PASSWORD_HASH_CONCURRENCY", default=PASSWORD_HASH_WORKERS, cast=int)
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Ejecuta el hash y la verificacion de contraseñas con bcrypt en un pool de procesos propio, con un limite de
+    operaciones simultaneas para que una rafaga de inicios de sesion no ocupe los hilos de las demas rutas.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, concurrency: int = PASSWORD_HASH_CONCURRENCY):
+        self.workers = workers
+        self.concurrency = concurrency
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def _run(self, function, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_pool(), function, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """
+        Genera el hash de una contraseña.
+
+        Args:
+            password: la contraseña en texto plano.
+
+        Returns:
+            el hash de la contraseña.
+        """
+        return await self._run(_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        Verifica una contraseña y genera un nuevo hash si el guardado usa parametros obsoletos,
+        por ejemplo un costo de bcrypt distinto a BCRYPT_ROUNDS.
+
+        Args:
+            password: la contraseña en texto plano.
+            hashed_password: el hash guardado.
+
+        Returns:
+            una tupla con el resultado de la verificacion y el nuevo hash, o None si no hace falta actualizarlo.
+        """
+        return await self._run(_verify_and_update, password, hashed_password)
+
+    def metrics(self) -> dict[str, int]:
+        return {
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        self._semaphore = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.province_model import Province
+from app.models.canton_model import Canton
+from app.models.district_model import District
+from app.models.category_model import Category
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    provinces: tuple[Province, ...]
+    cantons: tuple[Canton, ...]
+    districts: tuple[District, ...]
+    categories: tuple[Category, ...]
+    provinces_by_id: Mapping[int, Province]
+    cantons_by_id: Mapping[int, Canton]
+    districts_by_id: Mapping[int, District]
+    categories_by_id: Mapping[int, Category]
+    cantons_by_province: Mapping[int, tuple[Canton, ...]]
+    districts_by_canton: Mapping[int, tuple[District, ...]]
+    districts_by_province: Mapping[int, tuple[District, ...]]
+    tree_json: bytes
+    etag: str
+
+
+_reference_data: Optional[ReferenceData] = None
+_lock = threading.Lock()
+
+
+def _group(items, key) -> Mapping[int, tuple]:
+    groups: dict[int, list] = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return MappingProxyType({group_id: tuple(values) for group_id, values in groups.items()})
+
+
+def load_reference_data(session: Session) -> ReferenceData:
+    """
+    Carga las provincias, cantones, distritos y categorias de la base de datos y construye el indice inmutable en memoria.
+
+    Args:
+        session: la sesión de la base de datos.
+
+    Returns:
+        los datos de referencia indexados por id y por id del padre, junto al arbol serializado.
+    """
+    provinces = tuple(Province(id=p.id, name=p.name) for p in session.exec(select(Province).order_by(Province.id)))
+    cantons = tuple(
+        Canton(id=c.id, name=c.name, province_id=c.province_id)
+        for c in session.exec(select(Canton).order_by(Canton.id))
+    )
+    districts = tuple(
+        District(id=d.id, name=d.name, canton_id=d.canton_id)
+        for d in session.exec(select(District).order_by(District.id))
+    )
+    categories = tuple(Category(id=c.id, name=c.name) for c in session.exec(select(Category).order_by(Category.id)))
+
+    cantons_by_id = MappingProxyType({c.id: c for c in cantons})
+    cantons_by_province = _group(cantons, lambda c: c.province_id)
+    districts_by_canton = _group(districts, lambda d: d.canton_id)
+    districts_by_province = _group(districts, lambda d: cantons_by_id[d.canton_id].province_id)
+
+    tree = {
+        "provinces": [
+            {
+                "id": province.id,
+                "name": province.name,
+                "cantons": [
+                    {
+                        "id": canton.id,
+                        "name": canton.name,
+                        "districts": [
+                            {"id": district.id, "name": district.name}
+                            for district in districts_by_canton.get(canton.id, ())
+                        ],
+                    }
+                    for canton in cantons_by_province.get(province.id, ())
+                ],
+            }
+            for province in provinces
+        ],
+        "categories": [{"id": category.id, "name": category.name} for category in categories],
+    }
+    tree_json = json.dumps(tree, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    return ReferenceData(
+        provinces=provinces,
+        cantons=cantons,
+        districts=districts,
+        categories=categories,
+        provinces_by_id=MappingProxyType({p.id: p for p in provinces}),
+        cantons_by_id=cantons_by_id,
+        districts_by_id=MappingProxyType({d.id: d for d in districts}),
+        categories_by_id=MappingProxyType({c.id: c for c in categories}),
+        cantons_by_province=cantons_by_province,
+        districts_by_canton=districts_by_canton,
+        districts_by_province=districts_by_province,
+        tree_json=tree_json,
+        etag='"' + hashlib.sha1(tree_json).hexdigest() + '"',
+    )
+
+
+def refresh_reference_cache(session: Session) -> ReferenceData:
+    """
+    Recarga los datos de referencia desde la base de datos y reemplaza atomicamente el indice en memoria.
+
+    Args:
+        session: la sesión de la base de datos.
+
+    Returns:
+        los nuevos datos de referencia.
+    """
+    global _reference_data
+    data = load_reference_data(session)
+    with _lock:
+        _reference_data = data
+    return data
+
+
+def get_reference_data(session: Session) -> ReferenceData:
+    """
+    Obtiene el indice de datos de referencia, cargandolo desde la base de datos si aun no se ha cargado.
+
+    Args:
+        session: la sesión de la base de datos, usada solo si el indice no esta cargado.
+
+    Returns:
+        los datos de referencia en memoria.
+    """
+    data = _reference_data
+    if data is None:
+        with _lock:
+            data = _reference_data
+        if data is None:
+            data = refresh_reference_cache(session)
+    return data
+
+
+async def get_reference_data_async(session: AsyncSession) -> ReferenceData:
+    """
+    Obtiene el indice de datos de referencia desde una sesión asincrona, cargandolo si aun no se ha cargado.
+
+    Args:
+        session: la sesión asincrona de la base de datos, usada solo si el indice no esta cargado.
+
+    Returns:
+        los datos de referencia en memoria.
+    """
+    data = _reference_data
+    if data is None:
+        data = await session.run_sync(get_reference_data)
+    return data
+
+
+async def refresh_reference_cache_async(session: AsyncSession) -> ReferenceData:
+    """
+    Recarga los datos de referencia desde una sesión asincrona.
+
+    Args:
+        session: la sesión asincrona de la base de datos.
+
+    Returns:
+        los nuevos datos de referencia.
+    """
+    return await session.run_sync(refresh_reference_cache)
@@ -0,0 +1,134 @@
+import hashlib
+import itertools
+from typing import Optional
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from sqlmodel import Session
+from decouple import config, Csv
+from app.core.shared_cache import InMemoryBroker, cache_get, cache_set, get_shared_cache
+
+
+DATABASE_REPLICA_URLS = config("DATABASE_REPLICA_URLS", default="", cast=Csv())
+REPLICA_STRATEGY = config("REPLICA_STRATEGY", default="round_robin")
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=5, cast=int)
+REPLICA_STRATEGIES = ("round_robin", "least_connections")
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class WriteTrackingSession(Session):
+    """
+    Sesion que registra en info["committed_write"] si confirmo alguna escritura, ya sea por un flush del ORM o por
+    una sentencia INSERT, UPDATE o DELETE ejecutada en la sesion. Una transaccion revertida no cuenta.
+    """
+
+
+@event.listens_for(WriteTrackingSession, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["pending_write"] = True
+
+
+@event.listens_for(WriteTrackingSession, "after_flush")
+def _track_flush(session, flush_context):
+    session.info["pending_write"] = True
+
+
+@event.listens_for(WriteTrackingSession, "after_commit")
+def _track_commit(session):
+    if session.info.pop("pending_write", False):
+        session.info["committed_write"] = True
+
+
+@event.listens_for(WriteTrackingSession, "after_rollback")
+def _track_rollback(session):
+    session.info.pop("pending_write", None)
+
+
+def _checked_out(engine) -> int:
+    pool = engine.pool
+    return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+
+def sticky_key(request: Request) -> str:
+    """
+    Identifica al autor de las peticiones para la ventana de lectura de sus propias escrituras: el token Bearer si
+    la peticion lo trae y si no la direccion del cliente. Del token solo se guarda un hash.
+
+    Args:
+        request: la peticion.
+
+    Returns:
+        la clave de la ventana en la cache compartida.
+    """
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return "sticky:token:" + hashlib.sha1(authorization.encode()).hexdigest()[:20]
+    return "sticky:client:" + (request.client.host if request.client else "unknown")
+
+
+class ReplicaRouter:
+    """
+    Elige el engine de cada peticion: las escrituras y las lecturas de quien escribio hace menos de
+    REPLICA_STICKY_SECONDS van a la base principal, las demas lecturas a una replica elegida por turnos
+    (round_robin) o por la menor cantidad de conexiones prestadas (least_connections). La ventana se guarda en la
+    cache compartida para que la respeten todos los workers.
+    """
+
+    def __init__(self, primary, replicas: list, strategy: str = REPLICA_STRATEGY, sticky_seconds: int = REPLICA_STICKY_SECONDS):
+        if strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"Unknown REPLICA_STRATEGY: {strategy}")
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self._turn = itertools.count()
+
+    def choose_replica(self):
+        """
+        Elige la replica de una lectura, con least_connections los empates se resuelven por turnos.
+
+        Returns:
+            el engine de la replica, el principal si no hay replicas configuradas.
+        """
+        if not self.replicas:
+            return self.primary
+        start = next(self._turn) % len(self.replicas)
+        if self.strategy == "round_robin":
+            return self.replicas[start]
+        return min(self.replicas[start:] + self.replicas[:start], key=_checked_out)
+
+    async def engine_for(self, request: Request):
+        """
+        Obtiene el engine al que se envia la sesion de una peticion.
+
+        Args:
+            request: la peticion.
+
+        Returns:
+            el engine principal o el de una replica.
+        """
+        if not self.replicas or request.method not in SAFE_METHODS:
+            return self.primary
+        if self.sticky_seconds > 0 and await _run(cache_get, sticky_key(request)) is not None:
+            return self.primary
+        return self.choose_replica()
+
+    async def record_write(self, request: Request, session):
+        """
+        Abre la ventana en que las lecturas del autor de una escritura se envian a la base principal, solo si la
+        sesion de la peticion confirmo cambios: un inicio de sesion u otra peticion POST que no escribe no la abre.
+
+        Args:
+            request: la peticion.
+            session: la sesion de la peticion, creada con WriteTrackingSession.
+        """
+        if self.replicas and self.sticky_seconds > 0 and session.info.get("committed_write"):
+            await _run(cache_set, sticky_key(request), b"1", self.sticky_seconds)
+
+
+async def _run(function, *args) -> Optional[bytes]:
+    if isinstance(get_shared_cache(), InMemoryBroker):
+        return function(*args)
+    return await run_in_threadpool(function, *args)
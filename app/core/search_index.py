@@ -0,0 +1,240 @@
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from typing import Iterable
+from sqlalchemy import Column, Integer, MetaData, Table, text
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, select
+from app.models.legend_model import Legend
+
+
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+PREFIX_MATCH_FACTOR = 0.5
+MIN_PREFIX_LENGTH = 3
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """
+    Normaliza un texto eliminando tildes y diferencias de mayusculas, por ejemplo "José" -> "jose".
+
+    Args:
+        text: el texto a normalizar.
+
+    Returns:
+        el texto normalizado.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Separa un texto normalizado en palabras.
+
+    Args:
+        text: el texto a separar.
+
+    Returns:
+        la lista de palabras normalizadas.
+    """
+    return _TOKEN_RE.findall(fold(text or ""))
+
+
+class LegendSearchIndex:
+    """
+    Indice invertido en memoria sobre el nombre y la descripcion de las leyendas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: dict[str, dict[int, float]] = {}
+        self._documents: dict[int, tuple[str, ...]] = {}
+        self._sorted_tokens: list[str] = []
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _weights(self, name: str, description: str) -> dict[str, float]:
+        weights: dict[str, float] = {}
+        for token in tokenize(name):
+            weights[token] = weights.get(token, 0.0) + NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] = weights.get(token, 0.0) + DESCRIPTION_WEIGHT
+        return weights
+
+    def _remove_locked(self, legend_id: int):
+        for token in self._documents.pop(legend_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(legend_id, None)
+            if not postings:
+                del self._postings[token]
+                self._dirty = True
+
+    def _add_locked(self, legend_id: int, name: str, description: str):
+        weights = self._weights(name, description)
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._dirty = True
+            postings[legend_id] = weight
+        self._documents[legend_id] = tuple(weights)
+
+    def add(self, legend_id: int, name: str, description: str):
+        """
+        Agrega o reemplaza una leyenda en el indice.
+
+        Args:
+            legend_id: el id de la leyenda.
+            name: el nombre de la leyenda.
+            description: la descripcion de la leyenda.
+        """
+        with self._lock:
+            self._remove_locked(legend_id)
+            self._add_locked(legend_id, name, description)
+
+    def remove(self, legend_id: int):
+        """
+        Elimina una leyenda del indice.
+
+        Args:
+            legend_id: el id de la leyenda.
+        """
+        with self._lock:
+            self._remove_locked(legend_id)
+
+    def rebuild(self, documents: Iterable[tuple[int, str, str]]):
+        """
+        Reconstruye el indice completo a partir de tuplas (id, nombre, descripcion).
+
+        Args:
+            documents: las leyendas a indexar.
+        """
+        with self._lock:
+            self._postings = {}
+            self._documents = {}
+            for legend_id, name, description in documents:
+                self._add_locked(legend_id, name, description)
+            self._dirty = True
+
+    def _expand_prefix_locked(self, prefix: str) -> list[str]:
+        if self._dirty:
+            self._sorted_tokens = sorted(self._postings)
+            self._dirty = False
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        tokens = []
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def search(self, query: str) -> dict[int, float]:
+        """
+        Busca las leyendas que contienen todas las palabras de la consulta, la ultima palabra se trata como prefijo
+        si tiene al menos MIN_PREFIX_LENGTH letras: un prefijo de una o dos letras coincidiria con casi todas las
+        leyendas.
+
+        Args:
+            query: el texto a buscar.
+
+        Returns:
+            un diccionario de id de leyenda a puntaje de relevancia, vacio si no hay coincidencias.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return {}
+        with self._lock:
+            total = len(self._documents) or 1
+            scores: dict[int, float] | None = None
+            for position, term in enumerate(terms):
+                if position == len(terms) - 1 and len(term) >= MIN_PREFIX_LENGTH:
+                    tokens = self._expand_prefix_locked(term)
+                else:
+                    tokens = [term] if term in self._postings else []
+                matching = set()
+                for token in tokens:
+                    matching.update(self._postings[token])
+                idf = math.log(1 + total / len(matching)) if matching else 0.0
+                term_scores: dict[int, float] = {}
+                for token in tokens:
+                    factor = 1.0 if token == term else PREFIX_MATCH_FACTOR
+                    for legend_id, weight in self._postings[token].items():
+                        score = weight * idf * factor
+                        if score > term_scores.get(legend_id, 0.0):
+                            term_scores[legend_id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        legend_id: score + term_scores[legend_id]
+                        for legend_id, score in scores.items()
+                        if legend_id in term_scores
+                    }
+                if not scores:
+                    return {}
+            return scores
+
+
+legend_search_index = LegendSearchIndex()
+
+search_hits = Table(
+    "search_hits",
+    MetaData(),
+    Column("legend_id", Integer, primary_key=True),
+    prefixes=["TEMPORARY"],
+)
+
+
+def drop_search_hits(connection: Connection):
+    """
+    Elimina la tabla temporal de resultados de la conexion, si existe. En MySQL se usa DROP TEMPORARY TABLE, que a
+    diferencia de DROP TABLE no confirma la transaccion en curso.
+
+    Args:
+        connection: la conexion de la sesion.
+    """
+    keyword = "TEMPORARY TABLE" if connection.dialect.name == "mysql" else "TABLE"
+    connection.execute(text(f"DROP {keyword} IF EXISTS {search_hits.name}"))
+
+
+def load_search_hits(connection: Connection, legend_ids: Iterable[int]) -> Table:
+    """
+    Carga los ids encontrados por el indice de busqueda en la tabla temporal search_hits de la conexion, para unirla
+    a las consultas en lugar de enviar una lista IN del tamaño de los resultados. La tabla se reemplaza si quedo de
+    un uso anterior de la conexion.
+
+    Args:
+        connection: la conexion de la sesion.
+        legend_ids: los ids de las leyendas encontradas.
+
+    Returns:
+        la tabla temporal cargada.
+    """
+    drop_search_hits(connection)
+    search_hits.create(connection)
+    connection.execute(search_hits.insert(), [{"legend_id": legend_id} for legend_id in legend_ids])
+    return search_hits
+
+
+def load_search_index(session: Session) -> LegendSearchIndex:
+    """
+    Carga en el indice de busqueda el nombre y la descripcion de todas las leyendas de la base de datos.
+
+    Args:
+        session: la sesión de la base de datos.
+
+    Returns:
+        el indice de busqueda cargado.
+    """
+    rows = session.exec(select(Legend.id, Legend.name, Legend.description))
+    legend_search_index.rebuild(rows)
+    return legend_search_index
@@ -0,0 +1,470 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterator, Optional, Protocol
+from decouple import config
+
+
+SHARED_CACHE_BACKEND = config("SHARED_CACHE_BACKEND", default="memory")
+SHARED_CACHE_PATH = config("SHARED_CACHE_PATH", default="shared_cache.sqlite3")
+SHARED_CACHE_URL = config("SHARED_CACHE_URL", default="redis://localhost:6379/0")
+SHARED_CACHE_PREFIX = config("SHARED_CACHE_PREFIX", default="legends:")
+SHARED_CACHE_TTL = config("SHARED_CACHE_TTL", default=300, cast=int)
+INVALIDATION_POLL_SECONDS = config("INVALIDATION_POLL_SECONDS", default=0.5, cast=float)
+INVALIDATION_CHANNEL = "invalidations"
+INVALIDATION_RETENTION_SECONDS = 300.0
+BUCKET_MAX_KEYS = 100_000
+
+_instance = uuid.uuid4().hex[:8]
+
+
+def worker_id() -> str:
+    """
+    Identifica el proceso actual, se calcula en cada llamada para distinguir a los procesos creados con fork.
+
+    Returns:
+        el host, el pid y un sufijo aleatorio del proceso.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{_instance}"
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    def set(self, key: str, value: bytes, ttl: int):
+        ...
+
+    def delete(self, key: str):
+        ...
+
+    def publish(self, channel: str, message: bytes):
+        ...
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> Callable[[], None]:
+        ...
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1) -> float:
+        """
+        Consume fichas de un token bucket de forma atomica entre los workers que comparten el backend.
+
+        Args:
+            key: la clave del bucket.
+            capacity: la cantidad maxima de fichas, el bucket nuevo empieza lleno.
+            refill_per_second: las fichas que se recuperan por segundo.
+            cost: las fichas que consume la operacion.
+
+        Returns:
+            0 si se consumieron las fichas, si no los segundos que faltan para que alcancen.
+        """
+        ...
+
+
+def _refill(tokens: float, elapsed: float, capacity: float, refill_per_second: float, cost: float) -> tuple[float, float]:
+    tokens = min(capacity, tokens + max(elapsed, 0) * refill_per_second)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / refill_per_second
+
+
+class InMemoryBroker:
+    """
+    Cache y canal de mensajes en memoria del proceso. Es el backend por defecto con un solo worker y sirve de broker
+    falso en pruebas: varios InvalidationBus conectados al mismo broker simulan varios workers.
+    """
+
+    def __init__(self):
+        self._values: dict[str, tuple[bytes, float]] = {}
+        self._subscribers: dict[str, list[Callable[[bytes], None]]] = {}
+        self._buckets: dict[str, tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._values[key]
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def publish(self, channel: str, message: bytes):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for callback in subscribers:
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> Callable[[], None]:
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers[channel].remove(callback)
+        return unsubscribe
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1) -> float:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) >= BUCKET_MAX_KEYS:
+                self._buckets = {
+                    bucket_key: bucket for bucket_key, bucket in self._buckets.items() if bucket[2] > now
+                }
+                if len(self._buckets) >= BUCKET_MAX_KEYS:
+                    self._buckets.clear()
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens, retry_after = _refill(tokens, now - updated, capacity, refill_per_second, cost)
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_per_second)
+        return retry_after
+
+
+class SQLiteCacheBackend:
+    """
+    Cache y canal de mensajes compartidos por los workers de un mismo host mediante un archivo SQLite local.
+    Los mensajes se guardan en una tabla y cada suscriptor la consulta cada INVALIDATION_POLL_SECONDS.
+    """
+
+    def __init__(self, path: str, poll_seconds: float = INVALIDATION_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    full_at REAL NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    message BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: int):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl)
+            )
+            connection.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+
+    def delete(self, key: str):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def publish(self, channel: str, message: bytes):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO cache_messages (channel, message, created_at) VALUES (?, ?, ?)", (channel, message, now)
+            )
+            connection.execute("DELETE FROM cache_messages WHERE created_at < ?", (now - INVALIDATION_RETENTION_SECONDS,))
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> Callable[[], None]:
+        stopped = threading.Event()
+        with self._connect() as connection:
+            last_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM cache_messages").fetchone()[0]
+
+        def poll():
+            nonlocal last_id
+            while not stopped.wait(self.poll_seconds):
+                try:
+                    with self._connect() as connection:
+                        rows = connection.execute(
+                            "SELECT id, message FROM cache_messages WHERE id > ? AND channel = ? ORDER BY id",
+                            (last_id, channel),
+                        ).fetchall()
+                except sqlite3.Error as e:
+                    print(f"Error reading shared cache messages: {e}")
+                    continue
+                for message_id, message in rows:
+                    last_id = message_id
+                    callback(message)
+
+        thread = threading.Thread(target=poll, name="shared-cache-subscriber", daemon=True)
+        thread.start()
+
+        def unsubscribe():
+            stopped.set()
+            thread.join(timeout=self.poll_seconds * 4)
+        return unsubscribe
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1) -> float:
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                tokens, retry_after = _refill(tokens, now - updated, capacity, refill_per_second, cost)
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, now + (capacity - tokens) / refill_per_second),
+                )
+                if row is None:
+                    connection.execute("DELETE FROM rate_limit_buckets WHERE full_at < ?", (now,))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return retry_after
+
+
+REDIS_TAKE_SCRIPT = """
+local capacity, rate, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RedisCacheBackend:
+    """
+    Cache y canal de mensajes compartidos entre hosts mediante un servidor compatible con el protocolo de Redis.
+    """
+
+    def __init__(self, url: str, prefix: str = SHARED_CACHE_PREFIX, poll_seconds: float = INVALIDATION_POLL_SECONDS):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis shared cache backend requires the redis package (pip install redis)") from e
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.poll_seconds = poll_seconds
+        self._take = self.client.register_script(REDIS_TAKE_SCRIPT)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def publish(self, channel: str, message: bytes):
+        self.client.publish(self.prefix + channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> Callable[[], None]:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.prefix + channel: lambda message: callback(message["data"])})
+        thread = pubsub.run_in_thread(sleep_time=self.poll_seconds, daemon=True)
+
+        def unsubscribe():
+            thread.stop()
+            pubsub.close()
+        return unsubscribe
+
+    def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1) -> float:
+        return float(self._take(
+            keys=[self.prefix + "bucket:" + key], args=[capacity, refill_per_second, cost, time.time()]
+        ))
+
+
+@lru_cache
+def _create_backend(backend: str) -> CacheBackend:
+    if backend == "memory":
+        return InMemoryBroker()
+    if backend == "sqlite":
+        return SQLiteCacheBackend(SHARED_CACHE_PATH)
+    if backend == "redis":
+        return RedisCacheBackend(SHARED_CACHE_URL)
+    raise ValueError(f"Unknown shared cache backend: {backend}")
+
+
+def get_shared_cache(backend: str = SHARED_CACHE_BACKEND) -> CacheBackend:
+    """
+    Obtiene un backend de cache compartida, por defecto el configurado mediante SHARED_CACHE_BACKEND. Las llamadas
+    con el mismo nombre comparten la instancia.
+
+    Args:
+        backend: el nombre del backend (memory, sqlite o redis).
+
+    Returns:
+        la instancia del backend.
+    """
+    return _create_backend(backend)
+
+
+def cache_get(key: str) -> Optional[bytes]:
+    """
+    Lee un valor de la cache compartida, los errores del backend se tratan como un fallo de cache.
+
+    Args:
+        key: la clave.
+
+    Returns:
+        el valor o None si no esta en cache.
+    """
+    try:
+        return get_shared_cache().get(key)
+    except Exception as e:
+        print(f"Error reading shared cache: {e}")
+        return None
+
+
+def cache_set(key: str, value: bytes, ttl: int = SHARED_CACHE_TTL):
+    """
+    Guarda un valor en la cache compartida, los errores del backend solo se imprimen.
+
+    Args:
+        key: la clave.
+        value: el valor.
+        ttl: los segundos de vigencia, 0 desactiva la cache.
+    """
+    if ttl <= 0:
+        return
+    try:
+        get_shared_cache().set(key, value, ttl)
+    except Exception as e:
+        print(f"Error writing shared cache: {e}")
+
+
+invalidation_handlers: dict[str, list[Callable[[dict], None]]] = {}
+
+
+def on_invalidation(kind: str):
+    """
+    Registra una funcion que aplica en este worker las invalidaciones publicadas por los demas.
+
+    Args:
+        kind: el tipo de invalidacion, por ejemplo "legends".
+
+    Returns:
+        el decorador que registra la funcion, que recibe el mensaje como diccionario.
+    """
+    def register(handler: Callable[[dict], None]):
+        invalidation_handlers.setdefault(kind, []).append(handler)
+        return handler
+    return register
+
+
+class InvalidationBus:
+    """
+    Publica las invalidaciones de las escrituras y aplica las que publican los demas workers, cada worker
+    ignora los mensajes que el mismo publico porque ya actualizo sus caches en memoria.
+    """
+
+    def __init__(self, backend: CacheBackend, worker: Optional[str] = None, handlers: Optional[dict] = None):
+        self.backend = backend
+        self.worker = worker
+        self.handlers = invalidation_handlers if handlers is None else handlers
+        self._unsubscribe: Optional[Callable[[], None]] = None
+
+    @property
+    def origin(self) -> str:
+        return self.worker or worker_id()
+
+    def publish(self, kind: str, **data):
+        """
+        Publica una invalidacion, los errores del backend solo se imprimen porque la escritura ya se confirmo.
+
+        Args:
+            kind: el tipo de invalidacion.
+            data: los datos del mensaje, por ejemplo los ids afectados y la nueva version de la tabla.
+        """
+        message = json.dumps({"kind": kind, "origin": self.origin, **data}).encode()
+        try:
+            self.backend.publish(INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            print(f"Error publishing {kind} invalidation: {e}")
+
+    def dispatch(self, raw: bytes):
+        message = json.loads(raw)
+        if message.get("origin") == self.origin:
+            return
+        for handler in self.handlers.get(message.get("kind"), ()):
+            try:
+                handler(message)
+            except Exception as e:
+                print(f"Error applying {message.get('kind')} invalidation: {e}")
+
+    def start(self):
+        if self._unsubscribe is None:
+            self._unsubscribe = self.backend.subscribe(INVALIDATION_CHANNEL, self.dispatch)
+
+    def stop(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+
+@lru_cache
+def get_invalidation_bus() -> InvalidationBus:
+    return InvalidationBus(get_shared_cache())
+
+
+def publish_invalidation(kind: str, **data):
+    """
+    Publica una invalidacion en el canal compartido del backend configurado.
+
+    Args:
+        kind: el tipo de invalidacion.
+        data: los datos del mensaje.
+    """
+    get_invalidation_bus().publish(kind, **data)
+
+
+def start_invalidation_listener():
+    get_invalidation_bus().start()
+
+
+def stop_invalidation_listener():
+    get_invalidation_bus().stop()
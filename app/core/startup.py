@@ -0,0 +1,41 @@
+import time
+from contextlib import contextmanager
+
+
+startup_timings: dict[str, float] = {}
+
+
+@contextmanager
+def startup_phase(name: str):
+    """
+    Mide la duracion de una fase del arranque, la imprime y la registra en startup_timings.
+
+    Args:
+        name: el nombre de la fase.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        startup_timings[name] = round(elapsed, 4)
+        print(f"Startup phase {name} completed in {elapsed:.3f}s")
+
+
+def startup_summary() -> dict[str, float]:
+    """
+    Obtiene la duracion de cada fase del ultimo arranque.
+
+    Returns:
+        la duracion en segundos de cada fase y el total.
+    """
+    return {**startup_timings, "total": round(sum(startup_timings.values()), 4)}
+
+
+def report_startup():
+    """
+    Imprime el resumen de las fases del arranque.
+    """
+    summary = startup_summary()
+    phases = ", ".join(f"{name}={elapsed:.3f}s" for name, elapsed in startup_timings.items())
+    print(f"Startup completed in {summary['total']:.3f}s ({phases})")
@@ -0,0 +1,86 @@
+import os
+import shutil
+import uuid
+from functools import lru_cache
+from typing import Protocol
+from decouple import config
+
+
+STORAGE_BACKEND = config("STORAGE_BACKEND", default="cloudinary")
+LOCAL_STORAGE_DIR = config("LOCAL_STORAGE_DIR", default="media")
+LOCAL_STORAGE_BASE_URL = config("LOCAL_STORAGE_BASE_URL", default="/media")
+IMAGE_FOLDER = "legendsImages"
+
+
+class StorageBackend(Protocol):
+    def upload(self, path: str, folder: str) -> tuple[str, str]:
+        ...
+
+    def delete(self, public_id: str) -> bool:
+        ...
+
+
+class LocalStorage:
+    """
+    Almacenamiento de imagenes en el sistema de archivos local, util en desarrollo y pruebas en lugar de cloudinary.
+    """
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, public_id: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, public_id))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Invalid public id: {public_id}")
+        return path
+
+    def upload(self, path: str, folder: str) -> tuple[str, str]:
+        """
+        Copia un archivo al directorio de almacenamiento.
+
+        Args:
+            path: la ruta del archivo a almacenar.
+            folder: la carpeta de destino.
+
+        Returns:
+            una tupla con la url publica y el identificador del archivo.
+        """
+        extension = os.path.splitext(path)[1].lower()
+        public_id = f"{folder}/{uuid.uuid4().hex}{extension}"
+        destination = self._path(public_id)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(path, destination)
+        return f"{self.base_url}/{public_id}", public_id
+
+    def delete(self, public_id: str) -> bool:
+        """
+        Elimina un archivo del directorio de almacenamiento.
+
+        Args:
+            public_id: el identificador del archivo.
+
+        Returns:
+            True si el archivo se elimino, False si no existia.
+        """
+        try:
+            os.remove(self._path(public_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """
+    Obtiene el backend de almacenamiento configurado mediante STORAGE_BACKEND (cloudinary o local).
+
+    Returns:
+        la instancia del backend de almacenamiento.
+    """
+    if STORAGE_BACKEND == "local":
+        return LocalStorage(LOCAL_STORAGE_DIR, LOCAL_STORAGE_BASE_URL)
+    if STORAGE_BACKEND == "cloudinary":
+        from app.core.cloudinary_service import CloudinaryStorage
+        return CloudinaryStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
@@ -0,0 +1,59 @@
+from typing import AsyncIterator, Iterable, Optional
+import orjson
+from decouple import config
+
+
+STREAM_BATCH_SIZE = config("STREAM_BATCH_SIZE", default=500, cast=int)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+
+def wants_stream(accept: Optional[str], stream: bool) -> Optional[str]:
+    """
+    Determina si la respuesta se debe transmitir por partes y en que formato.
+
+    Args:
+        accept: el encabezado Accept de la peticion.
+        stream: el parametro stream de la consulta.
+
+    Returns:
+        application/x-ndjson si el cliente lo acepta, application/json si pidio stream=1, None para la respuesta normal.
+    """
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        return NDJSON_MEDIA_TYPE
+    if stream:
+        return JSON_MEDIA_TYPE
+    return None
+
+
+def encode_ndjson(items: Iterable[dict]) -> bytes:
+    return b"".join(orjson.dumps(item) + b"\n" for item in items)
+
+
+async def encode_stream(batches: AsyncIterator[list[dict]], media_type: str) -> AsyncIterator[bytes]:
+    """
+    Codifica los lotes de filas a medida que llegan, como NDJSON (una fila por linea) o como un arreglo JSON.
+
+    Args:
+        batches: los lotes de filas como diccionarios.
+        media_type: el formato de salida.
+
+    Returns:
+        un iterador de bloques de bytes, uno por lote.
+    """
+    if media_type == NDJSON_MEDIA_TYPE:
+        async for batch in batches:
+            if batch:
+                yield encode_ndjson(batch)
+        return
+
+    yield b"["
+    first = True
+    async for batch in batches:
+        if not batch:
+            continue
+        chunk = b",".join(orjson.dumps(item) for item in batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
+from decouple import config
+
+
+TOKEN_CACHE_SIZE = config("TOKEN_CACHE_SIZE", default=10000, cast=int)
+
+T = TypeVar("T")
+
+
+class TokenCache(Generic[T]):
+    """
+    Cache LRU acotado de tokens ya verificados hacia el usuario que representan.
+    Cada entrada vence en la fecha de expiracion del token y puede invalidarse por usuario.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[T, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[T]:
+        """
+        Busca el usuario de un token verificado previamente.
+
+        Args:
+            token: el token recibido en la peticion.
+
+        Returns:
+            el usuario del token o None si no esta en el cache o ya expiro.
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            principal, _, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: T, user_id: int, expires_at: float):
+        """
+        Guarda un token verificado, descartando el usado hace mas tiempo si el cache esta lleno.
+
+        Args:
+            token: el token verificado.
+            principal: el usuario del token.
+            user_id: el id del usuario, usado para invalidar sus tokens.
+            expires_at: la fecha de expiracion del token como timestamp.
+        """
+        if expires_at <= time.time() or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (principal, user_id, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        Elimina del cache todos los tokens de un usuario, por ejemplo cuando el usuario se elimina.
+
+        Args:
+            user_id: el id del usuario.
+
+        Returns:
+            la cantidad de tokens eliminados.
+        """
+        with self._lock:
+            tokens = [token for token, (_, owner, _) in self._entries.items() if owner == user_id]
+            for token in tokens:
+                del self._entries[token]
+            return len(tokens)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache: TokenCache = TokenCache()
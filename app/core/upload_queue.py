@@ -0,0 +1,346 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+from decouple import config
+
+
+UPLOAD_QUEUE_PATH = config("UPLOAD_QUEUE_PATH", default="upload_queue.sqlite3")
+UPLOAD_WORKERS = config("UPLOAD_WORKERS", default=2, cast=int)
+UPLOAD_MAX_ATTEMPTS = config("UPLOAD_MAX_ATTEMPTS", default=5, cast=int)
+UPLOAD_RETRY_BASE_SECONDS = config("UPLOAD_RETRY_BASE_SECONDS", default=2.0, cast=float)
+UPLOAD_RETRY_MAX_SECONDS = 300.0
+UPLOAD_POLL_SECONDS = 0.5
+UPLOAD_DONE_RETENTION_HOURS = config("UPLOAD_DONE_RETENTION_HOURS", default=24.0, cast=float)
+UPLOAD_FAILED_RETENTION_HOURS = config("UPLOAD_FAILED_RETENTION_HOURS", default=168.0, cast=float)
+UPLOAD_PRUNE_INTERVAL_SECONDS = 3600.0
+
+
+class PermanentJobError(Exception):
+    """
+    Error de un trabajo que no debe reintentarse.
+    """
+
+
+@dataclass(frozen=True)
+class Job:
+    id: int
+    kind: str
+    legend_id: Optional[int]
+    payload: dict
+    attempts: int
+
+
+class UploadQueue:
+    """
+    Cola de trabajos persistente en un archivo SQLite local, sobrevive a reinicios del proceso.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS upload_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    legend_id INTEGER,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_pid INTEGER,
+                    run_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    finished_at REAL
+                )
+                """
+            )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(upload_jobs)")}
+            if "finished_at" not in columns:
+                connection.execute("ALTER TABLE upload_jobs ADD COLUMN finished_at REAL")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_upload_jobs_status_run_at ON upload_jobs (status, run_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def enqueue(self, kind: str, legend_id: Optional[int], payload: dict) -> int:
+        """
+        Agrega un trabajo a la cola.
+
+        Args:
+            kind: el tipo de trabajo.
+            legend_id: el id de la leyenda asociada, los trabajos de una misma leyenda se ejecutan en orden.
+            payload: los datos del trabajo.
+
+        Returns:
+            el id del trabajo.
+        """
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO upload_jobs (kind, legend_id, payload, run_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, legend_id, json.dumps(payload), now, now),
+            )
+            return cursor.lastrowid
+
+    def enqueue_many(self, kind: str, jobs: list[tuple[Optional[int], dict]]) -> int:
+        """
+        Agrega varios trabajos del mismo tipo a la cola en una sola transaccion.
+
+        Args:
+            kind: el tipo de trabajo.
+            jobs: las tuplas (id de la leyenda, datos del trabajo).
+
+        Returns:
+            la cantidad de trabajos agregados.
+        """
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT INTO upload_jobs (kind, legend_id, payload, run_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(kind, legend_id, json.dumps(payload), now, now) for legend_id, payload in jobs],
+            )
+            connection.execute("COMMIT")
+        return len(jobs)
+
+    def claim(self) -> Optional[Job]:
+        """
+        Toma el siguiente trabajo listo para ejecutarse, respetando el orden de los trabajos de cada leyenda.
+
+        Returns:
+            el trabajo tomado o None si no hay trabajos listos.
+        """
+        with self._lock, self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                """
+                SELECT id, kind, legend_id, payload, attempts FROM upload_jobs AS job
+                WHERE status = 'queued' AND run_at <= ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM upload_jobs AS previous
+                    WHERE previous.legend_id = job.legend_id AND previous.id < job.id
+                    AND previous.status IN ('queued', 'running')
+                )
+                ORDER BY id LIMIT 1
+                """,
+                (time.time(),),
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            connection.execute(
+                "UPDATE upload_jobs SET status = 'running', attempts = attempts + 1, worker_pid = ? WHERE id = ?",
+                (os.getpid(), row[0]),
+            )
+            connection.execute("COMMIT")
+        return Job(id=row[0], kind=row[1], legend_id=row[2], payload=json.loads(row[3]), attempts=row[4] + 1)
+
+    def complete(self, job_id: int):
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "UPDATE upload_jobs SET status = 'done', last_error = NULL, finished_at = ? WHERE id = ?",
+                (time.time(), job_id),
+            )
+
+    def retry(self, job_id: int, delay: float, error: str):
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "UPDATE upload_jobs SET status = 'queued', run_at = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, job_id),
+            )
+
+    def fail(self, job_id: int, error: str):
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "UPDATE upload_jobs SET status = 'failed', last_error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+    def prune(self, done_before: float, failed_before: float) -> int:
+        """
+        Elimina los trabajos terminados, para que la tabla y la consulta de claim no crezcan sin limite. Los
+        trabajos fallidos se conservan mas tiempo para poder revisar su ultimo error.
+
+        Args:
+            done_before: se eliminan los trabajos completados antes de este instante.
+            failed_before: se eliminan los trabajos fallidos antes de este instante.
+
+        Returns:
+            la cantidad de trabajos eliminados.
+        """
+        with self._lock, self._connect() as connection:
+            cursor = connection.execute(
+                """
+                DELETE FROM upload_jobs
+                WHERE (status = 'done' AND COALESCE(finished_at, created_at) < ?)
+                OR (status = 'failed' AND COALESCE(finished_at, created_at) < ?)
+                """,
+                (done_before, failed_before),
+            )
+            return cursor.rowcount
+
+    def recover(self) -> int:
+        """
+        Devuelve a la cola los trabajos que quedaron en ejecucion por un proceso que ya no existe.
+
+        Returns:
+            la cantidad de trabajos recuperados.
+        """
+        with self._lock, self._connect() as connection:
+            rows = connection.execute("SELECT id, worker_pid FROM upload_jobs WHERE status = 'running'").fetchall()
+            orphaned = [(job_id,) for job_id, worker_pid in rows if not _process_alive(worker_pid)]
+            connection.executemany("UPDATE upload_jobs SET status = 'queued' WHERE id = ?", orphaned)
+            return len(orphaned)
+
+    def counts(self) -> dict[str, int]:
+        with self._lock, self._connect() as connection:
+            return dict(connection.execute("SELECT status, COUNT(*) FROM upload_jobs GROUP BY status").fetchall())
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Calcula la espera antes de reintentar un trabajo con backoff exponencial.
+
+    Args:
+        attempts: la cantidad de intentos realizados.
+
+    Returns:
+        los segundos de espera.
+    """
+    return min(UPLOAD_RETRY_BASE_SECONDS * 2 ** (attempts - 1), UPLOAD_RETRY_MAX_SECONDS)
+
+
+class UploadWorkerPool:
+    """
+    Conjunto de hilos que ejecutan los trabajos de la cola fuera del ciclo de las peticiones.
+    """
+
+    def __init__(
+        self,
+        queue: UploadQueue,
+        handlers: dict[str, Callable[[Job], None]],
+        on_failure: Optional[Callable[[Job, str], None]] = None,
+        workers: int = UPLOAD_WORKERS,
+        max_attempts: int = UPLOAD_MAX_ATTEMPTS,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.on_failure = on_failure
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._prune_lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def start(self):
+        self._stop.clear()
+        self.queue.recover()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"upload-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    def run_pending(self) -> int:
+        """
+        Ejecuta en el hilo actual los trabajos listos, util en pruebas.
+
+        Returns:
+            la cantidad de trabajos ejecutados.
+        """
+        executed = 0
+        while True:
+            job = self.queue.claim()
+            if job is None:
+                return executed
+            self._execute(job)
+            executed += 1
+
+    def prune(self) -> int:
+        """
+        Elimina los trabajos completados hace mas de UPLOAD_DONE_RETENTION_HOURS y los fallidos hace mas de
+        UPLOAD_FAILED_RETENTION_HOURS.
+
+        Returns:
+            la cantidad de trabajos eliminados.
+        """
+        now = time.time()
+        return self.queue.prune(now - UPLOAD_DONE_RETENTION_HOURS * 3600, now - UPLOAD_FAILED_RETENTION_HOURS * 3600)
+
+    def _maybe_prune(self):
+        with self._prune_lock:
+            if time.time() < self._next_prune:
+                return
+            self._next_prune = time.time() + UPLOAD_PRUNE_INTERVAL_SECONDS
+        try:
+            self.prune()
+        except Exception as e:
+            print(f"Error pruning finished upload jobs: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._maybe_prune()
+                self._wakeup.wait(UPLOAD_POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            self._execute(job)
+
+    def _execute(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise PermanentJobError(f"Unknown job kind: {job.kind}")
+            handler(job)
+            self.queue.complete(job.id)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Error running {job.kind} job {job.id} (attempt {job.attempts}): {error}")
+            if isinstance(e, PermanentJobError) or job.attempts >= self.max_attempts:
+                self.queue.fail(job.id, error)
+                if self.on_failure is not None:
+                    try:
+                        self.on_failure(job, error)
+                    except Exception as failure_error:
+                        print(f"Error handling failure of job {job.id}: {failure_error}")
+            else:
+                self.queue.retry(job.id, retry_delay(job.attempts), error)
@@ -0,0 +1,324 @@
+import ipaddress
+import os
+import socket
+import uuid
+from typing import Optional
+from fastapi import UploadFile
+from decouple import config
+from app.core.image_probe import ImageInfo, InvalidImageError, probe_image
+
+
+UPLOAD_SPOOL_DIR = config("UPLOAD_SPOOL_DIR", default="upload_spool")
+UPLOAD_CHUNK_SIZE = config("UPLOAD_CHUNK_SIZE", default=64 * 1024, cast=int)
+MAX_UPLOAD_BYTES = config("MAX_UPLOAD_BYTES", default=10 * 1024 * 1024, cast=int)
+MAX_IMAGE_DIMENSION = config("MAX_IMAGE_DIMENSION", default=8000, cast=int)
+MAX_IMAGE_HEADER_BYTES = 256 * 1024
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+IMAGE_DOWNLOAD_TIMEOUT = config("IMAGE_DOWNLOAD_TIMEOUT", default=30.0, cast=float)
+IMAGE_DOWNLOAD_MAX_REDIRECTS = 5
+IMAGE_URL_SCHEMES = ("http", "https")
+
+
+class UploadRejectedError(Exception):
+    """
+    Error de un archivo recibido que no cumple las restricciones de tamaño, formato o dimensiones.
+    """
+
+    status_code = 422
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class UploadTooLargeError(UploadRejectedError):
+    status_code = 413
+
+
+class UnsupportedUploadError(UploadRejectedError):
+    status_code = 415
+
+
+def _check_dimensions(info: ImageInfo):
+    if info.width <= 0 or info.height <= 0:
+        raise UploadRejectedError("Image has invalid dimensions")
+    if info.width > MAX_IMAGE_DIMENSION or info.height > MAX_IMAGE_DIMENSION:
+        raise UploadRejectedError(
+            f"Image dimensions {info.width}x{info.height} exceed the maximum of {MAX_IMAGE_DIMENSION} pixels"
+        )
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """
+    Copia por partes el archivo recibido a la carpeta de spool, donde lo toman los trabajos de carga en segundo plano.
+    El tipo y las dimensiones se validan con los primeros bytes, por lo que un archivo invalido se rechaza antes
+    de leerlo completo, y en memoria solo se mantiene una parte a la vez.
+
+    Args:
+        file: el archivo recibido en la peticion.
+        max_bytes: el tamaño maximo permitido del archivo.
+        chunk_size: el tamaño de cada parte leida.
+
+    Returns:
+        la ruta del archivo en la carpeta de spool, lanza UploadRejectedError si el archivo no es valido.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(f"Image exceeds the maximum size of {max_bytes} bytes")
+
+    header = b""
+    info = None
+    while info is None:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            raise UnsupportedUploadError("Image file is empty or truncated")
+        header += chunk
+        info = _probe_header(header)
+    _check_dimensions(info)
+
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_SPOOL_DIR, f"{uuid.uuid4().hex}{info.extension}")
+    written = 0
+    try:
+        with open(path, "wb") as destination:
+            chunk, header = header, b""
+            while chunk:
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLargeError(f"Image exceeds the maximum size of {max_bytes} bytes")
+                destination.write(chunk)
+                chunk = await file.read(chunk_size)
+    except Exception:
+        discard_spooled(path)
+        raise
+    return path
+
+
+def _probe_header(header: bytes) -> Optional[ImageInfo]:
+    try:
+        info = probe_image(header)
+    except InvalidImageError as e:
+        raise UnsupportedUploadError(str(e))
+    if info is None and len(header) >= MAX_IMAGE_HEADER_BYTES:
+        raise UnsupportedUploadError("Image header could not be read")
+    return info
+
+
+def public_address(url) -> str:
+    """
+    Resuelve el host de una url de imagen y verifica que todas sus direcciones sean publicas, para que una url
+    recibida del usuario no alcance servicios internos, la interfaz local ni los metadatos de la nube.
+
+    Args:
+        url: la url de la imagen (httpx.URL).
+
+    Returns:
+        la direccion IP a la que se conecta la descarga, lanza UploadRejectedError si el esquema no es http o
+        https, si el host no se resuelve o si alguna de sus direcciones es privada, local, link-local o reservada.
+    """
+    if url.scheme not in IMAGE_URL_SCHEMES:
+        raise UploadRejectedError("Image URL must use http or https")
+    if not url.host:
+        raise UploadRejectedError("Image URL has no host")
+    try:
+        infos = socket.getaddrinfo(url.host, url.port or (443 if url.scheme == "https" else 80), type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        raise UploadRejectedError("Image URL host could not be resolved")
+    addresses = sorted({info[4][0] for info in infos})
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise UploadRejectedError("Image URL points to a non-public address")
+    if not addresses:
+        raise UploadRejectedError("Image URL host could not be resolved")
+    return addresses[0]
+
+
+def _open_image_url(client, url: str):
+    """
+    Abre la descarga de una url de imagen siguiendo las redirecciones a mano: en cada salto se valida la url y la
+    conexion se hace a la direccion ya verificada, con el host original en el encabezado Host y en el SNI, para
+    que una segunda resolucion DNS no pueda redirigirla a una direccion interna.
+
+    Args:
+        client: el cliente httpx.
+        url: la url de la imagen.
+
+    Returns:
+        la respuesta abierta en modo stream, debe cerrarse.
+    """
+    import httpx
+
+    current = httpx.URL(url)
+    for _ in range(IMAGE_DOWNLOAD_MAX_REDIRECTS + 1):
+        address = public_address(current)
+        request = client.build_request(
+            "GET",
+            current.copy_with(host=address),
+            headers={"Host": current.netloc.decode("ascii")},
+            extensions={"sni_hostname": current.host},
+        )
+        response = client.send(request, stream=True)
+        if not response.is_redirect:
+            return response
+        location = response.headers.get("location")
+        response.close()
+        if not location:
+            raise UploadRejectedError("Image URL returned a redirect without location")
+        current = current.join(location)
+    raise UploadRejectedError("Image URL redirected too many times")
+
+
+def spool_url(url: str, max_bytes: int = MAX_UPLOAD_BYTES, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """
+    Descarga por partes una imagen desde una url a la carpeta de spool, con las mismas validaciones de tamaño,
+    formato y dimensiones que los archivos recibidos. Se ejecuta en los trabajos de carga en segundo plano.
+    Solo se aceptan urls http o https que resuelvan a direcciones publicas, tambien en cada redireccion.
+
+    Args:
+        url: la url de la imagen.
+        max_bytes: el tamaño maximo permitido del archivo.
+        chunk_size: el tamaño de cada parte leida.
+
+    Returns:
+        la ruta del archivo en la carpeta de spool, lanza UploadRejectedError si la url o la imagen no son validas
+        o httpx.HTTPError si la descarga falla.
+    """
+    import httpx
+
+    with httpx.Client(follow_redirects=False, timeout=IMAGE_DOWNLOAD_TIMEOUT) as client:
+        response = _open_image_url(client, url)
+        try:
+            return _spool_response(response, max_bytes, chunk_size)
+        finally:
+            response.close()
+
+
+def _spool_response(response, max_bytes: int, chunk_size: int) -> str:
+    if response.status_code >= 400:
+        if response.status_code < 500:
+            raise UploadRejectedError(f"Image URL returned status {response.status_code}")
+        response.raise_for_status()
+    content_length = response.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+        raise UploadTooLargeError(f"Image exceeds the maximum size of {max_bytes} bytes")
+
+    chunks = response.iter_bytes(chunk_size)
+    header = b""
+    info = None
+    while info is None:
+        chunk = next(chunks, b"")
+        if not chunk:
+            raise UnsupportedUploadError("Image file is empty or truncated")
+        header += chunk
+        info = _probe_header(header)
+    _check_dimensions(info)
+
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_SPOOL_DIR, f"{uuid.uuid4().hex}{info.extension}")
+    written = 0
+    try:
+        with open(path, "wb") as destination:
+            chunk = header
+            while chunk:
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLargeError(f"Image exceeds the maximum size of {max_bytes} bytes")
+                destination.write(chunk)
+                chunk = next(chunks, b"")
+    except Exception:
+        discard_spooled(path)
+        raise
+    return path
+
+
+def discard_spooled(path: str):
+    """
+    Elimina un archivo de la carpeta de spool si existe.
+
+    Args:
+        path: la ruta del archivo.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _RequestBodyTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Middleware ASGI que rechaza con 413 los formularios multipart que superan el tamaño maximo,
+    antes de que el cuerpo se lea completo. Sin Content-Length, por ejemplo con un cuerpo chunked, el limite se
+    verifica al recibir cada parte: la lectura se interrumpe con una excepcion privada y la respuesta de la
+    aplicacion a ese error, FastAPI responde 400 a cualquier error al leer el formulario, se reemplaza por el 413.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._is_multipart(scope):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = self._header(scope, b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+        replaced = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise _RequestBodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started, replaced
+            if message["type"] == "http.response.start":
+                started = True
+                if exceeded:
+                    replaced = True
+                    await self._reject(send)
+                    return
+            if not replaced:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _RequestBodyTooLarge:
+            if started:
+                raise
+            await self._reject(send)
+
+    @staticmethod
+    def _header(scope, name: bytes):
+        for key, value in scope.get("headers", ()):
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    def _is_multipart(self, scope) -> bool:
+        content_type = self._header(scope, b"content-type") or ""
+        return content_type.startswith("multipart/form-data")
+
+    async def _reject(self, send):
+        body = b'{"detail":"Request body too large"}'
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,22 +1,60 @@
+import os
+from contextlib import asynccontextmanager, contextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.db import create_all_tables
+from fastapi.staticfiles import StaticFiles
+from app.core.db import create_all_tables, warm_up_pools
+from app.core.startup import report_startup, startup_phase
+from app.core.uploads import UploadSizeLimitMiddleware
+from app.core.metrics import MetricsMiddleware
+from app.core.admission import AdmissionControlMiddleware
+from app.core.storage import STORAGE_BACKEND, LOCAL_STORAGE_DIR, LOCAL_STORAGE_BASE_URL
+from app.services.image_service import start_image_workers, stop_image_workers
+from app.core.password_hashing import password_hasher
+from app.core.shared_cache import start_invalidation_listener, stop_invalidation_listener
 from app.routes.province_route import router as province_router
 from app.routes.canton_route import router as canton_router
 from app.routes.district_route import router as district_router
 from app.routes.legend_route import router as legend_router
 from app.routes.category_route import router as category_router
 from app.routes.auth_route import router as auth_router
+from app.routes.geo_route import router as geo_router
+from app.routes.admin_route import router as admin_router
+from app.routes.metrics_route import router as metrics_router
 
 
-app = FastAPI(lifespan=create_all_tables)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with contextmanager(create_all_tables)(app):
+        with startup_phase("warmup"):
+            connections = await warm_up_pools()
+        print(
+            f"Opened {connections['sync']} sync, {connections['async']} async and {connections['replicas']} "
+            "replica database connections."
+        )
+        with startup_phase("workers"):
+            start_image_workers()
+            start_invalidation_listener()
+        report_startup()
+        try:
+            yield
+        finally:
+            stop_invalidation_listener()
+            stop_image_workers()
+            password_hasher.shutdown()
 
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(UploadSizeLimitMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins="*",
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 
@@ -29,4 +67,11 @@ app.include_router(canton_router)
 app.include_router(district_router)
 app.include_router(legend_router)
 app.include_router(category_router)
-app.include_router(auth_router)
\ No newline at end of file
+app.include_router(auth_router)
+app.include_router(geo_router)
+app.include_router(admin_router)
+app.include_router(metrics_router)
+
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(LOCAL_STORAGE_BASE_URL, StaticFiles(directory=LOCAL_STORAGE_DIR), name="media")
\ No newline at end of file
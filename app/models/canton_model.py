@@ -1,10 +1,12 @@
 from sqlmodel import Field, Relationship
+from sqlalchemy import Index
 from app.schemas.canton_schema import CantonBase
 from app.models.province_model import Province
 from typing import Optional, List
 
 class Canton(CantonBase,table=True):
     __tablename__ = "cantons"
+    __table_args__ = (Index("ix_cantons_province_id", "province_id"),)
     id: int = Field(default=None, primary_key=True)
     
     districts: List["District"] = Relationship(back_populates="canton")
@@ -1,10 +1,12 @@
 from sqlmodel import Field, Relationship
+from sqlalchemy import Index
 from app.schemas.district_schema import DistrictBase
 from app.models.canton_model import Canton
 from typing import List, Optional
 
 class District(DistrictBase,table=True):
     __tablename__ = "districts"
+    __table_args__ = (Index("ix_districts_canton_id", "canton_id"),)
     id: int = Field(default=None, primary_key=True)
     
     legends: List["Legend"] = Relationship(back_populates="district")
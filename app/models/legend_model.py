@@ -1,13 +1,25 @@
 
-from sqlmodel import  Field, Relationship
+from sqlmodel import  SQLModel, Field, Relationship
+from sqlalchemy import Index, Column, JSON
 from app.models.category_model import Category
 from app.models.district_model import District
-from typing import Optional
+from typing import Optional, List, Dict
+from datetime import datetime
 from app.schemas.legend_schema import LegendBase
     
 class Legend(LegendBase,table=True):
     __tablename__ = "legends"
+    __table_args__ = (
+        Index("ix_legends_legend_date_id", "legend_date", "id"),
+        Index("ix_legends_name_id", "name", "id"),
+        Index("ix_legends_category_id_legend_date", "category_id", "legend_date"),
+        Index("ix_legends_district_id_legend_date", "district_id", "legend_date"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
+    image_status: Optional[str] = Field(default=None, max_length=10)
+    image_variants: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    updated_at: Optional[datetime] = Field(default=None)
+    version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     
     category: Optional[Category] = Relationship(back_populates="legends")
     district: Optional[District] = Relationship(back_populates="legends")
@@ -20,4 +32,47 @@ class LegendRead(LegendBase):
     canton_id: int
     canton_name: str
     province_id: int
-    province_name: str
\ No newline at end of file
+    province_name: str
+    image_status: Optional[str] = None
+    srcset: Dict[int, str] = {}
+
+class LegendImageStatus(SQLModel):
+    legend_id: int
+    image_status: Optional[str] = None
+    image_url: Optional[str] = None
+
+class LegendPage(SQLModel):
+    items: List[LegendRead]
+    next_cursor: Optional[str] = None
+
+class LegendBatchResult(SQLModel):
+    items: List[LegendRead]
+    missing: List[int] = []
+
+class FacetCount(SQLModel):
+    id: int
+    name: str
+    count: int
+
+class YearFacetCount(SQLModel):
+    year: int
+    count: int
+
+class LegendFacets(SQLModel):
+    total: int = 0
+    category: List[FacetCount] = []
+    province: List[FacetCount] = []
+    canton: List[FacetCount] = []
+    district: List[FacetCount] = []
+    year: List[YearFacetCount] = []
+
+class LegendBulkError(SQLModel):
+    row: int
+    errors: List[str]
+
+class LegendBulkResult(SQLModel):
+    received: int = 0
+    inserted: int = 0
+    failed: int = 0
+    images_queued: int = 0
+    errors: List[LegendBulkError] = []
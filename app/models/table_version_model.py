@@ -0,0 +1,9 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class TableVersion(SQLModel, table=True):
+    __tablename__ = "table_versions"
+    table_name: str = Field(primary_key=True, max_length=50)
+    version: int = Field(default=0)
+    updated_at: datetime
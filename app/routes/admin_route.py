@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, Request
+from app.core.auth import get_current_admin
+from app.core.db import named_engines
+from app.core.db_pool import pool_status
+from app.core.password_hashing import password_hasher
+from app.core.startup import startup_summary
+from app.core.metrics import SLOW_QUERY_MS, slow_query_log
+from app.core.admission import admission_status
+from app.schemas.user_schema import UserBase
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(get_current_admin)]
+)
+
+@router.get("/hashing")
+async def get_hashing_metrics_route(current_user: UserBase = Depends(get_current_admin)):
+    """
+    Obtiene las metricas del pool de procesos de hash de contraseñas
+
+    Args:
+        como parametro recibe el usuario administrador autenticado.
+
+    Returns:
+        los procesos, el limite de operaciones simultaneas, las operaciones en curso, en espera y completadas.
+    """
+    return password_hasher.metrics()
+
+@router.get("/pool")
+async def get_pool_status_route(current_user: UserBase = Depends(get_current_admin)):
+    """
+    Obtiene la ocupacion de los pools de conexiones a la base de datos y sus tiempos de espera
+
+    Args:
+        como parametro recibe el usuario administrador autenticado.
+
+    Returns:
+        por cada engine (sync, async y las replicas) las conexiones prestadas y disponibles, los prestamos, las esperas agotadas
+        y los percentiles 50 y 99 del tiempo de espera para obtener una conexion.
+    """
+    return {name: pool_status(item) for name, item in named_engines().items()}
+
+@router.get("/startup")
+async def get_startup_timings_route(current_user: UserBase = Depends(get_current_admin)):
+    """
+    Obtiene la duracion de las fases del ultimo arranque de la aplicacion
+
+    Args:
+        como parametro recibe el usuario administrador autenticado.
+
+    Returns:
+        los segundos de las migraciones, la carga de caches, el calentamiento de conexiones, el inicio de los
+        trabajadores y el total.
+    """
+    return startup_summary()
+
+@router.get("/slow-queries")
+async def get_slow_queries_route(current_user: UserBase = Depends(get_current_admin)):
+    """
+    Obtiene las ultimas consultas que superaron el umbral SLOW_QUERY_MS, con su SQL compilado y sus parametros
+
+    Args:
+        como parametro recibe el usuario administrador autenticado.
+
+    Returns:
+        el umbral en milisegundos y las consultas lentas, de la mas reciente a la mas antigua, con los tipos de
+        sus parametros pero no sus valores.
+    """
+    return {"threshold_ms": SLOW_QUERY_MS, "queries": list(reversed(slow_query_log))}
+
+@router.get("/admission")
+async def get_admission_status_route(request: Request, current_user: UserBase = Depends(get_current_admin)):
+    """
+    Obtiene el estado del control de admision de las rutas de autenticacion y de carga de imagenes en este worker
+
+    Args:
+        como parametro recibe el usuario administrador autenticado.
+
+    Returns:
+        por grupo de rutas, las peticiones en curso, el limite de concurrencia y los limites de frecuencia.
+    """
+    return admission_status(request.app)
@@ -1,10 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm 
-from sqlmodel import Session, select
-from app.core.db import get_session
+from app.core.db import AsyncSessionLocal
 from app.schemas.user_schema import UserCreate, UserLogin, Token
-from app.models.user_model import User
-from app.services.auth_service import register_user_service, login_for_access_token_service
+from app.services.auth_service import register_user_service, login_for_access_token_service, EmailAlreadyRegisteredError
 
 router = APIRouter(
     prefix="/auth",
@@ -12,7 +10,7 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register_user(user_create: UserCreate, session: Session = Depends(get_session)):
+async def register_user(user_create: UserCreate, session: AsyncSessionLocal = AsyncSessionLocal):
     """
     Registra un nuevo usuario
 
@@ -22,23 +20,22 @@ def register_user(user_create: UserCreate, session: Session = Depends(get_sessio
     Returns:
         el token de acceso, en caso de fallar devuelve un status 409 o 500.
     """
-    result = register_user_service(user_create, session)
+    try:
+        result = await register_user_service(user_create, session)
+    except EmailAlreadyRegisteredError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="email already registered"
+        )
     if result is None:
-        existing_user = session.exec(select(User).where(User.email == user_create.email)).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="email already registered"
-            )
-        else:
-             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error registering user"
-            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error registering user"
+        )
     return result
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSessionLocal = AsyncSessionLocal):
     """
     Obtiene el token de acceso
 
@@ -48,7 +45,7 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), ses
     Returns:
         el token de acceso, en caso de fallar devuelve un status 401.
     """
-    result = login_for_access_token_service(
+    result = await login_for_access_token_service(
         UserLogin(email=form_data.username, password=form_data.password), 
         session
     )
@@ -58,4 +55,4 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), ses
             detail="Credentials are incorrect",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return result
\ No newline at end of file
+    return result
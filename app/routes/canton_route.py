@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from typing import Optional
-from sqlmodel import Session
-from app.core.db import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.db import get_async_session
 from app.models.canton_model import Canton
 from app.services.canton_service import get_cantons_by_province
 from app.core.auth import get_current_user
@@ -13,7 +13,7 @@ router= APIRouter(
 )
 
 @router.get("",response_model=list[Canton])
-async def get_cantons_route(province_id: Optional[int]=None, session: Session = Depends(get_session), current_user: UserBase = Depends(get_current_user),):
+async def get_cantons_route(province_id: Optional[int]=None, session: AsyncSession = Depends(get_async_session), current_user: UserBase = Depends(get_current_user),):
     """
     Obtiene los cantones, opcionalmente filtrados por provincia
 
@@ -23,7 +23,7 @@ async def get_cantons_route(province_id: Optional[int]=None, session: Session =
     Returns:
         una lista de cantones, en caso de fallar devuelve un status 500.
     """
-    cantons= get_cantons_by_province(session, province_id)
+    cantons= await get_cantons_by_province(session, province_id)
     if cantons is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from app.core.db import SessionLocal
+from app.core.db import AsyncSessionLocal
 from app.models.category_model import Category
 from app.services.category_service import get_all_categories
 from app.core.auth import get_current_user
@@ -11,7 +11,7 @@ router= APIRouter(
 
 
 @router.get("", response_model=list[Category])
-async def get_categories_route(session: SessionLocal = SessionLocal, current_user: UserBase = Depends(get_current_user)):
+async def get_categories_route(session: AsyncSessionLocal = AsyncSessionLocal, current_user: UserBase = Depends(get_current_user)):
     """
     Obtiene todas las categorias
 
@@ -21,7 +21,7 @@ async def get_categories_route(session: SessionLocal = SessionLocal, current_use
     Returns:
         una lista de categorias, en caso de fallar devuelve un status 500.
     """
-    categories= get_all_categories(session)
+    categories= await get_all_categories(session)
     if categories is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
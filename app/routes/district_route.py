@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from typing import Optional
-from sqlmodel import Session
-from app.core.db import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.db import get_async_session
 from app.models.district_model import District
 from app.services.district_service import get_districts
 from app.core.auth import get_current_user
@@ -13,7 +13,7 @@ router= APIRouter(
 )
 
 @router.get("/",response_model=list[District])
-async def get_districts_route(canton_id: Optional[int]=None,province_id: Optional[int]=None, session: Session= Depends(get_session),current_user: UserBase = Depends(get_current_user),):
+async def get_districts_route(canton_id: Optional[int]=None,province_id: Optional[int]=None, session: AsyncSession = Depends(get_async_session),current_user: UserBase = Depends(get_current_user),):
     """
     Obtiene los distritos, opcionalmente filtrados por canton y provincia
 
@@ -23,7 +23,7 @@ async def get_districts_route(canton_id: Optional[int]=None,province_id: Optiona
     Returns:
         una lista de distritos, en caso de fallar devuelve un status 500.
     """
-    districts= get_districts(session, canton_id, province_id)
+    districts= await get_districts(session, canton_id, province_id)
     if districts is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
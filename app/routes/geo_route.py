@@ -0,0 +1,70 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Response
+from typing import Optional
+from decouple import config
+from app.core.db import AsyncSessionLocal
+from app.services.geo_service import get_geo_tree, refresh_geo_tree
+from app.core.auth import get_current_admin, get_current_user
+from app.core.conditional import etag_matches
+from app.schemas.user_schema import UserBase
+
+GEO_TREE_MAX_AGE = config("GEO_TREE_MAX_AGE", default=86400, cast=int)
+
+router= APIRouter(
+    prefix="/geo",
+    tags=["Geo"] 
+)
+
+@router.get("/tree")
+async def get_geo_tree_route(
+    session: AsyncSessionLocal = AsyncSessionLocal,
+    current_user: UserBase = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Obtiene el arbol completo de provincias, cantones y distritos junto a las categorias
+
+    Args:
+        como parametros recibe la session de la base de datos y el encabezado If-None-Match.
+
+    Returns:
+        el arbol serializado con encabezados de cache, un status 304 si el cliente ya tiene la version actual, en caso de fallar devuelve un status 500.
+    """
+    reference_data = await get_geo_tree(session)
+    if reference_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving geo tree from the database."
+        )
+    headers = {
+        "ETag": reference_data.etag,
+        "Cache-Control": f"private, max-age={GEO_TREE_MAX_AGE}",
+    }
+    if etag_matches(if_none_match, reference_data.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=reference_data.tree_json, media_type="application/json", headers=headers)
+
+@router.post("/refresh")
+async def refresh_geo_tree_route(session: AsyncSessionLocal = AsyncSessionLocal, current_user: UserBase = Depends(get_current_admin)):
+    """
+    Recarga el indice en memoria de provincias, cantones, distritos y categorias y avisa a los demas workers,
+    solo para administradores
+
+    Args:
+        como parametro recibe la session de la base de datos.
+
+    Returns:
+        la cantidad de registros cargados y la nueva ETag, en caso de fallar devuelve un status 500.
+    """
+    reference_data = await refresh_geo_tree(session)
+    if reference_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error refreshing geo tree."
+        )
+    return {
+        "provinces": len(reference_data.provinces),
+        "cantons": len(reference_data.cantons),
+        "districts": len(reference_data.districts),
+        "categories": len(reference_data.categories),
+        "etag": reference_data.etag,
+    }
@@ -1,18 +1,39 @@
-from fastapi import APIRouter, HTTPException, status, File, UploadFile, Form,Depends
-from typing import Optional
+from fastapi import APIRouter, HTTPException, status, File, UploadFile, Form, Depends, Query, Response, Request, Header
+from typing import Optional, Literal
 from datetime import datetime
-from app.core.db import SessionLocal
-from app.models.legend_model import LegendRead, Legend
-from app.schemas.legend_schema import LegendCreate, LegendUpdate
+from app.core.db import AsyncSessionLocal
+from app.models.legend_model import LegendRead, LegendPage, LegendImageStatus, Legend, LegendBulkResult, LegendFacets, LegendBatchResult
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError, decode_cursor
+from app.schemas.legend_schema import LegendCreate, LegendUpdate, LegendFilters, LegendBatchRequest
 from app.services.legend_service import (
     get_all_legends,
     get_legends_filters,
     get_legend,
     create_legend,
     update_legend,
-    delete_legend
+    delete_legend,
+    get_legend_image_status,
+    get_legends_version,
+    get_legend_last_modified,
+    stream_legends,
+    bulk_create_legends,
+    export_legends,
+    get_legend_facets,
+    get_legend_page_rows,
+    stream_legend_rows,
+    get_legends_by_ids,
+    get_legend_json
 )
+from app.services.geo_service import get_geo_tree
+from app.core.conditional import conditional_response, make_etag, validator_headers
+from app.core.streaming import JSON_MEDIA_TYPE, encode_stream, wants_stream
+from app.core.compact import build_compact, encode_compact, encode_compact_stream, wants_compact
+from app.core.bulk_import import BULK_BATCH_SIZE, record_format
+from app.core.export import COLUMNAR_MEDIA_TYPE, CSV_MEDIA_TYPE, RANGE_UNIT, InvalidRangeError, encode_columnar, encode_csv, parse_id_range
+from fastapi.responses import StreamingResponse
+from app.services.image_service import IMAGE_PENDING
 from pydantic import ValidationError
+from app.core.uploads import UploadRejectedError
 from app.core.auth import get_current_user
 from app.schemas.user_schema import UserBase
 
@@ -21,84 +42,314 @@ router= APIRouter(
     tags=["Legends"] 
 )
 
-@router.get("", response_model=list[LegendRead])
-async def get_legends_route(session: SessionLocal = SessionLocal,current_user: UserBase = Depends(get_current_user)):
+def _decode_cursor_or_400(cursor: Optional[str], sort: str, order: str) -> Optional[tuple]:
+    try:
+        return decode_cursor(cursor, sort, order)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+async def _collection_validators(session: AsyncSessionLocal, request: Request, media_type: str = JSON_MEDIA_TYPE) -> Optional[tuple]:
+    """
+    Calcula la ETag de una consulta de leyendas a partir de la version de la tabla, la version de los datos
+    de referencia, los parametros de la consulta y el formato de la respuesta, sin ejecutar la consulta.
+    """
+    version = await get_legends_version(session)
+    reference_data = await get_geo_tree(session)
+    if version is None or reference_data is None:
+        return None
+    return make_etag(version.version, reference_data.etag, request.url.query, media_type), version.updated_at
+
+def legend_filters(
+    name: Optional[str] = None,
+    category_id: Optional[int] = None,
+    legend_date_initial: Optional[str] = None,
+    legend_date_final: Optional[str] = None,
+    province_id: Optional[int] = None,
+    canton_id: Optional[int] = None,
+    district_id: Optional[int] = None,
+) -> LegendFilters:
     """
-    Obtiene todas las leyendas
+    Agrupa los filtros de leyendas recibidos en la consulta, compartidos por /filters y /export.
+    """
+    return LegendFilters(
+        name=name,
+        category_id=category_id,
+        legend_date_initial=legend_date_initial,
+        legend_date_final=legend_date_final,
+        province_id=province_id,
+        canton_id=canton_id,
+        district_id=district_id,
+    )
+
+@router.get("", response_model=LegendPage)
+async def get_legends_route(
+    session: AsyncSessionLocal = AsyncSessionLocal,
+    current_user: UserBase = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal["id", "legend_date", "name"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    stream: bool = False,
+    request: Request = None,
+    response: Response = None,
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+):
+    """
+    Obtiene una pagina de leyendas, o todas las leyendas a partir del cursor transmitidas por lotes si se pide
+    Accept: application/x-ndjson (una leyenda por linea) o stream=1 (un arreglo JSON), en ese caso limit no se aplica.
+    Con Accept: application/vnd.legends.compact+json o application/vnd.legends.compact+msgpack responde en el formato
+    compacto por columnas, descrito en app/core/compact.py, tambien por lotes si se pide stream=1.
 
     Args:
-        como parametro recibe la session de la base de datos.
+        como parametros recibe la session de la base de datos, el tamaño de la pagina, el cursor de la pagina anterior, el ordenamiento,
+        el modo de transmision y los encabezados Accept, If-None-Match e If-Modified-Since.
 
     Returns:
-        una lista de leyendas, formateadas mediante LegendRead, en caso de fallar devuelve un status 500.
+        una pagina de leyendas, formateadas mediante LegendRead, junto al cursor de la siguiente pagina, un status 304 si el cliente ya tiene
+        la version actual, en caso de fallar devuelve un status 400 o 500.
     """
-    legends= get_all_legends(session)
+    after = _decode_cursor_or_400(cursor, sort, order)
+    compact_media_type = wants_compact(accept)
+    stream_media_type = None if compact_media_type else wants_stream(accept, stream)
+    media_type = compact_media_type or stream_media_type or JSON_MEDIA_TYPE
+    validators = await _collection_validators(session, request, media_type)
+    if validators is not None:
+        not_modified = conditional_response(if_none_match, if_modified_since, *validators)
+        if not_modified is not None:
+            return not_modified
+    if compact_media_type is not None:
+        headers = validator_headers(*validators) if validators is not None else {}
+        headers["Vary"] = "Accept"
+        if stream:
+            return StreamingResponse(
+                encode_compact_stream(stream_legend_rows(after=after, sort=sort, order=order), compact_media_type),
+                media_type=compact_media_type,
+                headers=headers,
+            )
+        page = await get_legend_page_rows(session, limit=limit, after=after, sort=sort, order=order)
+        if page is None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error retrieving legends from the database."
+            )
+        return Response(content=encode_compact(build_compact(*page), compact_media_type), media_type=compact_media_type, headers=headers)
+    if stream_media_type is not None:
+        headers = validator_headers(*validators) if validators is not None else {}
+        headers["Vary"] = "Accept"
+        return StreamingResponse(
+            encode_stream(stream_legends(after=after, sort=sort, order=order), stream_media_type),
+            media_type=stream_media_type,
+            headers=headers,
+        )
+    legends= await get_all_legends(session, limit=limit, after=after, sort=sort, order=order)
     if legends is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error retrieving legends from the database."
         )
+    if validators is not None:
+        response.headers.update(validator_headers(*validators))
+    response.headers["Vary"] = "Accept"
     return legends
 
-@router.get("/filters", response_model=list[LegendRead])
+@router.get("/filters", response_model=LegendPage)
 
 async def get_legends_filters_route(
-    name: Optional[str] = None,
-    category_id: Optional[int] = None,
-    legend_date_initial: Optional[str] = None, 
-    legend_date_final: Optional[str] = None,
-    province_id: Optional[int] = None,
-    canton_id: Optional[int] = None,
-    district_id: Optional[int] = None,
-    session: SessionLocal = SessionLocal,
-    current_user: UserBase = Depends(get_current_user)
-    
+    filters: LegendFilters = Depends(legend_filters),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Optional[Literal["id", "legend_date", "name", "relevance"]] = None,
+    order: Literal["asc", "desc"] = "asc",
+    session: AsyncSessionLocal = AsyncSessionLocal,
+    current_user: UserBase = Depends(get_current_user),
+    request: Request = None,
+    response: Response = None,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
 ):
     """
-    Obtiene las leyendas a partir de los diferentes filtros
+    Obtiene una pagina de leyendas a partir de los diferentes filtros, el filtro name busca sin distinguir tildes ni mayusculas
+    en el nombre y la descripcion, y por defecto ordena por relevancia
 
     Args:
-        como parametros recibe los filtros y la session de la base de datos.
+        como parametros recibe los filtros, el tamaño de la pagina, el cursor de la pagina anterior, el ordenamiento, la session de la base de datos
+        y los encabezados condicionales If-None-Match e If-Modified-Since.
 
     Returns:
-        una lista de leyendas filtradas mediante los filtros y formateadas mediante LegendRead, en caso de fallar devuelve un status 500.
+        una pagina de leyendas filtradas mediante los filtros y formateadas mediante LegendRead, un status 304 si el cliente ya tiene
+        la version actual, en caso de fallar devuelve un status 400 o 500.
     """
-    legends = get_legends_filters(
+    if sort is None:
+        sort = "relevance" if filters.name else "id"
+    if sort == "relevance" and not filters.name:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sorting by relevance requires the name filter."
+        )
+    after = _decode_cursor_or_400(cursor, sort, order)
+    validators = await _collection_validators(session, request)
+    if validators is not None:
+        not_modified = conditional_response(if_none_match, if_modified_since, *validators)
+        if not_modified is not None:
+            return not_modified
+    legends = await get_legends_filters(
         session, 
-        name=name, 
-        category_id=category_id, 
-        legend_date_initial=legend_date_initial, 
-        legend_date_final=legend_date_final,
-        province_id=province_id, 
-        canton_id=canton_id, 
-        district_id=district_id
+        **filters.model_dump(),
+        limit=limit,
+        after=after,
+        sort=sort,
+        order=order
     )
     if legends is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error retrieving legends with filters from the database."
         )
+    if validators is not None:
+        response.headers.update(validator_headers(*validators))
     return legends
 
+@router.get("/facets", response_model=LegendFacets)
+async def get_legend_facets_route(
+    filters: LegendFilters = Depends(legend_filters),
+    session: AsyncSessionLocal = AsyncSessionLocal,
+    current_user: UserBase = Depends(get_current_user),
+    request: Request = None,
+    response: Response = None,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+):
+    """
+    Obtiene en una sola consulta cuantas leyendas que cumplen los filtros hay en cada categoria, provincia, canton,
+    distrito y año, para mostrar los conteos de cada opcion de filtro
+
+    Args:
+        como parametros recibe los mismos filtros de /filters, la session de la base de datos
+        y los encabezados condicionales If-None-Match e If-Modified-Since.
+
+    Returns:
+        el total y los conteos por dimension con sus nombres, un status 304 si el cliente ya tiene la version actual,
+        en caso de fallar devuelve un status 500.
+    """
+    validators = await _collection_validators(session, request)
+    if validators is not None:
+        not_modified = conditional_response(if_none_match, if_modified_since, *validators)
+        if not_modified is not None:
+            return not_modified
+    facets = await get_legend_facets(session, **filters.model_dump())
+    if facets is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error counting legends by facet."
+        )
+    if validators is not None:
+        response.headers.update(validator_headers(*validators))
+    return facets
+
+@router.get("/export")
+async def export_legends_route(
+    filters: LegendFilters = Depends(legend_filters),
+    format: Literal["csv", "columnar"] = "csv",
+    after_id: Optional[int] = Query(None, ge=0),
+    range: Optional[str] = Header(None),
+    current_user: UserBase = Depends(get_current_user),
+):
+    """
+    Exporta las leyendas que cumplen los filtros, ordenadas por id, como CSV o en formato columnar (una linea JSON
+    con los nombres de las columnas y luego una linea por lote con los valores de cada columna). Las filas se leen
+    con un cursor del lado del servidor y se transmiten por lotes, una exportacion interrumpida se retoma con
+    after_id=<ultimo id recibido> o con el encabezado Range: id=<primer id>-.
+
+    Args:
+        como parametros recibe los filtros, el formato, el ultimo id exportado y el encabezado Range.
+
+    Returns:
+        la exportacion transmitida por partes, con un status 206 si se pidio un rango, en caso de fallar devuelve un status 416.
+    """
+    headers = {"Accept-Ranges": RANGE_UNIT}
+    status_code = status.HTTP_200_OK
+    try:
+        first_id = parse_id_range(range)
+    except InvalidRangeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail=str(e)
+        )
+    if first_id is not None:
+        after_id = max(after_id if after_id is not None else -1, first_id - 1)
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"{RANGE_UNIT} {first_id}-*/*"
+
+    batches = export_legends(**filters.model_dump(), after_id=after_id)
+    if format == "columnar":
+        return StreamingResponse(encode_columnar(batches), media_type=COLUMNAR_MEDIA_TYPE, headers=headers, status_code=status_code)
+    headers["Content-Disposition"] = 'attachment; filename="legends.csv"'
+    return StreamingResponse(encode_csv(batches), media_type=CSV_MEDIA_TYPE, headers=headers, status_code=status_code)
+
 @router.get("/{legend_id}", response_model=LegendRead)
-async def get_legend_route(legend_id: int, session: SessionLocal = SessionLocal,current_user: UserBase = Depends(get_current_user)):
+async def get_legend_route(
+    legend_id: int,
+    session: AsyncSessionLocal = AsyncSessionLocal,
+    current_user: UserBase = Depends(get_current_user),
+    response: Response = None,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+):
     """
     Obtiene una leyenda especifica
 
     Args:
-        como parametro recibe el id de la leyenda y la session de la base de datos, en caso de fallar devuelve un status 404.
+        como parametro recibe el id de la leyenda, la session de la base de datos y los encabezados condicionales
+        If-None-Match e If-Modified-Since, en caso de fallar devuelve un status 404.
 
     Returns:
-        una leyenda formateada mediante LegendRead.
+        una leyenda formateada mediante LegendRead, un status 304 si el cliente ya tiene la version actual.
     """
-    legend= get_legend(legend_id, session)
+    exists, updated_at, version = await get_legend_last_modified(legend_id, session)
+    reference_data = await get_geo_tree(session) if exists else None
+    validators = None
+    if reference_data is not None:
+        validators = (make_etag(legend_id, version, updated_at, reference_data.etag), updated_at)
+        not_modified = conditional_response(if_none_match, if_modified_since, *validators)
+        if not_modified is not None:
+            return not_modified
+        body = await get_legend_json(legend_id, session, f"legend:{legend_id}:{validators[0]}")
+        if body is not None:
+            return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=validator_headers(*validators))
+    legend= await get_legend(legend_id, session)
     if legend is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Legend with ID {legend_id} not found."
         )
+    if validators is not None:
+        response.headers.update(validator_headers(*validators))
     return legend
 
+@router.get("/{legend_id}/image", response_model=LegendImageStatus)
+async def get_legend_image_status_route(legend_id: int, session: AsyncSessionLocal = AsyncSessionLocal,current_user: UserBase = Depends(get_current_user)):
+    """
+    Obtiene el estado de la carga de la imagen de una leyenda
+
+    Args:
+        como parametro recibe el id de la leyenda y la session de la base de datos.
+
+    Returns:
+        el estado de la imagen (pending, ready o failed) y su url, en caso de no existir la leyenda devuelve un status 404.
+    """
+    image_status= await get_legend_image_status(legend_id, session)
+    if image_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Legend with ID {legend_id} not found."
+        )
+    return image_status
+
 
 @router.post("", response_model=Legend, status_code=status.HTTP_201_CREATED)
 async def create_legend_route(          
@@ -109,15 +360,16 @@ async def create_legend_route(
     district_id: int = Form(...),
     image_file: Optional[UploadFile] = File(None), 
     current_user: UserBase = Depends(get_current_user),
-    session: SessionLocal = SessionLocal):
+    session: AsyncSessionLocal = AsyncSessionLocal,
+    response: Response = None):
     """
-    Crea una leyenda
+    Crea una leyenda, si incluye una imagen esta se carga en segundo plano
 
     Args:
-        como parametros recibe los datos de la leyenda y la session de la base de datos, en caso de fallar devuelve un status 422 o 500.
+        como parametros recibe los datos de la leyenda y la session de la base de datos, en caso de fallar devuelve un status 413, 415, 422 o 500.
 
     Returns:
-        la informacion de la leyenda creada.
+        la informacion de la leyenda creada, con un status 202 si la imagen quedo pendiente de carga.
     """
     try:
         legend_data= LegendCreate(
@@ -133,6 +385,8 @@ async def create_legend_route(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error creating legend."
             )
+        if legend.image_status == IMAGE_PENDING:
+            response.status_code = status.HTTP_202_ACCEPTED
         return legend
     except ValidationError as e:
         raise HTTPException(
@@ -140,8 +394,67 @@ async def create_legend_route(
             detail="Validation error: " + str(e.errors())
             
         )
+    except UploadRejectedError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail
+        )
         
     
+@router.post("/bulk", response_model=LegendBulkResult)
+async def bulk_create_legends_route(
+    request: Request,
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=10000),
+    content_type: Optional[str] = Header(None),
+    current_user: UserBase = Depends(get_current_user),
+    session: AsyncSessionLocal = AsyncSessionLocal):
+    """
+    Importa leyendas desde un cuerpo CSV (text/csv, con encabezado) o NDJSON (application/x-ndjson) que se lee a medida
+    que llega, las imagenes con url externa se descargan en segundo plano
+
+    Args:
+        como parametros recibe el cuerpo de la peticion, la cantidad de filas por lote y la session de la base de datos.
+
+    Returns:
+        el reporte de la importacion con los errores de cada fila, en caso de fallar devuelve un status 415 o 500.
+    """
+    format = record_format(content_type)
+    if format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Bulk import requires a text/csv or application/x-ndjson body."
+        )
+    result = await bulk_create_legends(session, request.stream(), format, batch_size=batch_size)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error importing legends."
+        )
+    return result
+
+@router.post("/batch", response_model=LegendBatchResult)
+async def get_legends_batch_route(
+    batch: LegendBatchRequest,
+    session: AsyncSessionLocal = AsyncSessionLocal,
+    current_user: UserBase = Depends(get_current_user)):
+    """
+    Obtiene varias leyendas por su ID en una sola peticion, por ejemplo para restaurar listas guardadas o favoritos
+
+    Args:
+        como parametros recibe los IDs de las leyendas (como maximo el tamaño maximo de pagina) y la session de la base de datos.
+
+    Returns:
+        las leyendas formateadas mediante LegendRead en el orden pedido y los IDs que no existen,
+        en caso de fallar devuelve un status 422 o 500.
+    """
+    result = await get_legends_by_ids(batch.ids, session)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving legends from the database."
+        )
+    return result
+
 @router.patch("/{legend_id}", response_model=Legend)
 async def update_legend_route(legend_id: int, 
     current_user: UserBase = Depends(get_current_user),
@@ -151,15 +464,16 @@ async def update_legend_route(legend_id: int,
     legend_date: datetime = Form(...),
     district_id: int = Form(...),
     image_file: Optional[UploadFile] = File(None), 
-    session: SessionLocal = SessionLocal):
+    session: AsyncSessionLocal = AsyncSessionLocal,
+    response: Response = None):
     """
-    Actualiza una leyenda
+    Actualiza una leyenda, si incluye una imagen esta se carga en segundo plano
 
     Args:
         como parametros recibe el id de la leyenda, los datos de la leyenda y la session de la base de datos.
 
     Returns:
-        la informacion de la leyenda actualizada, en caso de fallar devuelve un status 422 o 404.
+        la informacion de la leyenda actualizada, con un status 202 si la imagen quedo pendiente de carga, en caso de fallar devuelve un status 404, 413, 415 o 422.
     """
     try:
         legend_data= LegendUpdate(
@@ -176,15 +490,22 @@ async def update_legend_route(legend_id: int,
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Legend with ID {legend_id} not found."
             )
+        if image_file and legend.image_status == IMAGE_PENDING:
+            response.status_code = status.HTTP_202_ACCEPTED
         return legend
     except ValidationError as e:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Validation error: " + str(e.errors())
         )
+    except UploadRejectedError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail
+        )
     
 @router.delete("/{legend_id}", status_code=status.HTTP_200_OK)
-async def delete_legend_route(legend_id: int, session: SessionLocal = SessionLocal, current_user: UserBase = Depends(get_current_user)):
+async def delete_legend_route(legend_id: int, session: AsyncSessionLocal = AsyncSessionLocal, current_user: UserBase = Depends(get_current_user)):
     """
     Elimina una leyenda
 
@@ -195,7 +516,7 @@ async def delete_legend_route(legend_id: int, session: SessionLocal = SessionLoc
         un status 200, en caso de fallar devuelve un status 404 o 500.
     """
     try:
-        result = delete_legend(legend_id, session)
+        result = await delete_legend(legend_id, session)
         if result is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
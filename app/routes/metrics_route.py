@@ -0,0 +1,74 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request, Response, status
+from app.core.auth import get_current_admin, get_current_user
+from app.core.db import named_engines
+from app.core.db_pool import pool_status
+from app.core.admission import admission_status
+from app.core.metrics import METRICS_TOKEN, PROMETHEUS_MEDIA_TYPE, gauge_lines, render_metrics
+
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+POOL_GAUGES = (
+    ("checked_out", "db_pool_checked_out", "Conexiones prestadas del pool."),
+    ("checked_in", "db_pool_checked_in", "Conexiones disponibles en el pool."),
+    ("overflow", "db_pool_overflow", "Conexiones abiertas sobre el tamaño del pool."),
+    ("timeouts", "db_pool_timeouts", "Esperas agotadas por una conexion libre."),
+    ("wait_p99_ms", "db_pool_wait_p99_ms", "Percentil 99 de la espera por una conexion."),
+)
+
+
+def _pool_lines() -> list[str]:
+    statuses = {name: pool_status(item) for name, item in named_engines().items()}
+    lines = []
+    for key, name, description in POOL_GAUGES:
+        samples = [({"engine": engine_name}, values[key]) for engine_name, values in statuses.items() if key in values]
+        if samples:
+            lines.extend(gauge_lines(name, description, samples))
+    return lines
+
+
+def _admission_lines(app) -> list[str]:
+    samples = [({"endpoint_class": name}, values["in_flight"]) for name, values in admission_status(app).items()]
+    return gauge_lines("http_requests_admitted_in_flight", "Peticiones en curso por grupo de rutas protegido.", samples)
+
+
+async def _authorize_metrics(authorization: Optional[str]):
+    """
+    Exige METRICS_TOKEN como token Bearer si esta configurado, si no exige el token de acceso de un administrador,
+    de modo que las metricas nunca quedan abiertas.
+
+    Args:
+        authorization: el encabezado Authorization de la peticion.
+    """
+    if METRICS_TOKEN:
+        if not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+        return
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    await get_current_admin(await get_current_user(token))
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics_route(request: Request, authorization: Optional[str] = Header(None)):
+    """
+    Expone las metricas de latencia, tamaño de respuesta y sentencias SQL por ruta, el estado de los pools
+    de conexiones y las peticiones en curso de las rutas protegidas en el formato de texto de Prometheus. Si METRICS_TOKEN
+    esta configurado se exige como token Bearer, si no se exige el token de acceso de un administrador.
+
+    Args:
+        como parametro recibe el encabezado Authorization.
+
+    Returns:
+        el texto de las metricas, en caso de fallar devuelve un status 401 o 403.
+    """
+    await _authorize_metrics(authorization)
+    return Response(content=render_metrics(_pool_lines() + _admission_lines(request.app)), media_type=PROMETHEUS_MEDIA_TYPE)
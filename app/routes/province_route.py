@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from app.core.db import SessionLocal
+from app.core.db import AsyncSessionLocal
 from app.models.province_model import Province
 from app.services.province_service import get_all_provinces
 from app.core.auth import get_current_user
@@ -11,7 +11,7 @@ router= APIRouter(
 )
 
 @router.get("",response_model=list[Province])
-async def get_provinces_route(session: SessionLocal = SessionLocal, current_user: UserBase = Depends(get_current_user),):
+async def get_provinces_route(session: AsyncSessionLocal = AsyncSessionLocal, current_user: UserBase = Depends(get_current_user),):
     """
     Obtiene todas las provincias
 
@@ -21,7 +21,7 @@ async def get_provinces_route(session: SessionLocal = SessionLocal, current_user
     Returns:
         una lista de provincias, en caso de fallar devuelve un status 500.
     """
-    provinces= get_all_provinces(session)
+    provinces= await get_all_provinces(session)
     if provinces is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,7 +1,8 @@
 
 from sqlmodel import SQLModel, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
+from app.core.pagination import MAX_PAGE_SIZE
 
 class LegendBase(SQLModel):
     
@@ -17,4 +18,16 @@ class LegendCreate(LegendBase):
     pass
 
 class LegendUpdate(LegendBase):
-    pass
\ No newline at end of file
+    pass
+
+class LegendFilters(SQLModel):
+    name: Optional[str] = None
+    category_id: Optional[int] = None
+    legend_date_initial: Optional[str] = None
+    legend_date_final: Optional[str] = None
+    province_id: Optional[int] = None
+    canton_id: Optional[int] = None
+    district_id: Optional[int] = None
+
+class LegendBatchRequest(SQLModel):
+    ids: List[int] = Field(min_length=1, max_length=MAX_PAGE_SIZE)
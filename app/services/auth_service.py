@@ -1,62 +1,76 @@
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from datetime import timedelta
 from typing import Union 
 from app.models.user_model import User
 from app.schemas.user_schema import UserCreate, UserLogin, Token
-from app.core.auth import get_password_hash, verify_password, create_access_token
+from app.core.auth import hash_password, verify_and_update_password, create_access_token
 
 
-def register_user_service(user_create: UserCreate, session: Session) -> Union[Token, None]:
+class EmailAlreadyRegisteredError(Exception):
     """
-    Registra un nuevo usuario
+    Error de un registro con un email que ya pertenece a otro usuario.
+    """
+
+
+async def register_user_service(user_create: UserCreate, session: AsyncSession) -> Union[Token, None]:
+    """
+    Registra un nuevo usuario con una sola insercion, el email duplicado se detecta por la restriccion unica.
     Args:
         session: la session de la base de datos.
         user_create: los datos del nuevo usuario.
 
     Returns:
-        el token de acceso
+        el token de acceso, lanza EmailAlreadyRegisteredError si el email ya esta registrado.
     """
     try:
-        existing_user = session.exec(select(User).where(User.email == user_create.email)).first()
-        if existing_user:
-            return None 
-
-        hashed_password = get_password_hash(user_create.password)
+        hashed_password = await hash_password(user_create.password)
         db_user = User(email=user_create.email, password=hashed_password)
         session.add(db_user)
-        session.commit()
-        session.refresh(db_user)
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            raise EmailAlreadyRegisteredError(user_create.email)
 
         access_token_expires = timedelta(minutes=60)
         access_token = create_access_token(
-            data={"sub": db_user.email}, expires_delta=access_token_expires
+            data={"sub": db_user.email, "uid": db_user.id}, expires_delta=access_token_expires
         )
         return {"access_token": access_token, "token_type": "bearer"}
+    except EmailAlreadyRegisteredError:
+        raise
     except Exception as e:
         print(f"Error en register_user_service: {e}")
         return None 
 
-def login_for_access_token_service(user_login: UserLogin, session: Session) -> Union[Token, None]:
+async def login_for_access_token_service(user_login: UserLogin, session: AsyncSession) -> Union[Token, None]:
     """
-    Obtiene el token de acceso
+    Obtiene el token de acceso, si el hash guardado usa un costo de bcrypt distinto al configurado se actualiza.
     Args:
-        session: La sesión de la base de datos.
+        session: La sesión de la base de datos.
         user_login: Los datos del usuario.
 
     Returns:
         el token de acceso
     """
     try:
-        user = session.exec(select(User).where(User.email == user_login.email)).first()
-        print(user_login.password, user.password)
-        if not user or not verify_password(user_login.password, user.password):
+        user = (await session.exec(select(User).where(User.email == user_login.email))).first()
+        if not user:
+            return None
+        verified, new_hash = await verify_and_update_password(user_login.password, user.password)
+        if not verified:
             return None 
+        if new_hash is not None:
+            user.password = new_hash
+            await session.commit()
 
         access_token_expires = timedelta(minutes=30)
         access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
         )
         return {"access_token": access_token, "token_type": "bearer"}
     except Exception as e:
         print(f"Error in login_for_access_token_service: {e}")
-        return None 
\ No newline at end of file
+        return None 
@@ -1,11 +1,11 @@
-from app.core.db import SessionLocal
+from app.core.db import AsyncSessionLocal
 from typing import Optional
-from sqlmodel import select
+from app.core.reference_cache import get_reference_data_async
 from app.models.canton_model import Canton
 
-def get_cantons_by_province(session: SessionLocal, province_id: Optional[int]=None)-> list[Canton] | None:
+async def get_cantons_by_province(session: AsyncSessionLocal, province_id: Optional[int]=None)-> list[Canton] | None:
     """
-    Recupera los cantones de la base de datos, opcionalmente filtrados por provincia
+    Recupera los cantones desde el indice de datos de referencia en memoria, opcionalmente filtrados por provincia
 
     Args:
         session: La sesión de la base de datos.
@@ -15,12 +15,11 @@ def get_cantons_by_province(session: SessionLocal, province_id: Optional[int]=No
         Una lista de cantones.
     """
     try:
-        statement = select(Canton)
+        reference_data = await get_reference_data_async(session)
         if province_id:
-            statement = statement.where(Canton.province_id == province_id)
+            cantons = list(reference_data.cantons_by_province.get(province_id, ()))
         else:
-            statement = select(Canton)
-        cantons = session.exec(statement).all()
+            cantons = list(reference_data.cantons)
         return cantons
     except Exception as e:
         return None
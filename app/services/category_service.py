@@ -1,10 +1,10 @@
-from app.core.db import SessionLocal
-from sqlmodel import select
+from app.core.db import AsyncSessionLocal
+from app.core.reference_cache import get_reference_data_async
 from app.models.category_model import Category
 
-def get_all_categories(session: SessionLocal)-> list[Category] | None:
+async def get_all_categories(session: AsyncSessionLocal)-> list[Category] | None:
     """
-    Recupera todas las categorias de la base de datos
+    Recupera todas las categorias desde el indice de datos de referencia en memoria
 
     Args:
         session: La sesión de la base de datos.
@@ -13,7 +13,7 @@ def get_all_categories(session: SessionLocal)-> list[Category] | None:
         Una lista de categorias.
     """
     try:
-        categories = session.exec(select(Category)).all()
+        categories = list((await get_reference_data_async(session)).categories)
         return categories
     except Exception as e:
         print(f"Error retrieving categories: {e}")
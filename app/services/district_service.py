@@ -1,12 +1,11 @@
-from app.core.db import SessionLocal
-from sqlmodel import select
+from app.core.db import AsyncSessionLocal
+from app.core.reference_cache import get_reference_data_async
 from typing import Optional
 from app.models.district_model import District
-from app.models.canton_model import Canton
 
-def get_districts(session: SessionLocal, canton_id: Optional[int] = None, province_id: Optional[int] = None)-> list[District] | None:
+async def get_districts(session: AsyncSessionLocal, canton_id: Optional[int] = None, province_id: Optional[int] = None)-> list[District] | None:
     """
-    Recupera los distritos de la base de datos, opcionalmente filtrados por canton o provincia
+    Recupera los distritos desde el indice de datos de referencia en memoria, opcionalmente filtrados por canton o provincia
 
     Args:
         session: La sesión de la base de datos.
@@ -17,13 +16,13 @@ def get_districts(session: SessionLocal, canton_id: Optional[int] = None, provin
         Una lista de distritos.
     """
     try:
+        reference_data = await get_reference_data_async(session)
         if canton_id:
-            statement = select(District).where(District.canton_id == canton_id)
+            districts = list(reference_data.districts_by_canton.get(canton_id, ()))
         elif province_id:
-            statement = select(District).join(Canton).where(Canton.province_id == province_id)
+            districts = list(reference_data.districts_by_province.get(province_id, ()))
         else:
-            statement = select(District)
-        districts = session.exec(statement).all()
+            districts = list(reference_data.districts)
         return districts
     except Exception as e:
         return None
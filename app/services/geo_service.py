@@ -0,0 +1,50 @@
+from sqlmodel import Session
+from fastapi.concurrency import run_in_threadpool
+from app.core.db import AsyncSessionLocal, engine
+from app.core.reference_cache import ReferenceData, get_reference_data_async, refresh_reference_cache, refresh_reference_cache_async
+from app.core.shared_cache import on_invalidation, publish_invalidation
+
+async def get_geo_tree(session: AsyncSessionLocal)-> ReferenceData | None:
+    """
+    Recupera el arbol de provincias, cantones y distritos junto a las categorias, ya serializado en memoria
+
+    Args:
+        session: La sesión de la base de datos.
+
+    Returns:
+        Los datos de referencia, incluyendo el arbol serializado y su ETag.
+    """
+    try:
+        return await get_reference_data_async(session)
+    except Exception as e:
+        print(f"Error retrieving geo tree: {e}")
+        return None
+
+async def refresh_geo_tree(session: AsyncSessionLocal)-> ReferenceData | None:
+    """
+    Recarga desde la base de datos el indice de provincias, cantones, distritos y categorias y avisa a los demas workers
+
+    Args:
+        session: La sesión de la base de datos.
+
+    Returns:
+        Los nuevos datos de referencia.
+    """
+    try:
+        reference_data = await refresh_reference_cache_async(session)
+        await run_in_threadpool(publish_invalidation, "reference", etag=reference_data.etag)
+        return reference_data
+    except Exception as e:
+        print(f"Error refreshing geo tree: {e}")
+        return None
+
+@on_invalidation("reference")
+def _apply_reference_invalidation(message: dict):
+    """
+    Recarga los datos de referencia de este worker cuando otro worker los recargo.
+
+    Args:
+        message: la invalidacion publicada, con la ETag de los nuevos datos.
+    """
+    with Session(engine) as session:
+        refresh_reference_cache(session)
@@ -0,0 +1,269 @@
+import os
+from typing import Optional
+from sqlmodel import Session
+from app.core.db import engine
+from app.core.conditional import bump_version_statement, utcnow
+from app.core.image_variants import build_variants, shutdown_variant_pool
+from app.core.storage import IMAGE_FOLDER, get_storage
+from app.core.upload_queue import UPLOAD_QUEUE_PATH, Job, PermanentJobError, UploadQueue, UploadWorkerPool
+from app.core.uploads import UPLOAD_SPOOL_DIR, UploadRejectedError, discard_spooled, spool_url
+from app.models.legend_model import Legend
+
+IMAGE_PENDING = "pending"
+IMAGE_READY = "ready"
+IMAGE_FAILED = "failed"
+
+UPLOAD_JOB = "upload"
+DELETE_JOB = "delete"
+INGEST_JOB = "ingest_url"
+
+_queue: Optional[UploadQueue] = None
+_workers: Optional[UploadWorkerPool] = None
+
+
+def get_upload_queue() -> UploadQueue:
+    """
+    Obtiene la cola persistente de trabajos de imagenes, creandola si no existe.
+
+    Returns:
+        la cola de trabajos.
+    """
+    global _queue
+    if _queue is None:
+        _queue = UploadQueue(UPLOAD_QUEUE_PATH)
+    return _queue
+
+
+def variant_public_ids(variants: Optional[dict]) -> list[str]:
+    """
+    Obtiene los identificadores en el backend de almacenamiento de las versiones de una imagen.
+
+    Args:
+        variants: las versiones registradas en la leyenda.
+
+    Returns:
+        la lista de identificadores.
+    """
+    return [variant["public_id"] for variant in (variants or {}).values()]
+
+
+def _upload_variants(storage, path: str) -> dict:
+    """
+    Genera las versiones redimensionadas de la imagen y las carga en el backend de almacenamiento.
+    Si la imagen no se puede procesar la leyenda conserva solo la imagen original.
+
+    Args:
+        storage: el backend de almacenamiento.
+        path: la ruta de la imagen original en la carpeta de spool.
+
+    Returns:
+        las versiones cargadas por ancho, con su url y su identificador.
+    """
+    try:
+        generated = build_variants(path, UPLOAD_SPOOL_DIR)
+    except Exception as e:
+        print(f"Error generating image variants for {path}: {e}")
+        return {}
+    variants = {}
+    try:
+        for width, variant_path in generated:
+            url, public_id = storage.upload(variant_path, IMAGE_FOLDER)
+            variants[str(width)] = {"url": url, "public_id": public_id}
+    except Exception:
+        for public_id in variant_public_ids(variants):
+            storage.delete(public_id)
+        raise
+    finally:
+        for _, variant_path in generated:
+            discard_spooled(variant_path)
+    return variants
+
+
+def _handle_upload(job: Job):
+    """
+    Carga la imagen guardada en la carpeta de spool en el backend de almacenamiento.
+
+    Args:
+        job: el trabajo con la ruta del archivo en la carpeta de spool.
+    """
+    path = job.payload["path"]
+    if not os.path.exists(path):
+        raise PermanentJobError(f"Spooled file {path} is missing")
+    with Session(engine) as session:
+        if session.get(Legend, job.legend_id) is None:
+            discard_spooled(path)
+            return
+    _store_image(job.legend_id, path)
+
+
+def _handle_ingest(job: Job):
+    """
+    Descarga la imagen desde su url original y la carga en el backend de almacenamiento, los errores de red
+    o del servidor de origen se reintentan y las imagenes invalidas se marcan como fallidas.
+
+    Args:
+        job: el trabajo con la url de la imagen.
+    """
+    with Session(engine) as session:
+        if session.get(Legend, job.legend_id) is None:
+            return
+    import httpx
+
+    try:
+        path = spool_url(job.payload["url"])
+    except UploadRejectedError as e:
+        raise PermanentJobError(e.detail)
+    except httpx.InvalidURL as e:
+        raise PermanentJobError(str(e))
+    try:
+        _store_image(job.legend_id, path)
+    except Exception:
+        discard_spooled(path)
+        raise
+
+
+def _store_image(legend_id: int, path: str):
+    """
+    Carga la imagen y sus versiones redimensionadas en el backend de almacenamiento y las asocia a la leyenda,
+    eliminando la imagen y las versiones anteriores.
+
+    Args:
+        legend_id: el id de la leyenda.
+        path: la ruta de la imagen en la carpeta de spool.
+    """
+    storage = get_storage()
+    image_url, public_id = storage.upload(path, IMAGE_FOLDER)
+    try:
+        variants = _upload_variants(storage, path)
+    except Exception:
+        storage.delete(public_id)
+        raise
+
+    with Session(engine) as session:
+        legend = session.get(Legend, legend_id)
+        if legend is None:
+            for stale_public_id in [public_id, *variant_public_ids(variants)]:
+                storage.delete(stale_public_id)
+            discard_spooled(path)
+            return
+        previous_public_ids = [legend.cloudinary_public_id, *variant_public_ids(legend.image_variants)]
+        legend.image_url = image_url
+        legend.cloudinary_public_id = public_id
+        legend.image_variants = variants or None
+        legend.image_status = IMAGE_READY
+        legend.updated_at = utcnow()
+        legend.version = (legend.version or 0) + 1
+        session.exec(bump_version_statement(Legend.__tablename__))
+        session.commit()
+
+    discard_spooled(path)
+    for previous_public_id in previous_public_ids:
+        if previous_public_id and previous_public_id != public_id:
+            enqueue_image_delete(previous_public_id)
+
+
+def _handle_delete(job: Job):
+    """
+    Elimina una imagen del backend de almacenamiento.
+
+    Args:
+        job: el trabajo con el identificador de la imagen.
+    """
+    get_storage().delete(job.payload["public_id"])
+
+
+def _handle_failure(job: Job, error: str):
+    """
+    Marca la imagen de la leyenda como fallida cuando un trabajo de carga agota sus reintentos.
+
+    Args:
+        job: el trabajo fallido.
+        error: el ultimo error del trabajo.
+    """
+    if job.kind not in (UPLOAD_JOB, INGEST_JOB):
+        return
+    if job.kind == UPLOAD_JOB:
+        discard_spooled(job.payload["path"])
+    with Session(engine) as session:
+        legend = session.get(Legend, job.legend_id)
+        if legend is not None and legend.image_status == IMAGE_PENDING:
+            legend.image_status = IMAGE_FAILED
+            legend.updated_at = utcnow()
+            legend.version = (legend.version or 0) + 1
+            session.exec(bump_version_statement(Legend.__tablename__))
+            session.commit()
+
+
+def get_image_workers() -> UploadWorkerPool:
+    """
+    Obtiene el conjunto de hilos que procesan la cola de imagenes, creandolo si no existe.
+
+    Returns:
+        el conjunto de hilos de trabajo.
+    """
+    global _workers
+    if _workers is None:
+        _workers = UploadWorkerPool(
+            get_upload_queue(),
+            handlers={UPLOAD_JOB: _handle_upload, INGEST_JOB: _handle_ingest, DELETE_JOB: _handle_delete},
+            on_failure=_handle_failure,
+        )
+    return _workers
+
+
+def start_image_workers():
+    get_image_workers().start()
+
+
+def stop_image_workers():
+    if _workers is not None:
+        _workers.stop()
+    shutdown_variant_pool()
+
+
+def enqueue_image_upload(legend_id: int, path: str) -> int:
+    """
+    Agrega a la cola la carga de una imagen ya guardada en la carpeta de spool.
+
+    Args:
+        legend_id: el id de la leyenda.
+        path: la ruta del archivo en la carpeta de spool.
+
+    Returns:
+        el id del trabajo.
+    """
+    job_id = get_upload_queue().enqueue(UPLOAD_JOB, legend_id, {"path": path})
+    get_image_workers().notify()
+    return job_id
+
+
+def enqueue_image_ingest(legend_ids_urls: list[tuple[int, str]]) -> int:
+    """
+    Agrega a la cola la descarga y carga de las imagenes de leyendas importadas con una url externa.
+
+    Args:
+        legend_ids_urls: las tuplas (id de la leyenda, url de la imagen).
+
+    Returns:
+        la cantidad de trabajos agregados.
+    """
+    if not legend_ids_urls:
+        return 0
+    count = get_upload_queue().enqueue_many(INGEST_JOB, [(legend_id, {"url": url}) for legend_id, url in legend_ids_urls])
+    get_image_workers().notify()
+    return count
+
+
+def enqueue_image_delete(public_id: str) -> int:
+    """
+    Agrega a la cola la eliminacion de una imagen del backend de almacenamiento.
+
+    Args:
+        public_id: el identificador de la imagen.
+
+    Returns:
+        el id del trabajo.
+    """
+    job_id = get_upload_queue().enqueue(DELETE_JOB, None, {"public_id": public_id})
+    get_image_workers().notify()
+    return job_id
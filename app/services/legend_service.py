@@ -1,61 +1,432 @@
-from app.core.db import SessionLocal
+import logging
+from contextlib import asynccontextmanager
+from app.core.db import AsyncSessionLocal, engine, read_session
 from pydantic import ValidationError
-from typing import Optional, List
-from sqlmodel import select
-from app.models.legend_model import Legend, LegendRead
+from typing import Optional, List, AsyncIterator
+from sqlmodel import Session, select, or_, and_, func
+from sqlalchemy import insert, literal, union_all
+from app.models.legend_model import Legend, LegendRead, LegendPage, LegendImageStatus, LegendBulkResult, LegendBulkError, LegendFacets, FacetCount, YearFacetCount, LegendBatchResult
 from app.models.district_model import District
 from app.models.canton_model import Canton
 from app.models.category_model import Category
 from app.models.province_model import Province
 from app.schemas.legend_schema import LegendCreate, LegendUpdate
 from fastapi import UploadFile 
-from app.core.cloudinary_service import upload_image, delete_image
-from datetime import date
-from sqlalchemy.orm import Session, selectinload
+from fastapi.concurrency import run_in_threadpool
+from app.core.uploads import UploadRejectedError, spool_upload, discard_spooled
+from app.services.image_service import IMAGE_PENDING, enqueue_image_upload, enqueue_image_delete, enqueue_image_ingest, variant_public_ids
+from datetime import date, datetime
+from app.core.pagination import DEFAULT_PAGE_SIZE, encode_cursor
+from app.core.streaming import STREAM_BATCH_SIZE
+from app.core.search_index import drop_search_hits, legend_search_index, load_search_hits, search_hits
+from app.core.conditional import bump_version_statement, get_table_version, utcnow
+from app.models.table_version_model import TableVersion
+from app.core.bulk_import import BULK_BATCH_SIZE, BULK_MAX_REPORTED_ERRORS, RecordError, iter_records
+from app.core.reference_cache import ReferenceData, get_reference_data_async
+from app.core.shared_cache import cache_get, cache_set, on_invalidation, publish_invalidation
 
-def get_all_legends(session: SessionLocal)-> list[LegendRead] | None:
+logger = logging.getLogger(__name__)
+
+def _legend_read_statement():
+    """
+    Construye la consulta de proyeccion que recupera en una sola sentencia las columnas necesarias para LegendRead
+    desde las tablas de leyendas, categorias, distritos, cantones y provincias.
+
+    Returns:
+        la consulta con las columnas etiquetadas con los nombres de los campos de LegendRead.
+    """
+    return (
+        select(
+            Legend.id,
+            Legend.name,
+            Legend.description,
+            Legend.category_id,
+            Legend.legend_date,
+            Legend.image_url,
+            Legend.cloudinary_public_id,
+            Legend.district_id,
+            Legend.image_status,
+            Legend.image_variants,
+            Category.name.label("category_name"),
+            District.name.label("district_name"),
+            Canton.id.label("canton_id"),
+            Canton.name.label("canton_name"),
+            Province.id.label("province_id"),
+            Province.name.label("province_name"),
+        )
+        .select_from(Legend)
+        .join(Category, Legend.category_id == Category.id)
+        .join(District, Legend.district_id == District.id)
+        .join(Canton, District.canton_id == Canton.id)
+        .join(Province, Canton.province_id == Province.id)
+    )
+
+
+def _row_to_legend_read(row) -> LegendRead:
+    """
+    Convierte una fila de la consulta de proyeccion en un LegendRead.
+
+    Args:
+        row: la fila recuperada mediante _legend_read_statement.
+
+    Returns:
+        la leyenda formateada mediante LegendRead, con el srcset armado a partir de las versiones de la imagen.
+    """
+    return LegendRead.model_validate(_row_to_dict(row))
+
+
+def _row_to_dict(row) -> dict:
+    """
+    Convierte una fila de la consulta de proyeccion en un diccionario con los campos de LegendRead,
+    sin validarlo, para las respuestas que se serializan directamente.
+
+    Args:
+        row: la fila recuperada mediante _legend_read_statement.
+
+    Returns:
+        el diccionario de la leyenda con el srcset armado a partir de las versiones de la imagen.
+    """
+    data = dict(row._mapping)
+    variants = data.pop("image_variants", None) or {}
+    data["srcset"] = {width: variant["url"] for width, variant in variants.items()}
+    return data
+
+
+def _apply_keyset(statement, sort: str, order: str, after: Optional[tuple], limit: Optional[int]):
+    """
+    Aplica el ordenamiento estable y la condicion de keyset a una consulta de leyendas.
+
+    Args:
+        statement: la consulta a paginar.
+        sort: el campo de ordenamiento (id, legend_date o name).
+        order: la direccion del ordenamiento (asc o desc).
+        after: la tupla (valor, id) de la ultima fila de la pagina anterior.
+        limit: la cantidad de filas de la pagina, None para no limitar la consulta.
+
+    Returns:
+        la consulta ordenada, filtrada a partir del cursor y limitada a limit + 1 filas.
+    """
+    column = getattr(Legend, sort)
+    descending = order == "desc"
+    if after is not None:
+        value, last_id = after
+        if sort == "id":
+            statement = statement.where(Legend.id < last_id if descending else Legend.id > last_id)
+        elif descending:
+            statement = statement.where(or_(column < value, and_(column == value, Legend.id < last_id)))
+        else:
+            statement = statement.where(or_(column > value, and_(column == value, Legend.id > last_id)))
+    if sort == "id":
+        order_by = (Legend.id.desc() if descending else Legend.id.asc(),)
+    else:
+        order_by = (column.desc(), Legend.id.desc()) if descending else (column.asc(), Legend.id.asc())
+    statement = statement.order_by(*order_by)
+    return statement if limit is None else statement.limit(limit + 1)
+
+
+def _build_page(items: list[LegendRead], sort: str, order: str, limit: int) -> LegendPage:
     """
-    Recupera todas las leyendas de la base de datos, incluyendo el nombre de la categoría, el nombre del distrito, el nombre del canton
+    Construye la pagina de resultados y el cursor de la siguiente pagina.
+
+    Args:
+        items: las leyendas recuperadas, con una fila extra si existe una siguiente pagina.
+        sort: el campo de ordenamiento.
+        order: la direccion del ordenamiento.
+        limit: la cantidad de filas de la pagina.
+
+    Returns:
+        la pagina de leyendas formateada mediante LegendPage.
+    """
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(sort, order, getattr(last, sort), last.id)
+    return LegendPage(items=items, next_cursor=next_cursor)
+
+
+async def _relevance_page(session: AsyncSessionLocal, statement, scores: dict[int, float], order: str, after: Optional[tuple], limit: int) -> LegendPage:
+    """
+    Construye una pagina de leyendas ordenadas por la relevancia de la busqueda, de mayor a menor. Las leyendas se
+    ordenan en memoria con los puntajes del indice y solo se consultan los ids de la pagina: si los demas filtros
+    descartan algunas, se consulta el siguiente tramo del ranking, cada vez del doble de tamaño, hasta completarla.
+
+    Args:
+        session: la sesión de la base de datos.
+        statement: la consulta de proyeccion con los filtros aplicados, sin el filtro por nombre.
+        scores: los puntajes de relevancia por id de leyenda devueltos por el indice de busqueda.
+        order: la direccion del ordenamiento, usada solo para validar el cursor.
+        after: la tupla (puntaje, id) de la ultima fila de la pagina anterior.
+        limit: la cantidad de filas de la pagina.
+
+    Returns:
+        la pagina de leyendas formateada mediante LegendPage.
+    """
+    ranked = sorted(((score, legend_id) for legend_id, score in scores.items()), key=lambda item: (-item[0], item[1]))
+    if after is not None:
+        last_score, last_id = after
+        ranked = [item for item in ranked if (-item[0], item[1]) > (-last_score, last_id)]
+    page = []
+    start, batch_size = 0, limit + 1
+    while start < len(ranked) and len(page) <= limit:
+        batch = ranked[start:start + batch_size]
+        rows = (await session.exec(statement.where(Legend.id.in_([legend_id for _, legend_id in batch])))).all()
+        by_id = {row.id: row for row in rows}
+        page.extend((score, legend_id, by_id[legend_id]) for score, legend_id in batch if legend_id in by_id)
+        start += batch_size
+        batch_size = min(batch_size * 2, max(limit + 1, STREAM_BATCH_SIZE))
+    items = [_row_to_legend_read(row) for _, _, row in page[:limit]]
+    next_cursor = None
+    if len(page) > limit:
+        last_score, last_id, _ = page[limit - 1]
+        next_cursor = encode_cursor("relevance", order, last_score, last_id)
+    return LegendPage(items=items, next_cursor=next_cursor)
+
+
+async def get_all_legends(
+    session: AsyncSessionLocal,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[tuple] = None,
+    sort: str = "id",
+    order: str = "asc",
+)-> LegendPage | None:
+    """
+    Recupera una pagina de leyendas de la base de datos, incluyendo el nombre de la categoría, el nombre del distrito, el nombre del canton
     y el nombre de la provincia con sus respectivos ids.
 
     Args:
-        session: La sesión de la base de datos.
+        session: La sesión de la base de datos.
+        limit: La cantidad de leyendas por pagina.
+        after: La posicion (valor, id) decodificada del cursor de la pagina anterior.
+        sort: El campo de ordenamiento.
+        order: La direccion del ordenamiento.
 
     Returns:
-        Una lista de leyendas formateadas mediante LegendRead.
+        Una pagina de leyendas formateadas mediante LegendRead junto al cursor de la siguiente pagina.
     """
     try:
-        statement = select(Legend).join(Category).join(District).join(Canton).join(Province)
-        legends = session.exec(statement).all()
-        results = [
-            LegendRead(
-                id=legend.id,
-                name=legend.name,
-                category_id=legend.category_id,
-                description=legend.description,
-                legend_date=legend.legend_date,
-                image_url=legend.image_url,
-                cloudinary_public_id=legend.cloudinary_public_id,
-                district_id=legend.district_id,
-                category_name=legend.category.name,
-                district_name=legend.district.name,
-                canton_id=legend.district.canton.id,
-                canton_name=legend.district.canton.name,
-                province_id=legend.district.canton.province.id,
-                province_name=legend.district.canton.province.name
-
-            )
-            for legend in legends
-        ]
+        statement = _apply_keyset(_legend_read_statement(), sort, order, after, limit)
+        rows = (await session.exec(statement)).all()
+        results = [_row_to_legend_read(row) for row in rows]
         
    
-        return results
+        return _build_page(results, sort, order, limit)
     except Exception as e:
         print(f"Error retrieving legends: {e}")
         return None
 
-def get_legends_filters(
-    session: Session,
+async def get_legend_page_rows(
+    session: AsyncSessionLocal,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[tuple] = None,
+    sort: str = "id",
+    order: str = "asc",
+) -> tuple[list, Optional[str]] | None:
+    """
+    Recupera una pagina de leyendas como filas de la consulta de proyeccion, sin construir los modelos LegendRead,
+    para los formatos que se codifican por columnas como el formato compacto.
+
+    Args:
+        session: La sesión de la base de datos.
+        limit: La cantidad de leyendas por pagina.
+        after: La posicion (valor, id) decodificada del cursor de la pagina anterior.
+        sort: El campo de ordenamiento.
+        order: La direccion del ordenamiento.
+
+    Returns:
+        una tupla con las filas de la pagina y el cursor de la siguiente pagina.
+    """
+    try:
+        statement = _apply_keyset(_legend_read_statement(), sort, order, after, limit)
+        rows = (await session.exec(statement)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort, order, getattr(last, sort), last.id)
+        return rows, next_cursor
+    except Exception as e:
+        print(f"Error retrieving legends: {e}")
+        return None
+
+def _apply_filters(
+    statement,
+    scores: Optional[dict[int, float]] = None,
+    category_id: Optional[int] = None,
+    legend_date_initial: Optional[date] = None,
+    legend_date_final: Optional[date] = None,
+    province_id: Optional[int] = None,
+    canton_id: Optional[int] = None,
+    district_id: Optional[int] = None,
+):
+    """
+    Aplica los filtros de leyendas a la consulta de proyeccion.
+
+    Args:
+        statement: la consulta construida mediante _legend_read_statement.
+        scores: los puntajes de la busqueda por nombre, si se indican la consulta se une a la tabla temporal
+            search_hits, que se carga en la sesion mediante _search_hits.
+        los demas parametros son los filtros por categoria, rango de fechas, provincia, canton y distrito.
+
+    Returns:
+        la consulta filtrada.
+    """
+    if scores is not None:
+        statement = statement.join(search_hits, search_hits.c.legend_id == Legend.id)
+    if category_id:
+        statement = statement.where(Legend.category_id == category_id)
+    if legend_date_initial:
+        statement = statement.where(Legend.legend_date >= legend_date_initial)
+    if legend_date_final:
+        statement = statement.where(Legend.legend_date <= legend_date_final)
+    if province_id:
+        statement = statement.where(Province.id == province_id)
+    if canton_id:
+        statement = statement.where(Canton.id == canton_id)
+    if district_id:
+        statement = statement.where(District.id == district_id)
+    return statement
+
+
+@asynccontextmanager
+async def _search_hits(session: AsyncSessionLocal, scores: Optional[dict[int, float]]):
+    """
+    Carga los ids encontrados por la busqueda por nombre en la tabla temporal search_hits de la conexion de la
+    sesion mientras se ejecutan las consultas filtradas con _apply_filters, y la elimina al terminar.
+
+    Args:
+        session: la sesión de la base de datos.
+        scores: los puntajes de la busqueda, None si no se busco por nombre.
+    """
+    if scores is None:
+        yield
+        return
+    await session.run_sync(lambda sync_session: load_search_hits(sync_session.connection(), scores))
+    try:
+        yield
+    finally:
+        await session.run_sync(lambda sync_session: drop_search_hits(sync_session.connection()))
+
+
+async def _stream_rows(statement, batch_size: int, scores: Optional[dict[int, float]] = None) -> AsyncIterator[list]:
+    """
+    Ejecuta una consulta con un cursor del lado del servidor y entrega sus filas por lotes. Usa su propia sesion
+    porque se consume mientras se envia la respuesta, despues de que la sesion de la peticion se cerro.
+
+    Args:
+        statement: la consulta a ejecutar.
+        batch_size: la cantidad de filas por lote.
+        scores: los puntajes de la busqueda por nombre que se cargan en search_hits, si la consulta la usa.
+
+    Returns:
+        un iterador de lotes de filas.
+    """
+    async with read_session() as session, _search_hits(session, scores):
+        result = await session.stream(statement.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+
+
+async def stream_legends(
+    after: Optional[tuple] = None,
+    sort: str = "id",
+    order: str = "asc",
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> AsyncIterator[list[dict]]:
+    """
+    Recupera todas las leyendas a partir del cursor por lotes, usando un cursor del lado del servidor, de modo que
+    la memoria usada no depende de la cantidad de filas.
+
+    Args:
+        after: La posicion (valor, id) decodificada del cursor de la pagina anterior.
+        sort: El campo de ordenamiento.
+        order: La direccion del ordenamiento.
+        batch_size: La cantidad de filas por lote.
+
+    Returns:
+        un iterador de lotes de leyendas como diccionarios con los campos de LegendRead.
+    """
+    async for partition in stream_legend_rows(after, sort, order, batch_size):
+        yield [_row_to_dict(row) for row in partition]
+
+
+async def stream_legend_rows(
+    after: Optional[tuple] = None,
+    sort: str = "id",
+    order: str = "asc",
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> AsyncIterator[list]:
+    """
+    Recupera todas las leyendas a partir del cursor por lotes de filas de la consulta de proyeccion, con un cursor
+    del lado del servidor.
+
+    Args:
+        after: La posicion (valor, id) decodificada del cursor de la pagina anterior.
+        sort: El campo de ordenamiento.
+        order: La direccion del ordenamiento.
+        batch_size: La cantidad de filas por lote.
+
+    Returns:
+        un iterador de lotes de filas. Un error de la base de datos se registra y se propaga, para que la conexion
+        se corte y el cliente no reciba como completa una lista truncada.
+    """
+    statement = _apply_keyset(_legend_read_statement(), sort, order, after, None)
+    try:
+        async for partition in _stream_rows(statement, batch_size):
+            yield partition
+    except Exception:
+        logger.exception("Error streaming legends")
+        raise
+
+async def export_legends(
+    name: Optional[str] = None,
+    category_id: Optional[int] = None,
+    legend_date_initial: Optional[date] = None,
+    legend_date_final: Optional[date] = None,
+    province_id: Optional[int] = None,
+    canton_id: Optional[int] = None,
+    district_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> AsyncIterator[list]:
+    """
+    Recupera por lotes y ordenadas por id las leyendas que cumplen los filtros, con un cursor del lado del servidor,
+    para exportarlas con memoria constante. Una exportacion interrumpida se retoma desde el ultimo id recibido.
+
+    Args:
+        name: el texto buscado en el nombre y la descripcion.
+        category_id, legend_date_initial, legend_date_final, province_id, canton_id, district_id: los filtros.
+        after_id: el ultimo id ya exportado, se exportan las leyendas con id mayor.
+        batch_size: la cantidad de filas por lote.
+
+    Returns:
+        un iterador de lotes de filas de la consulta de proyeccion. Un error de la base de datos se registra y se
+        propaga para cortar la conexion, asi el cliente detecta la interrupcion y retoma desde el ultimo id.
+    """
+    scores = legend_search_index.search(name) if name else None
+    if name and not scores:
+        return
+    statement = _apply_filters(
+        _legend_read_statement(),
+        scores=scores,
+        category_id=category_id,
+        legend_date_initial=legend_date_initial,
+        legend_date_final=legend_date_final,
+        province_id=province_id,
+        canton_id=canton_id,
+        district_id=district_id,
+    )
+    after = (None, after_id) if after_id is not None else None
+    statement = _apply_keyset(statement, "id", "asc", after, None)
+    try:
+        async for partition in _stream_rows(statement, batch_size, scores):
+            yield partition
+    except Exception:
+        logger.exception("Error exporting legends")
+        raise
+
+async def get_legends_filters(
+    session: AsyncSessionLocal,
     name: Optional[str] = None,
     category_id: Optional[int] = None,
     legend_date_initial: Optional[date] = None, 
@@ -63,22 +434,91 @@ def get_legends_filters(
     province_id: Optional[int] = None,
     canton_id: Optional[int] = None,
     district_id: Optional[int] = None,
-) -> List[LegendRead] | None:
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[tuple] = None,
+    sort: str = "id",
+    order: str = "asc",
+) -> LegendPage | None:
     """
-    Recupera las leyendas filtradas de la base de datos, incluyendo el nombre de la categoría, el nombre del distrito, el nombre del canton
+    Recupera una pagina de leyendas filtradas de la base de datos, incluyendo el nombre de la categoría, el nombre del distrito, el nombre del canton
     y el nombre de la provincia con sus respectivos ids.
 
     Args:
         session: La sesión de la base de datos.
+        limit: La cantidad de leyendas por pagina.
+        after: La posicion (valor, id) decodificada del cursor de la pagina anterior.
+        sort: El campo de ordenamiento, "relevance" ordena por la relevancia de la busqueda por nombre.
+        order: La direccion del ordenamiento.
 
     Returns:
-        Una lista de leyendas formateadas mediante LegendRead.
+        Una pagina de leyendas formateadas mediante LegendRead junto al cursor de la siguiente pagina.
     """
     try:
-        statement = (select(Legend).join(Category).join(District).join(Canton).join(Province ))
+        scores = legend_search_index.search(name) if name else None
+        if name and not scores:
+            return LegendPage(items=[], next_cursor=None)
+        filters = dict(
+            category_id=category_id,
+            legend_date_initial=legend_date_initial,
+            legend_date_final=legend_date_final,
+            province_id=province_id,
+            canton_id=canton_id,
+            district_id=district_id,
+        )
+
+        if sort == "relevance":
+            return await _relevance_page(session, _apply_filters(_legend_read_statement(), **filters), scores, order, after, limit)
+
+        statement = _apply_keyset(_apply_filters(_legend_read_statement(), scores=scores, **filters), sort, order, after, limit)
+        async with _search_hits(session, scores):
+            rows = (await session.exec(statement)).all()
+        results = [_row_to_legend_read(row) for row in rows]
+        
+   
+        return _build_page(results, sort, order, limit)
+    except Exception as e:
+        print(f"Error al recuperar leyendas con filtros: {e}")
+        return None
 
-        if name:
-            statement = statement.where(Legend.name.ilike(f"%{name}%"))
+def _facet_counts(counts: dict[int, int], names: dict) -> list[FacetCount]:
+    return [
+        FacetCount(id=item_id, name=names[item_id].name, count=count)
+        for item_id, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        if item_id in names
+    ]
+
+async def get_legend_facets(
+    session: AsyncSessionLocal,
+    name: Optional[str] = None,
+    category_id: Optional[int] = None,
+    legend_date_initial: Optional[date] = None,
+    legend_date_final: Optional[date] = None,
+    province_id: Optional[int] = None,
+    canton_id: Optional[int] = None,
+    district_id: Optional[int] = None,
+) -> LegendFacets | None:
+    """
+    Cuenta las leyendas que cumplen los filtros agrupadas por categoria, provincia, canton, distrito y año en una sola
+    consulta: una union de GROUP BY sobre la tabla de leyendas por categoria, distrito y año, sin unir las tablas
+    geograficas. Los conteos por canton y provincia se suman desde los distritos con los datos de referencia en memoria,
+    que tambien aportan los nombres, y los filtros por provincia o canton se traducen a sus distritos.
+
+    Args:
+        session: La sesión de la base de datos.
+        los demas parametros son los mismos filtros de get_legends_filters.
+
+    Returns:
+        el total de leyendas y los conteos de cada dimension, ordenados de mayor a menor (los años en orden cronologico).
+    """
+    try:
+        reference_data = await get_reference_data_async(session)
+        scores = legend_search_index.search(name) if name else None
+        if name and not scores:
+            return LegendFacets()
+
+        statement = select(Legend.category_id, Legend.district_id, Legend.legend_date)
+        if scores is not None:
+            statement = statement.join(search_hits, search_hits.c.legend_id == Legend.id)
         if category_id:
             statement = statement.where(Legend.category_id == category_id)
         if legend_date_initial:
@@ -86,41 +526,52 @@ def get_legends_filters(
         if legend_date_final:
             statement = statement.where(Legend.legend_date <= legend_date_final)
         if province_id:
-            statement = statement.where(Province.id == province_id)
+            districts = reference_data.districts_by_province.get(province_id, ())
+            statement = statement.where(Legend.district_id.in_([d.id for d in districts]))
         if canton_id:
-            statement = statement.where(Canton.id == canton_id)
+            districts = reference_data.districts_by_canton.get(canton_id, ())
+            statement = statement.where(Legend.district_id.in_([d.id for d in districts]))
         if district_id:
-            statement = statement.where(District.id == district_id)
-            
-        legends = session.exec(statement).all()
-        results = [
-            LegendRead(
-                id=legend.id,
-                name=legend.name,
-                category_id=legend.category_id,
-                description=legend.description,
-                legend_date=legend.legend_date,
-                image_url=legend.image_url,
-                cloudinary_public_id=legend.cloudinary_public_id,
-                district_id=legend.district_id,
-                category_name=legend.category.name,
-                district_name=legend.district.name,
-                canton_id=legend.district.canton.id,
-                canton_name=legend.district.canton.name,
-                province_id=legend.district.canton.province.id,
-                province_name=legend.district.canton.province.name
-
-            )
-            for legend in legends
-        ]
-        
-   
-        return results
+            statement = statement.where(Legend.district_id == district_id)
+
+        filtered = statement.cte("filtered_legends")
+        year = func.extract("year", filtered.c.legend_date)
+        facets = union_all(
+            select(literal("category").label("facet"), filtered.c.category_id.label("value"), func.count().label("count"))
+            .group_by(filtered.c.category_id),
+            select(literal("district"), filtered.c.district_id, func.count()).group_by(filtered.c.district_id),
+            select(literal("year"), year, func.count()).group_by(year),
+        )
+        async with _search_hits(session, scores):
+            rows = (await session.exec(facets)).all()
+
+        counts: dict[str, dict[int, int]] = {"category": {}, "district": {}, "year": {}}
+        for facet, value, count in rows:
+            if value is not None:
+                counts[facet][int(value)] = count
+        canton_counts: dict[int, int] = {}
+        province_counts: dict[int, int] = {}
+        for item_id, count in counts["district"].items():
+            district = reference_data.districts_by_id.get(item_id)
+            if district is None:
+                continue
+            canton = reference_data.cantons_by_id[district.canton_id]
+            canton_counts[canton.id] = canton_counts.get(canton.id, 0) + count
+            province_counts[canton.province_id] = province_counts.get(canton.province_id, 0) + count
+
+        return LegendFacets(
+            total=sum(counts["category"].values()),
+            category=_facet_counts(counts["category"], reference_data.categories_by_id),
+            province=_facet_counts(province_counts, reference_data.provinces_by_id),
+            canton=_facet_counts(canton_counts, reference_data.cantons_by_id),
+            district=_facet_counts(counts["district"], reference_data.districts_by_id),
+            year=[YearFacetCount(year=value, count=count) for value, count in sorted(counts["year"].items())],
+        )
     except Exception as e:
-        print(f"Error al recuperar leyendas con filtros: {e}")
+        print(f"Error al contar las leyendas por faceta: {e}")
         return None
 
-def get_legend_by_id(legend_id: int, session: SessionLocal) -> Legend | None:
+async def get_legend_by_id(legend_id: int, session: AsyncSessionLocal) -> Legend | None:
     """
     Recupera una leyenda por su ID de la base de datos, incluyendo solo información de la leyenda.
     Args:
@@ -131,12 +582,12 @@ def get_legend_by_id(legend_id: int, session: SessionLocal) -> Legend | None:
         la información de la leyenda.
     """
     try:
-        legend=session.get(Legend, legend_id)
+        legend=await session.get(Legend, legend_id)
         return legend
     except Exception as e:
         return None
 
-def get_legend(legend_id: int, session: SessionLocal)-> LegendRead| None:
+async def get_legend(legend_id: int, session: AsyncSessionLocal)-> LegendRead| None:
     """
     Recupera una leyenda por su ID de la base de datos, incluyendo el nombre de la categoría, el nombre del distrito, el nombre del canton
     y el nombre de la provincia con sus respectivos ids.
@@ -148,24 +599,9 @@ def get_legend(legend_id: int, session: SessionLocal)-> LegendRead| None:
         Una leyenda formateada mediante LegendRead.
     """
     try:
-        statement = select(Legend).join(Category).join(District).join(Canton).join(Province).where(Legend.id == legend_id)
-        legend = session.exec(statement).one()
-        result = LegendRead(
-                id=legend.id,
-                name=legend.name,
-                category_id=legend.category_id,
-                description=legend.description,
-                legend_date=legend.legend_date,
-                image_url=legend.image_url,
-                cloudinary_public_id=legend.cloudinary_public_id,
-                district_id=legend.district_id,
-                category_name=legend.category.name,
-                district_name=legend.district.name,
-                canton_id=legend.district.canton.id,
-                canton_name=legend.district.canton.name,
-                province_id=legend.district.canton.province.id,
-                province_name=legend.district.canton.province.name
-            )
+        statement = _legend_read_statement().where(Legend.id == legend_id)
+        row = (await session.exec(statement)).one()
+        result = _row_to_legend_read(row)
             
             
         
@@ -175,112 +611,395 @@ def get_legend(legend_id: int, session: SessionLocal)-> LegendRead| None:
         return None
 
     
-async def create_legend(legend_data: LegendCreate, session: SessionLocal, image_file:UploadFile=None) -> Legend | None:
+async def get_legend_json(legend_id: int, session: AsyncSessionLocal, cache_key: str) -> bytes | None:
     """
-    crea una leyenda en la base de datos, además de cargar la imagen en el servicio de cloudinary.
+    Recupera una leyenda ya serializada, primero desde la cache compartida entre workers y si no esta mediante
+    get_legend. La clave incluye la version de la leyenda, por lo que una escritura la reemplaza sin borrarla.
+
     Args:
-        session: La sesión de la base de datos.
+        legend_id: El ID de la leyenda a recuperar.
+        session: La sesión de la base de datos.
+        cache_key: la clave de la leyenda en la cache, construida a partir de su ETag.
+
+    Returns:
+        la leyenda formateada mediante LegendRead y serializada como JSON.
+    """
+    cached = await run_in_threadpool(cache_get, cache_key)
+    if cached is not None:
+        return cached
+    legend = await get_legend(legend_id, session)
+    if legend is None:
+        return None
+    body = legend.model_dump_json().encode()
+    await run_in_threadpool(cache_set, cache_key, body)
+    return body
+
+@on_invalidation(Legend.__tablename__)
+def _apply_legends_invalidation(message: dict):
+    """
+    Actualiza el indice de busqueda de este worker con las leyendas creadas, modificadas o eliminadas en otro worker.
+
+    Args:
+        message: la invalidacion publicada, con los ids de las leyendas escritas.
+    """
+    ids = message.get("ids") or []
+    with Session(engine) as session:
+        rows = session.exec(select(Legend.id, Legend.name, Legend.description).where(Legend.id.in_(ids))).all()
+    for row in rows:
+        legend_search_index.add(row.id, row.name, row.description)
+    for legend_id in set(ids) - {row.id for row in rows}:
+        legend_search_index.remove(legend_id)
+
+async def get_legends_by_ids(ids: list[int], session: AsyncSessionLocal) -> LegendBatchResult | None:
+    """
+    Recupera varias leyendas por su ID con una sola consulta IN sobre la consulta de proyeccion, en el orden
+    en que se pidieron.
+
+    Args:
+        ids: Los IDs de las leyendas, los repetidos se devuelven una sola vez.
+        session: La sesión de la base de datos.
+
+    Returns:
+        las leyendas encontradas formateadas mediante LegendRead y los IDs que no existen.
+    """
+    try:
+        unique_ids = list(dict.fromkeys(ids))
+        rows = (await session.exec(_legend_read_statement().where(Legend.id.in_(unique_ids)))).all()
+        by_id = {row.id: row for row in rows}
+        return LegendBatchResult(
+            items=[_row_to_legend_read(by_id[legend_id]) for legend_id in unique_ids if legend_id in by_id],
+            missing=[legend_id for legend_id in unique_ids if legend_id not in by_id],
+        )
+    except Exception as e:
+        print(f"Error retrieving legends by id: {e}")
+        return None
+
+async def create_legend(legend_data: LegendCreate, session: AsyncSessionLocal, image_file:UploadFile=None) -> Legend | None:
+    """
+    crea una leyenda en la base de datos, la imagen se guarda en la carpeta de spool y se carga en segundo plano,
+    mientras tanto la leyenda queda con image_status "pending".
+    Args:
+        session: La sesión de la base de datos.
         legend_data: Los datos de la leyenda a crear.
         image_file: La imagen de la leyenda.
 
     Returns:
-        la información de la leyenda creada.
+        la información de la leyenda creada.
     """
+    spooled_path = None
     try:
-        image_url= None
-        if(image_file):
-            image_url, public_id=await upload_image(image_file)
-            print(f"Image URL: {image_url}")
-            if not image_url:
-                return None
         legend = Legend.model_validate(legend_data.model_dump())
+        if image_file:
+            spooled_path = await spool_upload(image_file)
+            legend.image_status = IMAGE_PENDING
+
+        legend.updated_at = utcnow()
+        legend.version = 1
 
-        if image_url:
-            legend.image_url = image_url
-            legend.cloudinary_public_id= public_id
         print(f"Creating legend: {legend}")
         session.add(legend)
-        session.commit()
-        session.refresh(legend)
+        await session.exec(bump_version_statement(Legend.__tablename__))
+        await session.commit()
+        await session.refresh(legend)
+        legend_search_index.add(legend.id, legend.name, legend.description)
+        await run_in_threadpool(publish_invalidation, Legend.__tablename__, ids=[legend.id])
+        if spooled_path:
+            await run_in_threadpool(enqueue_image_upload, legend.id, spooled_path)
         return legend
     except ValidationError as e:
         print(f"Validation error: {e}")
         raise
+    except UploadRejectedError as e:
+        print(f"Image rejected: {e}")
+        raise
     except Exception as e:
         print(f"Error creating legend: {e}")
+        if spooled_path:
+            discard_spooled(spooled_path)
         return None
     
-async def update_legend(legend_id: int, legend_data: LegendUpdate, session: SessionLocal, image_file:UploadFile=None) -> Legend | None:
+async def update_legend(legend_id: int, legend_data: LegendUpdate, session: AsyncSessionLocal, image_file:UploadFile=None) -> Legend | None:
     """
-    Actualiza una leyenda en la base de datos, incluyendo la actualización de la imagen en el servicio de cloudinary.
+    Actualiza una leyenda en la base de datos, la nueva imagen se carga en segundo plano y la anterior se elimina
+    una vez que la nueva esta disponible.
     Args:
         legend_id: El ID de la leyenda a actualizar.
-        session: La sesión de la base de datos.
+        session: La sesión de la base de datos.
         legend_data: Los datos de la leyenda a crear.+
         image_file: La imagen de la leyenda.
 
     Returns:
-        la información de la leyenda actualizada.
+        la información de la leyenda actualizada.
     """
+    spooled_path = None
+    stale_variants = []
     try:
-        legend= get_legend_by_id(legend_id, session)
+        legend= await get_legend_by_id(legend_id, session)
 
         if legend is None:
             return None
         if image_file:
-            if legend.cloudinary_public_id:
-                delete=await delete_image(legend.cloudinary_public_id)
-                if delete:
-                    print(f"Image with public ID {legend.cloudinary_public_id} deleted successfully.")
-                
-            uploaded_data= await upload_image(image_file)
-            if uploaded_data:
-                legend.image_url, legend.cloudinary_public_id = uploaded_data
-            else:
-                return None
-        elif legend_data.image_url is not None:
+            spooled_path = await spool_upload(image_file)
+            legend.image_status = IMAGE_PENDING
+        elif legend_data.image_url is not None and legend_data.image_url != legend.image_url:
             legend.image_url = legend_data.image_url
+            stale_variants = variant_public_ids(legend.image_variants)
+            legend.image_variants = None
 
         legend.name = legend_data.name
         legend.description = legend_data.description
         legend.category_id = legend_data.category_id 
         legend.legend_date = legend_data.legend_date 
         legend.district_id = legend_data.district_id 
+        legend.updated_at = utcnow()
+        legend.version = (legend.version or 0) + 1
 
-        session.commit()
-        session.refresh(legend)
+        await session.exec(bump_version_statement(Legend.__tablename__))
+        await session.commit()
+        await session.refresh(legend)
+        legend_search_index.add(legend.id, legend.name, legend.description)
+        await run_in_threadpool(publish_invalidation, Legend.__tablename__, ids=[legend.id])
+        if spooled_path:
+            await run_in_threadpool(enqueue_image_upload, legend.id, spooled_path)
+        for public_id in stale_variants:
+            await run_in_threadpool(enqueue_image_delete, public_id)
         return legend
     except ValidationError as e:
         print(f"Validation error: {e}")
         raise
+    except UploadRejectedError as e:
+        print(f"Image rejected: {e}")
+        raise
     except Exception as e:
+        if spooled_path:
+            discard_spooled(spooled_path)
         return None
     
-def delete_legend(legend_id: int, session: SessionLocal) -> bool:
+async def delete_legend(legend_id: int, session: AsyncSessionLocal) -> bool:
     """
-    Elimina una leyenda de la base de datos, incluyendo la eliminación de la imagen en el servicio de cloudinary.
+    Elimina una leyenda de la base de datos, la eliminación de la imagen se realiza en segundo plano.
     Args:
-        session: La sesión de la base de datos.
+        session: La sesión de la base de datos.
         legend_id: El ID de la leyenda a eliminar.
 
     Returns:
-        True si la leyenda se eliminó correctamente, False en caso contrario.
+        True si la leyenda se eliminó correctamente, False en caso contrario.
     """
     try:
-        legend= get_legend_by_id(legend_id, session)
+        legend= await get_legend_by_id(legend_id, session)
         print(f"Deleting legend: {legend}" )
         if legend is None:
             return None
-        if legend.cloudinary_public_id:
+        public_ids = [legend.cloudinary_public_id, *variant_public_ids(legend.image_variants)]
+
+        await session.delete(legend)
+        await session.exec(bump_version_statement(Legend.__tablename__))
+        await session.commit()
+        legend_search_index.remove(legend_id)
+        await run_in_threadpool(publish_invalidation, Legend.__tablename__, ids=[legend_id])
+        for public_id in filter(None, public_ids):
             try:
-                deleted=delete_image(legend.cloudinary_public_id)
-                if deleted:
-                    print(f"Image with public ID {legend.cloudinary_public_id} deleted successfully.")
+                await run_in_threadpool(enqueue_image_delete, public_id)
             except Exception as e:
-                print(f"Error deleting image: {e}")
-
-        session.delete(legend)
-        session.commit()
+                print(f"Error queueing image deletion: {e}")
         return True
     except Exception as e:
-        return False
\ No newline at end of file
+        return False
+
+async def get_legend_image_status(legend_id: int, session: AsyncSessionLocal) -> LegendImageStatus | None:
+    """
+    Recupera el estado de la carga de la imagen de una leyenda.
+    Args:
+        session: La sesión de la base de datos.
+        legend_id: El ID de la leyenda.
+
+    Returns:
+        el estado de la imagen y su url si ya esta disponible.
+    """
+    try:
+        statement = select(Legend.image_status, Legend.image_url).where(Legend.id == legend_id)
+        row = (await session.exec(statement)).first()
+        if row is None:
+            return None
+        return LegendImageStatus(legend_id=legend_id, image_status=row.image_status, image_url=row.image_url)
+    except Exception as e:
+        print(f"Error retrieving image status: {e}")
+        return None
+
+async def get_legends_version(session: AsyncSessionLocal) -> TableVersion | None:
+    """
+    Recupera el contador de version de la tabla de leyendas, que cambia con cada creacion, actualizacion o eliminacion.
+    Args:
+        session: La sesión de la base de datos.
+
+    Returns:
+        la version de la tabla y la fecha de su ultima modificacion.
+    """
+    try:
+        return await get_table_version(session, Legend.__tablename__)
+    except Exception as e:
+        print(f"Error retrieving legends version: {e}")
+        return None
+
+async def get_legend_last_modified(legend_id: int, session: AsyncSessionLocal) -> tuple[bool, Optional[datetime], int]:
+    """
+    Recupera la fecha de la ultima modificacion y el contador de version de una leyenda sin consultar las tablas
+    relacionadas. El contador cambia con cada escritura aunque dos escrituras caigan en el mismo segundo, que es
+    la precision de DATETIME en MySQL.
+    Args:
+        session: La sesión de la base de datos.
+        legend_id: El ID de la leyenda.
+
+    Returns:
+        una tupla con True si la leyenda existe, la fecha de su ultima modificacion y su version.
+    """
+    try:
+        statement = select(Legend.id, Legend.updated_at, Legend.version).where(Legend.id == legend_id)
+        row = (await session.exec(statement)).first()
+        if row is None:
+            return False, None, 0
+        return True, row.updated_at, row.version or 0
+    except Exception as e:
+        print(f"Error retrieving legend last modified: {e}")
+        return False, None, 0
+
+def _validate_bulk_record(record: dict | RecordError, reference_data: ReferenceData) -> tuple[Optional[dict], list[str]]:
+    """
+    Valida una fila importada mediante LegendCreate y verifica que la categoria y el distrito existan.
+
+    Args:
+        record: la fila leida o el error de lectura.
+        reference_data: los datos de referencia en memoria.
+
+    Returns:
+        una tupla con los valores de la fila listos para insertar, o None, y la lista de errores.
+    """
+    if isinstance(record, RecordError):
+        return None, [str(record)]
+    try:
+        legend_data = LegendCreate.model_validate(record)
+    except ValidationError as e:
+        return None, [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+    errors = []
+    if legend_data.category_id not in reference_data.categories_by_id:
+        errors.append(f"category_id: Category {legend_data.category_id} does not exist")
+    if legend_data.district_id not in reference_data.districts_by_id:
+        errors.append(f"district_id: District {legend_data.district_id} does not exist")
+    if errors:
+        return None, errors
+    values = legend_data.model_dump()
+    values["image_status"] = IMAGE_PENDING if values["image_url"] and not values["cloudinary_public_id"] else None
+    values["updated_at"] = utcnow()
+    return values, []
+
+
+def _report_bulk_error(result: LegendBulkResult, row: int, errors: list[str]):
+    result.failed += 1
+    if len(result.errors) < BULK_MAX_REPORTED_ERRORS:
+        result.errors.append(LegendBulkError(row=row, errors=errors))
+
+
+async def _insert_bulk_rows(session: AsyncSessionLocal, rows: list[tuple[int, dict]]) -> list[tuple[int, str]]:
+    """
+    Inserta un lote de filas en una transaccion, las filas sin imagen externa con una sola sentencia executemany
+    y las que tienen una imagen por descargar mediante el ORM para obtener sus ids.
+
+    Args:
+        session: La sesión de la base de datos.
+        rows: las tuplas (numero de fila, valores) del lote.
+
+    Returns:
+        las tuplas (id de la leyenda, url de la imagen) de las imagenes por descargar.
+    """
+    plain = [values for _, values in rows if values["image_status"] != IMAGE_PENDING]
+    with_image = [Legend(**values) for _, values in rows if values["image_status"] == IMAGE_PENDING]
+    if plain:
+        await session.exec(insert(Legend), params=plain)
+    session.add_all(with_image)
+    await session.exec(bump_version_statement(Legend.__tablename__))
+    await session.commit()
+    return [(legend.id, legend.image_url) for legend in with_image]
+
+
+async def _flush_bulk_batch(session: AsyncSessionLocal, batch: list[tuple[int, dict]], result: LegendBulkResult, watermark: int) -> int:
+    """
+    Inserta un lote de filas validadas, si la insercion falla las filas se insertan una a una para reportar
+    el error de cada fila. Luego agrega las leyendas nuevas al indice de busqueda y encola sus imagenes.
+
+    Args:
+        session: La sesión de la base de datos.
+        batch: las tuplas (numero de fila, valores) del lote.
+        result: el reporte de la importacion.
+        watermark: el id mayor ya agregado al indice de busqueda.
+
+    Returns:
+        el nuevo id mayor agregado al indice de busqueda.
+    """
+    ingest = []
+    try:
+        ingest = await _insert_bulk_rows(session, batch)
+        result.inserted += len(batch)
+    except Exception as e:
+        await session.rollback()
+        print(f"Error inserting legends batch, retrying row by row: {e}")
+        for row_number, values in batch:
+            try:
+                ingest += await _insert_bulk_rows(session, [(row_number, values)])
+                result.inserted += 1
+            except Exception as row_error:
+                await session.rollback()
+                _report_bulk_error(result, row_number, [f"Database error: {row_error}"])
+
+    new_rows = (await session.exec(
+        select(Legend.id, Legend.name, Legend.description).where(Legend.id > watermark).order_by(Legend.id)
+    )).all()
+    for row in new_rows:
+        legend_search_index.add(row.id, row.name, row.description)
+        watermark = row.id
+    if new_rows:
+        await run_in_threadpool(publish_invalidation, Legend.__tablename__, ids=[row.id for row in new_rows])
+    if ingest:
+        result.images_queued += await run_in_threadpool(enqueue_image_ingest, ingest)
+    return watermark
+
+
+async def bulk_create_legends(
+    session: AsyncSessionLocal,
+    chunks: AsyncIterator[bytes],
+    format: str,
+    batch_size: int = BULK_BATCH_SIZE,
+) -> LegendBulkResult | None:
+    """
+    Importa leyendas desde un cuerpo CSV o NDJSON leido a medida que llega, validando cada fila mediante LegendCreate
+    e insertando por lotes de batch_size filas con una transaccion por lote. Las imagenes con url externa se descargan
+    y cargan en segundo plano.
+    Args:
+        session: La sesión de la base de datos.
+        chunks: los bloques de bytes del cuerpo de la peticion.
+        format: "csv" o "ndjson".
+        batch_size: la cantidad de filas por lote.
+
+    Returns:
+        el reporte con la cantidad de filas recibidas, insertadas y fallidas, y los errores de cada fila.
+    """
+    result = LegendBulkResult()
+    try:
+        reference_data = await get_reference_data_async(session)
+        watermark = (await session.exec(select(func.max(Legend.id)))).one() or 0
+        batch = []
+        async for row_number, record in iter_records(chunks, format):
+            result.received += 1
+            values, errors = _validate_bulk_record(record, reference_data)
+            if errors:
+                _report_bulk_error(result, row_number, errors)
+                continue
+            batch.append((row_number, values))
+            if len(batch) >= batch_size:
+                watermark = await _flush_bulk_batch(session, batch, result, watermark)
+                batch = []
+        if batch:
+            await _flush_bulk_batch(session, batch, result, watermark)
+        return result
+    except Exception as e:
+        print(f"Error importing legends: {e}")
+        return None
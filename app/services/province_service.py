@@ -1,10 +1,10 @@
-from app.core.db import SessionLocal
-from sqlmodel import select
+from app.core.db import AsyncSessionLocal
+from app.core.reference_cache import get_reference_data_async
 from app.models.province_model import Province
 
-def get_all_provinces(session: SessionLocal)-> list[Province] | None:
+async def get_all_provinces(session: AsyncSessionLocal)-> list[Province] | None:
     """
-    Recupera las provincias de la base de datos
+    Recupera las provincias desde el indice de datos de referencia en memoria
 
     Args:
         session: La sesión de la base de datos.
@@ -13,7 +13,7 @@ def get_all_provinces(session: SessionLocal)-> list[Province] | None:
         Una lista de provincias.
     """
     try:
-        provinces = session.exec(select(Province)).all()
+        provinces = list((await get_reference_data_async(session)).provinces)
         return provinces
     except Exception as e:
         print(f"Error retrieving provinces: {e}")
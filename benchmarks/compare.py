@@ -0,0 +1,61 @@
+"""
+Compara dos resultados de benchmarks.load, por ejemplo del commit base y del commit con un cambio.
+
+Uso:
+    python -m benchmarks.compare base.json head.json
+"""
+import argparse
+import json
+
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "rps")
+
+
+def _change(base: float, head: float) -> str:
+    if not base:
+        return "n/a"
+    return f"{(head - base) / base * 100:+.1f}%"
+
+
+def compare(base: dict, head: dict) -> list[dict]:
+    """
+    Calcula la variacion de cada metrica en las rutas presentes en ambos resultados.
+
+    Args:
+        base: el resultado de referencia.
+        head: el resultado a comparar.
+
+    Returns:
+        una fila por ruta con el valor base, el nuevo y la variacion porcentual de cada metrica.
+    """
+    rows = []
+    for route, head_result in head["routes"].items():
+        base_result = base["routes"].get(route)
+        if base_result is None:
+            continue
+        row = {"route": route}
+        for metric in METRICS:
+            row[metric] = (base_result[metric], head_result[metric], _change(base_result[metric], head_result[metric]))
+        rows.append(row)
+    return rows
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Compara dos resultados de benchmarks.load.")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    args = parser.parse_args(argv)
+    with open(args.base) as file:
+        base = json.load(file)
+    with open(args.head) as file:
+        head = json.load(file)
+
+    print(f"base {base['meta'].get('commit')} -> head {head['meta'].get('commit')}")
+    print(f"{'route':<22}" + "".join(f"{metric:>30}" for metric in METRICS))
+    for row in compare(base, head):
+        cells = "".join(f"{f'{b} -> {h} ({change})':>30}" for b, h, change in (row[m] for m in METRICS))
+        print(f"{row['route']:<22}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Compara el rendimiento concurrente de las consultas de leyendas con la Session sincrona llamada desde una
+corrutina, como lo hacian las rutas antes del engine asincrono, y con AsyncSession. Cada modo ejecuta las
+mismas consultas repartidas entre varias tareas y reporta los percentiles de la latencia, las peticiones por
+segundo y el mayor retraso del ciclo de eventos, que mide cuanto tiempo quedo bloqueado para las demas
+peticiones. El JSON usa el mismo formato que benchmarks.load, por lo que se compara con benchmarks.compare.
+
+SQLite responde en el mismo proceso, sin la espera de red de MySQL. Con --latency-ms cada consulta en SQLite
+espera esos milisegundos dentro del driver, en el hilo que ejecuta la consulta, como si esperara la respuesta
+del servidor: con la Session sincrona ese hilo es el del ciclo de eventos y con aiosqlite es el hilo de la
+conexion.
+
+Uso:
+    python -m benchmarks.concurrency --database-url sqlite:///bench.db --requests 500 --concurrency 50 --latency-ms 5 --output concurrency.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from benchmarks.datagen import NAME_WORDS
+from benchmarks.load import _git_commit, summarize
+
+
+MODES = ("sync_session", "async_session")
+LOOP_TICK_SECONDS = 0.001
+LATENCY_FUNCTION = "benchmark_latency"
+
+
+def _add_latency_function(dbapi_connection, connection_record):
+    def wait(milliseconds):
+        time.sleep(milliseconds / 1000)
+        return 0
+
+    dbapi_connection.create_function(LATENCY_FUNCTION, 1, wait, deterministic=True)
+
+
+def build_statements(latency_ms: float = 0, limit: int = 50) -> list:
+    """
+    Construye las consultas de la prueba: una busqueda por nombre con LIKE por cada palabra de los nombres
+    generados, que recorre la tabla como lo hacia /legends/filters.
+
+    Args:
+        latency_ms: la espera simulada por consulta, solo en SQLite.
+        limit: el maximo de leyendas por consulta.
+
+    Returns:
+        la lista de consultas.
+    """
+    from sqlalchemy import event, func
+    from sqlmodel import select
+    from app.core.db import async_engine, engine
+    from app.models.legend_model import Legend
+
+    statements = [select(Legend).where(Legend.name.like(f"%{word}%")).order_by(Legend.id).limit(limit) for word in NAME_WORDS]
+    if not latency_ms or engine.dialect.name != "sqlite":
+        return statements
+    for item in (engine, async_engine.sync_engine):
+        event.listen(item, "connect", _add_latency_function)
+    # La funcion es deterministica y con argumento constante, SQLite la evalua una sola vez por consulta.
+    return [statement.where(getattr(func, LATENCY_FUNCTION)(latency_ms) == 0) for statement in statements]
+
+
+async def _watch_loop(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_TICK_SECONDS)
+        worst = max(worst, time.perf_counter() - start - LOOP_TICK_SECONDS)
+    return worst
+
+
+async def run_mode(mode: str, statements: list, requests: int, concurrency: int, warmup: int) -> dict:
+    """
+    Ejecuta las consultas en un modo con una cantidad fija de peticiones repartidas entre varias tareas.
+
+    Args:
+        mode: sync_session o async_session.
+        statements: las consultas, se rotan entre las peticiones.
+        requests: las consultas medidas.
+        concurrency: las consultas simultaneas.
+        warmup: las consultas previas que no se miden.
+
+    Returns:
+        el resumen del modo con el mayor retraso del ciclo de eventos en milisegundos.
+    """
+    from sqlmodel import Session
+    from app.core.db import async_session_maker, engine
+
+    async def query(index: int):
+        statement = statements[index % len(statements)]
+        if mode == "sync_session":
+            with Session(engine) as session:
+                return session.exec(statement).all()
+        async with async_session_maker() as session:
+            return (await session.exec(statement)).all()
+
+    for index in range(warmup):
+        await query(index)
+
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            try:
+                await query(index)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(_watch_loop(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    result = summarize(latencies, errors, elapsed)
+    result["loop_lag_max_ms"] = round(await watcher * 1000, 3)
+    return result
+
+
+async def run(requests: int, concurrency: int, warmup: int, latency_ms: float = 0) -> dict:
+    """
+    Ejecuta los dos modos, uno a la vez, sobre la base de datos de DATABASE_URL.
+
+    Args:
+        requests: las consultas medidas por modo.
+        concurrency: las consultas simultaneas.
+        warmup: las consultas previas por modo que no se miden.
+        latency_ms: la espera simulada por consulta, solo en SQLite.
+
+    Returns:
+        los metadatos de la ejecucion y el resumen de cada modo.
+    """
+    from app.core.db import async_engine
+
+    statements = build_statements(latency_ms)
+    results = {}
+    for mode in MODES:
+        results[mode] = await run_mode(mode, statements, requests, concurrency, warmup)
+        print(f"{mode}: {results[mode]}", file=sys.stderr)
+    await async_engine.dispose()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": async_engine.dialect.name,
+            "requests": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "latency_ms": latency_ms,
+        },
+        "routes": results,
+    }
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Compara la Session sincrona y AsyncSession con consultas concurrentes.")
+    parser.add_argument("--database-url", help="url de la base de datos, por defecto DATABASE_URL")
+    parser.add_argument("--requests", type=int, default=200, help="consultas medidas por modo")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10, help="consultas previas no medidas por modo")
+    parser.add_argument("--latency-ms", type=float, default=0, help="espera simulada por consulta en SQLite")
+    parser.add_argument("--output", help="archivo JSON de resultados, por defecto la salida estandar")
+    args = parser.parse_args(argv)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    result = asyncio.run(run(args.requests, args.concurrency, args.warmup, args.latency_ms))
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Generador de datos sinteticos para las pruebas de rendimiento.
+
+Carga las provincias, cantones, distritos y categorias de db.sql y genera N leyendas repartidas en esa jerarquia,
+en SQLite o en un MySQL local. Con la misma semilla se generan siempre los mismos datos.
+
+Uso:
+    python -m benchmarks.datagen --database-url sqlite:///bench.db --legends 100000
+"""
+import argparse
+import os
+import random
+import re
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.engine import Connection
+from app.core.conditional import bump_version_statement, utcnow
+from app.core.migrations import run_migrations
+from app.models.legend_model import Legend
+from app.models.district_model import District
+from app.models.category_model import Category
+
+
+DB_SQL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db.sql")
+REFERENCE_TABLES = ("provinces", "cantons", "districts", "categories")
+DEFAULT_SEED = 4
+
+NAME_WORDS = (
+    "llorona", "cadejos", "tulevieja", "segua", "mico", "carreta", "padre", "cegua", "duende", "bruja",
+    "diablo", "volcan", "laguna", "rio", "montaña", "cerro", "camino", "puente", "iglesia", "cueva",
+    "sombra", "fantasma", "tesoro", "jinete", "espanto", "culebra", "toro", "mono", "jaguar", "garza",
+)
+DESCRIPTION_WORDS = (
+    "mujer", "hombre", "niño", "perro", "noche", "luna", "grito", "camino", "bosque", "pueblo", "castigo",
+    "viajero", "alma", "agua", "fuego", "piedra", "campana", "neblina", "sendero", "cementerio", "hacienda",
+    "aparece", "persigue", "protege", "llora", "canta", "asusta", "desaparece", "regresa", "esconde",
+)
+FIRST_DATE = datetime(1500, 1, 1)
+LAST_DATE = datetime(2025, 12, 31)
+
+
+def _reference_statements(sql: str) -> list[str]:
+    tables = "|".join(REFERENCE_TABLES)
+    return re.findall(rf"INSERT INTO\s+(?:{tables})\s*\(.*?\)\s*VALUES.*?;", sql, re.S | re.I)
+
+
+def load_reference_tables(connection: Connection, sql_path: str = DB_SQL_PATH) -> bool:
+    """
+    Inserta las provincias, cantones, distritos y categorias de db.sql si la base de datos aun no las tiene.
+
+    Args:
+        connection: la conexion de la base de datos.
+        sql_path: la ruta del archivo db.sql.
+
+    Returns:
+        True si se insertaron, False si ya existian.
+    """
+    if connection.execute(select(func.count()).select_from(District)).scalar():
+        return False
+    with open(sql_path, encoding="utf-8") as file:
+        statements = _reference_statements(file.read())
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+    return True
+
+
+def _legend_name(rng: random.Random) -> str:
+    name = f"{rng.choice(('El', 'La', 'Los', 'Las'))} {rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)}"
+    return name[:30]
+
+
+def _legend_description(rng: random.Random) -> str:
+    words = rng.choices(DESCRIPTION_WORDS, k=rng.randint(8, 30))
+    return " ".join(words).capitalize()[:254] + "."
+
+
+def generate_legend_rows(count: int, district_ids: list[int], category_ids: list[int], seed: int = DEFAULT_SEED):
+    """
+    Genera las filas de leyendas sinteticas por lotes.
+
+    Args:
+        count: la cantidad de leyendas.
+        district_ids: los distritos entre los que se reparten.
+        category_ids: las categorias entre las que se reparten.
+        seed: la semilla del generador de numeros aleatorios.
+
+    Returns:
+        un generador de diccionarios con los valores de cada leyenda.
+    """
+    rng = random.Random(seed)
+    span = int((LAST_DATE - FIRST_DATE).total_seconds())
+    now = utcnow()
+    for _ in range(count):
+        yield {
+            "name": _legend_name(rng),
+            "description": _legend_description(rng),
+            "category_id": rng.choice(category_ids),
+            "district_id": rng.choice(district_ids),
+            "legend_date": FIRST_DATE + timedelta(seconds=rng.randrange(span)),
+            "updated_at": now,
+        }
+
+
+def generate(database_url: str, legends: int, seed: int = DEFAULT_SEED, append: bool = False, batch_size: int = 5000) -> dict:
+    """
+    Prepara la base de datos de pruebas: aplica las migraciones, carga la jerarquia de db.sql y genera las leyendas.
+
+    Args:
+        database_url: la url de la base de datos sincrona.
+        legends: la cantidad de leyendas a generar.
+        seed: la semilla del generador.
+        append: si se conservan las leyendas existentes, por defecto se reemplazan.
+        batch_size: las filas insertadas por sentencia.
+
+    Returns:
+        el total de leyendas y el tiempo empleado.
+    """
+    engine = create_engine(database_url)
+    start = time.perf_counter()
+    run_migrations(engine)
+    with engine.begin() as connection:
+        load_reference_tables(connection)
+        if not append:
+            connection.execute(text("DELETE FROM legends"))
+        district_ids = list(connection.execute(select(District.id).order_by(District.id)).scalars())
+        category_ids = list(connection.execute(select(Category.id).order_by(Category.id)).scalars())
+
+    rows = generate_legend_rows(legends, district_ids, category_ids, seed)
+    statement = insert(Legend.__table__)
+    while True:
+        batch = [row for _, row in zip(range(batch_size), rows)]
+        if not batch:
+            break
+        with engine.begin() as connection:
+            connection.execute(statement, batch)
+
+    with engine.begin() as connection:
+        connection.execute(bump_version_statement("legends"))
+        total = connection.execute(select(func.count()).select_from(Legend)).scalar()
+    engine.dispose()
+    return {"legends": total, "seconds": round(time.perf_counter() - start, 3)}
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Genera leyendas sinteticas para las pruebas de rendimiento.")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--legends", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--append", action="store_true", help="conserva las leyendas existentes")
+    args = parser.parse_args(argv)
+    result = generate(args.database_url, args.legends, args.seed, args.append, args.batch_size)
+    print(f"Generated database with {result['legends']} legends in {result['seconds']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
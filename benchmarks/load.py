@@ -0,0 +1,239 @@
+"""
+Generador de carga en proceso: ejecuta la aplicacion ASGI con su ciclo de vida y le envia peticiones con
+httpx.AsyncClient, sin servidor ni red, y reporta por ruta los percentiles 50, 95 y 99 de la latencia y las
+peticiones por segundo en JSON para comparar resultados entre commits.
+
+Uso:
+    python -m benchmarks.load --database-url sqlite:///bench.db --requests 500 --concurrency 20 --output head.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+from benchmarks.datagen import DEFAULT_SEED, NAME_WORDS
+
+
+BENCHMARK_EMAIL = "benchmark@example.com"
+BENCHMARK_PASSWORD = "benchmark-password"
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    params: list[dict] = field(default_factory=lambda: [{}])
+
+
+def build_scenarios(reference_data, legend_ids: list[int], seed: int = DEFAULT_SEED) -> list[Scenario]:
+    """
+    Construye los escenarios de carga a partir de los datos de referencia, cada escenario rota entre varias
+    combinaciones de parametros para no medir siempre la misma consulta.
+
+    Args:
+        reference_data: las provincias, cantones, distritos y categorias en memoria.
+        legend_ids: una muestra de ids de leyendas existentes.
+        seed: la semilla para elegir los parametros.
+
+    Returns:
+        la lista de escenarios.
+    """
+    rng = random.Random(seed)
+
+    def sample(items, k=10):
+        items = list(items)
+        return rng.sample(items, min(k, len(items)))
+
+    years = [rng.randrange(1500, 2000) for _ in range(10)]
+    return [
+        Scenario("legends", "/legends", [{"limit": 20}]),
+        Scenario("legends_by_date", "/legends", [{"limit": 20, "sort": "legend_date", "order": "desc"}]),
+        Scenario("legend_detail", "/legends/{id}", [{"id": legend_id} for legend_id in sample(legend_ids, 50)]),
+        Scenario("filters_name", "/legends/filters", [{"name": word} for word in sample(NAME_WORDS)]),
+        Scenario("filters_category", "/legends/filters", [{"category_id": c.id} for c in sample(reference_data.categories)]),
+        Scenario("filters_date_range", "/legends/filters", [
+            {"legend_date_initial": f"{year}-01-01", "legend_date_final": f"{year + 25}-12-31"} for year in years
+        ]),
+        Scenario("filters_province", "/legends/filters", [{"province_id": p.id} for p in sample(reference_data.provinces)]),
+        Scenario("filters_canton", "/legends/filters", [{"canton_id": c.id} for c in sample(reference_data.cantons)]),
+        Scenario("filters_district", "/legends/filters", [{"district_id": d.id} for d in sample(reference_data.districts)]),
+        Scenario("facets", "/legends/facets", [{}, *({"province_id": p.id} for p in sample(reference_data.provinces))]),
+        Scenario("geo_tree", "/geo/tree"),
+        Scenario("provinces", "/provinces"),
+        Scenario("categories", "/categories"),
+    ]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    """
+    Resume las latencias de un escenario.
+
+    Args:
+        latencies: las latencias de las peticiones en segundos.
+        errors: las respuestas con estado distinto de 2xx.
+        elapsed: el tiempo total del escenario en segundos.
+
+    Returns:
+        las peticiones, los errores, los percentiles en milisegundos y las peticiones por segundo.
+    """
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def run_scenario(client, scenario: Scenario, requests: int, concurrency: int, warmup: int) -> dict:
+    """
+    Ejecuta un escenario con una cantidad fija de peticiones repartidas entre varias tareas concurrentes.
+
+    Args:
+        client: el cliente httpx conectado a la aplicacion.
+        scenario: el escenario.
+        requests: las peticiones medidas.
+        concurrency: las peticiones simultaneas.
+        warmup: las peticiones previas que no se miden.
+
+    Returns:
+        el resumen del escenario.
+    """
+    def request_args(index: int) -> tuple[str, dict]:
+        params = dict(scenario.params[index % len(scenario.params)])
+        path = scenario.path.format(**params)
+        return path, {key: value for key, value in params.items() if f"{{{key}}}" not in scenario.path}
+
+    for index in range(warmup):
+        path, params = request_args(index)
+        await client.get(path, params=params)
+
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            path, params = request_args(index)
+            start = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies.append(time.perf_counter() - start)
+            if not 200 <= response.status_code < 300:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def _authenticate(client) -> str:
+    response = await client.post("/auth/register", json={"email": BENCHMARK_EMAIL, "password": BENCHMARK_PASSWORD})
+    if response.status_code != 201:
+        response = await client.post("/auth/login", data={"username": BENCHMARK_EMAIL, "password": BENCHMARK_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(requests: int, concurrency: int, warmup: int, only: Optional[list[str]] = None, seed: int = DEFAULT_SEED) -> dict:
+    """
+    Inicia la aplicacion y ejecuta todos los escenarios, uno a la vez.
+
+    Args:
+        requests: las peticiones medidas por escenario.
+        concurrency: las peticiones simultaneas.
+        warmup: las peticiones previas por escenario que no se miden.
+        only: los nombres de los escenarios a ejecutar, todos si es None.
+        seed: la semilla para elegir los parametros.
+
+    Returns:
+        los metadatos de la ejecucion y el resumen de cada escenario.
+    """
+    import httpx
+    from sqlalchemy import func
+    from sqlmodel import select
+    from app.main import app
+    from app.core.db import async_engine, async_session_maker
+    from app.core.reference_cache import get_reference_data_async
+    from app.models.legend_model import Legend
+
+    async with app.router.lifespan_context(app):
+        async with async_session_maker() as session:
+            reference_data = await get_reference_data_async(session)
+            legend_count = (await session.exec(select(func.count()).select_from(Legend))).one()
+            legend_ids = list((await session.exec(select(Legend.id).order_by(Legend.id).limit(1000))).all())
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            client.headers["Authorization"] = f"Bearer {await _authenticate(client)}"
+            results = {}
+            for scenario in build_scenarios(reference_data, legend_ids, seed):
+                if only and scenario.name not in only:
+                    continue
+                results[scenario.name] = await run_scenario(client, scenario, requests, concurrency, warmup)
+                print(f"{scenario.name}: {results[scenario.name]}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": async_engine.dialect.name,
+            "legends": legend_count,
+            "requests": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "seed": seed,
+        },
+        "routes": results,
+    }
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Mide la latencia de las rutas de la API en proceso.")
+    parser.add_argument("--database-url", help="url de la base de datos, por defecto DATABASE_URL")
+    parser.add_argument("--requests", type=int, default=200, help="peticiones medidas por ruta")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10, help="peticiones previas no medidas por ruta")
+    parser.add_argument("--only", nargs="*", help="nombres de los escenarios a ejecutar")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", help="archivo JSON de resultados, por defecto la salida estandar")
+    args = parser.parse_args(argv)
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    result = asyncio.run(run(args.requests, args.concurrency, args.warmup, args.only, args.seed))
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
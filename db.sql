@@ -39,11 +39,30 @@ CREATE TABLE IF NOT EXISTS legends (
     image_url VARCHAR(255),
     cloudinary_public_id VARCHAR(255),
     district_id INT NOT NULL,
+    image_status VARCHAR(10),
+    image_variants JSON,
+    updated_at DATETIME,
+    version INT NOT NULL DEFAULT 0,
     
     CONSTRAINT fk_category FOREIGN KEY (category_id) REFERENCES categories(id),
     CONSTRAINT fk_district FOREIGN KEY (district_id) REFERENCES districts(id)
 );
 
+CREATE INDEX ix_legends_legend_date_id ON legends (legend_date, id);
+CREATE INDEX ix_legends_name_id ON legends (name, id);
+CREATE INDEX ix_legends_category_id_legend_date ON legends (category_id, legend_date);
+CREATE INDEX ix_legends_district_id_legend_date ON legends (district_id, legend_date);
+CREATE INDEX ix_districts_canton_id ON districts (canton_id);
+CREATE INDEX ix_cantons_province_id ON cantons (province_id);
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL
+);
+
+INSERT INTO table_versions (table_name, version, updated_at) VALUES ('legends', 0, CURRENT_TIMESTAMP);
+
 
 INSERT INTO provinces(name) VALUES
 ('San José'),
@@ -0,0 +1,74 @@
+import os
+import tempfile
+
+# La configuracion se lee con decouple al importar los modulos de app, por lo que debe definirse antes.
+TEST_DIR = tempfile.mkdtemp(prefix="legends-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TEST_DIR}/test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("CLOUDINARY_CLOUD_NAME", "test")
+os.environ.setdefault("CLOUDINARY_API_KEY", "test")
+os.environ.setdefault("CLOUDINARY_API_SECRET", "test")
+os.environ.setdefault("STORAGE_BACKEND", "local")
+os.environ.setdefault("LOCAL_STORAGE_DIR", f"{TEST_DIR}/media")
+os.environ.setdefault("UPLOAD_QUEUE_PATH", f"{TEST_DIR}/upload_queue.sqlite3")
+os.environ.setdefault("UPLOAD_SPOOL_DIR", f"{TEST_DIR}/upload_spool")
+os.environ.setdefault("SHARED_CACHE_PATH", f"{TEST_DIR}/shared_cache.sqlite3")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("ADMIN_EMAILS", "admin@example.com")
+
+import pytest
+from sqlalchemy import event
+
+TEST_LEGENDS = 300
+
+
+@pytest.fixture(scope="session")
+def seeded_db():
+    """
+    Base de datos SQLite con la jerarquia de db.sql y TEST_LEGENDS leyendas generadas con benchmarks.datagen.
+    """
+    from benchmarks.datagen import generate
+
+    return generate(os.environ["DATABASE_URL"], TEST_LEGENDS)
+
+
+@pytest.fixture(scope="session")
+def client(seeded_db):
+    """
+    Cliente de la aplicacion con su ciclo de vida iniciado y un usuario autenticado.
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        credentials = {"email": "tests@example.com", "password": "tests-password"}
+        response = test_client.post("/auth/register", json=credentials)
+        test_client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    """
+    Encabezados de un usuario incluido en ADMIN_EMAILS.
+    """
+    credentials = {"email": "admin@example.com", "password": "admin-password"}
+    response = client.post("/auth/register", json=credentials)
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def statement_counter():
+    """
+    Cuenta las sentencias SQL que el engine asincrono envia a la base de datos.
+    """
+    from app.core.db import async_engine
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,104 @@
+import asyncio
+import re
+import httpx
+from app.core.admission import AdmissionControlMiddleware, EndpointClass, admission_status
+from app.core.auth import create_access_token
+from app.core.shared_cache import InMemoryBroker
+
+
+def endpoint_class(client_rate=None, user_rate=None, max_concurrency: int = 10) -> EndpointClass:
+    return EndpointClass("test", (("POST", re.compile(r"^/limited$")),), client_rate, user_rate, max_concurrency)
+
+
+def admission(app, **kwargs) -> AdmissionControlMiddleware:
+    middleware = AdmissionControlMiddleware(app, endpoint_classes=(endpoint_class(**kwargs),), backend="memory")
+    middleware.backend = InMemoryBroker()
+    return middleware
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def asgi_client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def bearer(email: str, user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email, 'uid': user_id})}"}
+
+
+def test_exhausted_bucket_returns_429_with_retry_after():
+    async def run():
+        async with asgi_client(admission(ok_app, client_rate=(2, 0.1))) as client:
+            return [await client.post("/limited") for _ in range(3)]
+
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert int(responses[-1].headers["retry-after"]) >= 1
+
+
+def test_requests_over_max_concurrency_return_503():
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await ok_app(scope, receive, send)
+
+    middleware = admission(slow_app, max_concurrency=1)
+
+    async def run():
+        async with asgi_client(middleware) as client:
+            first = asyncio.create_task(client.post("/limited"))
+            while middleware.in_flight["test"] == 0:
+                await asyncio.sleep(0)
+            second = await client.post("/limited")
+            release.set()
+            return await first, second
+
+    first, second = asyncio.run(run())
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert second.headers["retry-after"] == "1"
+    assert middleware.in_flight["test"] == 0
+
+
+def test_non_matching_routes_pass_through():
+    async def run():
+        async with asgi_client(admission(ok_app, client_rate=(1, 0.1))) as client:
+            await client.post("/limited")
+            return [
+                await client.post("/limited"),
+                await client.get("/limited"),
+                await client.post("/other"),
+            ]
+
+    limited, get, other = asyncio.run(run())
+    assert limited.status_code == 429
+    assert get.status_code == 200
+    assert other.status_code == 200
+
+
+def test_user_bucket_is_keyed_on_the_token_uid():
+    async def run():
+        async with asgi_client(admission(ok_app, user_rate=(1, 0.1))) as client:
+            return [
+                await client.post("/limited", headers=bearer("first@example.com", 5)),
+                await client.post("/limited", headers=bearer("renamed@example.com", 5)),
+                await client.post("/limited", headers=bearer("first@example.com", 6)),
+            ]
+
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [200, 429, 200]
+
+
+def test_counters_belong_to_each_middleware_instance(client):
+    first, second = admission(ok_app), admission(ok_app)
+    first.in_flight["test"] += 1
+    assert second.in_flight["test"] == 0
+
+    assert isinstance(client.app.state.admission_control, AdmissionControlMiddleware)
+    status = admission_status(client.app)
+    assert set(status) == {"auth", "upload"}
+    assert all(values["in_flight"] == 0 for values in status.values())
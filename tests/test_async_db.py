@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import event
+from app.core.db import async_engine, engine
+
+LEGEND_FORM = {
+    "name": "Leyenda asincrona",
+    "description": "Creada por la prueba del engine asincrono",
+    "category_id": "1",
+    "legend_date": "2024-01-01T00:00:00",
+    "district_id": "1",
+}
+
+
+@pytest.fixture
+def sync_statements():
+    """
+    Cuenta las sentencias SQL que el engine sincrono envia a la base de datos.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_tests_run_on_aiosqlite():
+    assert async_engine.dialect.name == "sqlite"
+    assert async_engine.dialect.driver == "aiosqlite"
+
+
+def test_legend_round_trip_uses_only_the_async_engine(client, statement_counter, sync_statements):
+    response = client.post("/legends", data=LEGEND_FORM)
+    assert response.status_code == 201, response.text
+    legend_id = response.json()["id"]
+
+    assert client.get(f"/legends/{legend_id}").json()["name"] == LEGEND_FORM["name"]
+    updated = {**LEGEND_FORM, "name": "Leyenda asincrona editada"}
+    assert client.patch(f"/legends/{legend_id}", data=updated).status_code == 200
+    found = client.get("/legends/filters", params={"name": "asincrona editada"}).json()["items"]
+    assert [legend["id"] for legend in found] == [legend_id]
+    assert client.delete(f"/legends/{legend_id}").status_code == 200
+    assert client.get(f"/legends/{legend_id}").status_code == 404
+
+    assert statement_counter
+    assert sync_statements == []
@@ -0,0 +1,40 @@
+from sqlmodel import Session, select
+from app.core.db import engine
+from app.core.password_hashing import BCRYPT_ROUNDS, pwd_context
+from app.models.user_model import User
+
+
+def _user_statements(statements: list[str]) -> list[str]:
+    return [statement for statement in statements if "users" in statement]
+
+
+def test_duplicate_register_returns_409_after_a_single_insert(client, statement_counter):
+    credentials = {"email": "duplicate@example.com", "password": "duplicate-password"}
+    assert client.post("/auth/register", json=credentials).status_code == 201
+
+    statement_counter.clear()
+    response = client.post("/auth/register", json=credentials)
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == "email already registered"
+    statements = _user_statements(statement_counter)
+    assert len(statements) == 1, statements
+    assert statements[0].startswith("INSERT INTO users")
+
+
+def test_login_rehashes_a_password_with_an_old_bcrypt_cost(client):
+    old_hash = pwd_context.copy(bcrypt__rounds=BCRYPT_ROUNDS + 1).hash("rehash-password")
+    assert pwd_context.needs_update(old_hash)
+    with Session(engine) as session:
+        session.add(User(email="rehash@example.com", password=old_hash))
+        session.commit()
+
+    response = client.post("/auth/login", data={"username": "rehash@example.com", "password": "rehash-password"})
+    assert response.status_code == 200
+
+    with Session(engine) as session:
+        stored = session.exec(select(User.password).where(User.email == "rehash@example.com")).one()
+    assert pwd_context.identify(stored) == "bcrypt"
+    assert stored.split("$")[2] == f"{BCRYPT_ROUNDS:02d}"
+    assert pwd_context.verify("rehash-password", stored)
+    assert not pwd_context.needs_update(stored)
@@ -0,0 +1,76 @@
+import msgpack
+import orjson
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session
+from app.core.compact import COMPACT_JSON_MEDIA_TYPE, COMPACT_MSGPACK_MEDIA_TYPE, build_compact, decode_compact, encode_compact
+from app.core.db import engine
+from app.models.legend_model import Legend, LegendRead
+from app.services.legend_service import _legend_read_statement, _row_to_dict
+
+VARIANTS = {"320": {"url": "https://example.com/320.webp"}, "640": {"url": "https://example.com/640.webp"}}
+
+
+@pytest.fixture
+def rows(seeded_db):
+    """
+    Filas de la consulta de proyeccion de las primeras 50 leyendas, la primera con versiones de imagen. El cambio
+    no se confirma, solo lo ve la transaccion de la prueba.
+    """
+    with Session(engine) as session:
+        statement = _legend_read_statement().order_by(Legend.id).limit(50)
+        first_id = session.exec(statement).first().id
+        session.execute(update(Legend).where(Legend.id == first_id).values(image_variants=VARIANTS, image_status="ready"))
+        yield session.exec(statement).all()
+        session.rollback()
+
+
+def legend_reads(rows) -> list[dict]:
+    return [LegendRead.model_validate(_row_to_dict(row)).model_dump(mode="json") for row in rows]
+
+
+def test_decode_compact_rebuilds_the_legend_read_payload(rows):
+    decoded = decode_compact(build_compact(rows))
+
+    assert [LegendRead.model_validate(item).model_dump(mode="json") for item in decoded] == legend_reads(rows)
+    assert decoded[0]["srcset"] == {"320": "https://example.com/320.webp", "640": "https://example.com/640.webp"}
+
+
+def test_dictionaries_store_each_name_once(rows):
+    dictionaries = build_compact(rows)["dictionaries"]
+
+    for dictionary in dictionaries.values():
+        assert len(dictionary["id"]) == len(set(dictionary["id"]))
+    assert len(dictionaries["province"]["id"]) <= 7
+
+
+@pytest.mark.parametrize("media_type, loads", [
+    (COMPACT_JSON_MEDIA_TYPE, orjson.loads),
+    (COMPACT_MSGPACK_MEDIA_TYPE, msgpack.unpackb),
+])
+def test_encode_compact_round_trips(rows, media_type, loads):
+    document = loads(encode_compact(build_compact(rows, next_cursor="cursor"), media_type))
+
+    assert document["next_cursor"] == "cursor"
+    assert decode_compact(document) == legend_reads(rows)
+
+
+@pytest.mark.parametrize("media_type, loads", [
+    (COMPACT_JSON_MEDIA_TYPE, orjson.loads),
+    (COMPACT_MSGPACK_MEDIA_TYPE, msgpack.unpackb),
+])
+def test_empty_rows_round_trip(media_type, loads):
+    document = build_compact([])
+    assert document["count"] == 0
+    assert decode_compact(document) == []
+    assert decode_compact(loads(encode_compact(document, media_type))) == []
+
+
+def test_compact_route_matches_the_json_route(client):
+    params = {"limit": 30, "sort": "legend_date"}
+    items = client.get("/legends", params=params).json()["items"]
+
+    response = client.get("/legends", params=params, headers={"Accept": COMPACT_JSON_MEDIA_TYPE})
+
+    assert response.headers["content-type"].startswith(COMPACT_JSON_MEDIA_TYPE)
+    assert decode_compact(response.json()) == items
@@ -0,0 +1,47 @@
+from typing import Optional
+import pytest
+from sqlalchemy import func
+from sqlmodel import Session, select
+from app.core.db import engine
+from app.core.search_index import legend_search_index
+from app.models.canton_model import Canton
+from app.models.district_model import District
+from app.models.legend_model import Legend
+
+
+def group_by(column, ids: Optional[list[int]], category_id: Optional[int]) -> dict[int, int]:
+    statement = (
+        select(column, func.count())
+        .select_from(Legend)
+        .join(District, Legend.district_id == District.id)
+        .join(Canton, District.canton_id == Canton.id)
+        .group_by(column)
+    )
+    if ids is not None:
+        statement = statement.where(Legend.id.in_(ids))
+    if category_id is not None:
+        statement = statement.where(Legend.category_id == category_id)
+    with Session(engine) as session:
+        return {int(value): count for value, count in session.exec(statement).all()}
+
+
+@pytest.mark.parametrize("params", [{}, {"name": "llorona"}, {"category_id": 2}, {"name": "cadejos", "category_id": 2}])
+def test_facet_counts_match_a_plain_group_by(client, params):
+    response = client.get("/legends/facets", params=params)
+    assert response.status_code == 200
+    facets = response.json()
+
+    ids = list(legend_search_index.search(params["name"])) if "name" in params else None
+    category_id = params.get("category_id")
+    expected = {
+        "category": group_by(Legend.category_id, ids, category_id),
+        "province": group_by(Canton.province_id, ids, category_id),
+        "canton": group_by(Canton.id, ids, category_id),
+        "district": group_by(Legend.district_id, ids, category_id),
+    }
+    for dimension, counts in expected.items():
+        assert {item["id"]: item["count"] for item in facets[dimension]} == counts, dimension
+    years = group_by(func.extract("year", Legend.legend_date), ids, category_id)
+    assert {item["year"]: item["count"] for item in facets["year"]} == years
+    assert facets["total"] == sum(expected["category"].values())
+    assert facets["total"] > 0
@@ -0,0 +1,32 @@
+from datetime import date
+import pytest
+from sqlalchemy import text
+from app.core.db import engine
+from app.services.legend_service import _apply_filters, _apply_keyset, _legend_read_statement
+
+
+FILTER_INDEXES = [
+    ({"category_id": 1}, ["ix_legends_category_id_legend_date"]),
+    ({"legend_date_initial": date(2020, 1, 1), "legend_date_final": date(2020, 6, 30)}, ["ix_legends_legend_date_id"]),
+    ({"category_id": 1, "legend_date_initial": date(2020, 1, 1)}, ["ix_legends_category_id_legend_date"]),
+    ({"district_id": 3}, ["ix_legends_district_id_legend_date"]),
+    ({"canton_id": 2}, ["ix_districts_canton_id", "ix_legends_district_id_legend_date"]),
+    ({"province_id": 1}, ["ix_cantons_province_id", "ix_districts_canton_id", "ix_legends_district_id_legend_date"]),
+]
+
+
+def query_plan(statement) -> list[str]:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        return [row[3] for row in connection.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+
+@pytest.mark.parametrize("sort", ["id", "legend_date"])
+@pytest.mark.parametrize("filters, indexes", FILTER_INDEXES)
+def test_filters_use_indexes(seeded_db, filters, indexes, sort):
+    statement = _apply_keyset(_apply_filters(_legend_read_statement(), **filters), sort, "asc", None, 20)
+    plan = query_plan(statement)
+
+    assert not any(step.startswith("SCAN legends") for step in plan), plan
+    for index in indexes:
+        assert any(f"USING INDEX {index} " in step for step in plan), (index, plan)
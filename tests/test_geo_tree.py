@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def geo_etag(client):
+    response = client.get("/geo/tree")
+    assert response.status_code == 200
+    return response.headers["etag"]
+
+
+@pytest.mark.parametrize("header", [
+    "{etag}",
+    "W/{etag}",
+    '"other", {etag}',
+    '"other",W/{etag}',
+    "*",
+])
+def test_geo_tree_if_none_match_returns_304(client, geo_etag, header):
+    response = client.get("/geo/tree", headers={"If-None-Match": header.format(etag=geo_etag)})
+    assert response.status_code == 304
+    assert response.headers["etag"] == geo_etag
+
+
+def test_geo_tree_with_stale_etag_returns_tree(client, geo_etag):
+    response = client.get("/geo/tree", headers={"If-None-Match": '"stale", W/"older"'})
+    assert response.status_code == 200
+    assert response.json()
+
+
+def test_geo_refresh_requires_admin(client, admin_headers):
+    assert client.post("/geo/refresh").status_code == 403
+
+    response = client.post("/geo/refresh", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["provinces"] == 7
@@ -0,0 +1,65 @@
+import socket
+import httpx
+import pytest
+from app.core import uploads
+from app.core.uploads import UploadRejectedError, spool_url
+
+
+PUBLIC_ADDRESS = "93.184.216.34"
+
+
+@pytest.fixture
+def public_dns(monkeypatch):
+    resolve = socket.getaddrinfo
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host.endswith("example.com"):
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (PUBLIC_ADDRESS, port))]
+        return resolve(host, port, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+
+
+@pytest.mark.parametrize("url", [
+    "file:///etc/passwd",
+    "ftp://example.com/image.png",
+    "http://127.0.0.1/image.png",
+    "http://localhost/image.png",
+    "http://0.0.0.0/image.png",
+    "http://10.0.0.5/image.png",
+    "http://192.168.1.10/image.png",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/image.png",
+    "http://[::ffff:127.0.0.1]/image.png",
+])
+def test_spool_url_rejects_non_public_urls(url):
+    with pytest.raises(UploadRejectedError):
+        spool_url(url)
+
+
+def test_redirects_are_checked_and_connections_pinned(public_dns):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append((request.url.host, request.headers["host"], request.extensions.get("sni_hostname")))
+        if request.headers["host"] == "a.example.com":
+            return httpx.Response(302, headers={"location": "https://b.example.com/image.png"})
+        return httpx.Response(301, headers={"location": "http://169.254.169.254/latest/meta-data/"})
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(UploadRejectedError, match="non-public"):
+            uploads._open_image_url(client, "http://a.example.com/image.png")
+
+    assert requests == [
+        (PUBLIC_ADDRESS, "a.example.com", "a.example.com"),
+        (PUBLIC_ADDRESS, "b.example.com", "b.example.com"),
+    ]
+
+
+def test_redirect_loops_are_bounded(public_dns):
+    def handler(request: httpx.Request):
+        return httpx.Response(302, headers={"location": "/again"})
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        with pytest.raises(UploadRejectedError, match="too many"):
+            uploads._open_image_url(client, "http://a.example.com/image.png")
@@ -0,0 +1,42 @@
+from app.core.pagination import MAX_PAGE_SIZE
+
+MISSING_ID = 10_000_000
+
+
+def test_batch_keeps_the_callers_order(client, statement_counter):
+    ids = [42, 7, 150, 3, 99]
+
+    statement_counter.clear()
+    response = client.post("/legends/batch", json={"ids": ids})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [legend["id"] for legend in body["items"]] == ids
+    assert body["missing"] == []
+    legend_statements = [statement for statement in statement_counter if "FROM legends" in statement]
+    assert len(legend_statements) == 1, legend_statements
+
+
+def test_batch_matches_the_detail_route(client):
+    response = client.post("/legends/batch", json={"ids": [12, 5]})
+
+    assert response.json()["items"] == [client.get("/legends/12").json(), client.get("/legends/5").json()]
+
+
+def test_batch_drops_duplicate_ids(client):
+    response = client.post("/legends/batch", json={"ids": [8, 2, 8, 2, 8]})
+
+    assert [legend["id"] for legend in response.json()["items"]] == [8, 2]
+
+
+def test_batch_reports_missing_ids(client):
+    response = client.post("/legends/batch", json={"ids": [MISSING_ID, 4, MISSING_ID + 1, MISSING_ID]})
+
+    body = response.json()
+    assert [legend["id"] for legend in body["items"]] == [4]
+    assert body["missing"] == [MISSING_ID, MISSING_ID + 1]
+
+
+def test_batch_rejects_empty_and_oversized_requests(client):
+    assert client.post("/legends/batch", json={"ids": []}).status_code == 422
+    assert client.post("/legends/batch", json={"ids": list(range(1, MAX_PAGE_SIZE + 2))}).status_code == 422
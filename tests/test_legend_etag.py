@@ -0,0 +1,42 @@
+from datetime import datetime
+import app.services.legend_service as legend_service
+
+LEGEND_ID = 7
+
+
+def _form(legend: dict) -> dict:
+    return {
+        "name": legend["name"],
+        "description": legend["description"],
+        "category_id": legend["category_id"],
+        "legend_date": legend["legend_date"],
+        "district_id": legend["district_id"],
+    }
+
+
+def test_unchanged_legend_returns_304(client):
+    response = client.get(f"/legends/{LEGEND_ID}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get(f"/legends/{LEGEND_ID}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_patch_in_the_same_second_changes_etag(client, monkeypatch):
+    # DATETIME de MySQL guarda segundos enteros: se fija la fecha para que dos escrituras la compartan.
+    monkeypatch.setattr(legend_service, "utcnow", lambda: datetime(2024, 1, 1, 12, 0, 0))
+    legend = client.get(f"/legends/{LEGEND_ID}").json()
+    assert client.patch(f"/legends/{LEGEND_ID}", data=_form(legend)).status_code == 200
+    etag = client.get(f"/legends/{LEGEND_ID}").headers["etag"]
+
+    updated = {**legend, "description": legend["description"] + " (editada)"}
+    assert client.patch(f"/legends/{LEGEND_ID}", data=_form(updated)).status_code == 200
+
+    response = client.get(f"/legends/{LEGEND_ID}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["description"] == updated["description"]
+
+    assert client.patch(f"/legends/{LEGEND_ID}", data=_form(legend)).status_code == 200
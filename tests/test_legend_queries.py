@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.mark.parametrize("sort", ["id", "legend_date", "name"])
+def test_legend_page_statements_do_not_grow_with_page_size(client, statement_counter, sort):
+    client.get("/legends", params={"limit": 1, "sort": sort})
+
+    counts = {}
+    for limit in (1, 10, 100):
+        statement_counter.clear()
+        response = client.get("/legends", params={"limit": limit, "sort": sort})
+        assert response.status_code == 200
+        assert len(response.json()["items"]) == limit
+        counts[limit] = len(statement_counter)
+
+    assert len(set(counts.values())) == 1, counts
+    assert counts[1] <= 2, statement_counter
+
+
+def test_next_page_uses_same_statement_count(client, statement_counter):
+    first = client.get("/legends", params={"limit": 50}).json()
+    statement_counter.clear()
+    response = client.get("/legends", params={"limit": 50, "cursor": first["next_cursor"]})
+    assert response.status_code == 200
+    assert len(statement_counter) <= 2, statement_counter
@@ -0,0 +1,26 @@
+from app.routes import metrics_route
+
+NO_AUTHORIZATION = {"Authorization": ""}
+
+
+def test_metrics_reject_unauthenticated_requests(client):
+    response = client.get("/metrics", headers=NO_AUTHORIZATION)
+
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+
+def test_metrics_without_token_require_an_admin(client, admin_headers):
+    assert client.get("/metrics").status_code == 403
+
+    response = client.get("/metrics", headers=admin_headers)
+    assert response.status_code == 200
+    assert "http_requests_admitted_in_flight" in response.text
+
+
+def test_metrics_token_replaces_the_admin_check(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "metrics-secret")
+
+    assert client.get("/metrics", headers=NO_AUTHORIZATION).status_code == 401
+    assert client.get("/metrics", headers=admin_headers).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer metrics-secret"}).status_code == 200
@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+import pytest
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def raw_cursor(*parts) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(parts)).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("sort, value", [
+    ("id", 10),
+    ("name", "La llorona"),
+    ("legend_date", datetime(2024, 1, 1, 12, 30)),
+    ("relevance", 2.5),
+    ("relevance", 3),
+])
+def test_cursor_round_trip(sort, value):
+    assert decode_cursor(encode_cursor(sort, "asc", value, 7), sort, "asc") == (value, 7)
+
+
+@pytest.mark.parametrize("sort, value, last_id", [
+    ("relevance", "abc", 1),
+    ("relevance", None, 1),
+    ("relevance", True, 1),
+    ("relevance", [1], 1),
+    ("id", "10", 1),
+    ("id", 1.5, 1),
+    ("name", 5, 1),
+    ("legend_date", 20240101, 1),
+    ("legend_date", "not a date", 1),
+    ("id", 10, "1"),
+    ("id", 10, True),
+])
+def test_cursor_with_wrong_value_type_is_rejected(sort, value, last_id):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(raw_cursor(sort, "asc", value, last_id), sort, "asc")
+
+
+def test_relevance_cursor_with_text_value_returns_400(client):
+    response = client.get(
+        "/legends/filters", params={"name": "leyenda", "sort": "relevance", "cursor": raw_cursor("relevance", "asc", "abc", 1)}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.requests import Request
+from app.core.replicas import ReplicaRouter, WriteTrackingSession
+from app.models.user_model import User
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """
+    Dos archivos SQLite que hacen de base principal y de replica, la replica no recibe las escrituras.
+    """
+    engines = {}
+    for name in ("primary", "replica"):
+        path = tmp_path / f"{name}.db"
+        sync_engine = create_engine(f"sqlite:///{path}")
+        User.__table__.create(sync_engine)
+        sync_engine.dispose()
+        engines[name] = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield engines
+    for engine in engines.values():
+        asyncio.run(engine.dispose())
+
+
+def make_request(method: str, token: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": "/legends",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+        "client": ("203.0.113.5", 1234),
+    })
+
+
+async def handle(router: ReplicaRouter, request: Request, work) -> str:
+    """
+    Reproduce get_async_session: abre la sesion en el engine elegido, ejecuta la peticion y registra la escritura.
+    """
+    bind = await router.engine_for(request)
+    maker = async_sessionmaker(bind, class_=AsyncSession, sync_session_class=WriteTrackingSession, expire_on_commit=False)
+    async with maker() as session:
+        await work(session)
+    await router.record_write(request, session)
+    return "primary" if bind is router.primary else "replica"
+
+
+async def read_users(session):
+    await session.exec(select(User))
+
+
+async def login(session):
+    await session.exec(select(User))
+    await session.commit()
+
+
+async def create_user(session):
+    session.add(User(email="new@example.com", password="hash"))
+    await session.commit()
+
+
+async def rolled_back_user(session):
+    session.add(User(email="rolled@example.com", password="hash"))
+    await session.flush()
+    await session.rollback()
+
+
+def test_reads_go_to_replica_and_writes_to_primary(databases):
+    router = ReplicaRouter(databases["primary"], [databases["replica"]], sticky_seconds=5)
+
+    async def scenario():
+        assert await handle(router, make_request("GET", "reader"), read_users) == "replica"
+        assert await handle(router, make_request("POST", "reader"), create_user) == "primary"
+
+    asyncio.run(scenario())
+
+
+def test_reads_after_write_stick_to_primary_for_the_author_only(databases):
+    router = ReplicaRouter(databases["primary"], [databases["replica"]], sticky_seconds=5)
+
+    async def scenario():
+        await handle(router, make_request("POST", "author"), create_user)
+        assert await handle(router, make_request("GET", "author"), read_users) == "primary"
+        assert await handle(router, make_request("GET", "someone-else"), read_users) == "replica"
+
+        async with AsyncSession(databases["replica"]) as replica:
+            assert (await replica.exec(select(User))).all() == []
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("work", [login, rolled_back_user])
+def test_requests_without_committed_writes_do_not_stick(databases, work):
+    router = ReplicaRouter(databases["primary"], [databases["replica"]], sticky_seconds=5)
+    token = f"no-write-{work.__name__}"
+
+    async def scenario():
+        assert await handle(router, make_request("POST", token), work) == "primary"
+        assert await handle(router, make_request("GET", token), read_users) == "replica"
+
+    asyncio.run(scenario())
+
+
+def test_least_connections_prefers_idle_replica(databases):
+    second = create_async_engine(str(databases["replica"].url))
+    router = ReplicaRouter(databases["primary"], [databases["replica"], second], strategy="least_connections")
+
+    async def scenario():
+        async with databases["replica"].connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+            assert {router.choose_replica() for _ in range(4)} == {second}
+        await second.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,79 @@
+import csv
+import io
+import re
+import pytest
+from sqlmodel import Session, select
+from app.core.db import engine
+from app.core.search_index import LegendSearchIndex, legend_search_index
+from app.models.legend_model import Legend
+
+PLACEHOLDER_RE = re.compile(r"\?")
+
+
+def ranked_ids(scores: dict[int, float]) -> list[int]:
+    return [legend_id for legend_id, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def largest_parameter_list(statements: list[str]) -> int:
+    return max((len(PLACEHOLDER_RE.findall(statement)) for statement in statements), default=0)
+
+
+def test_short_last_term_is_not_expanded_as_prefix():
+    index = LegendSearchIndex()
+    index.add(1, "La llorona", "")
+    index.add(2, "Laguna encantada", "")
+    index.add(3, "Camino real", "")
+
+    assert set(index.search("la")) == {1}
+    assert set(index.search("lag")) == {2}
+    assert set(index.search("cam")) == {3}
+
+
+def test_filters_join_search_hits_instead_of_in_list(client, statement_counter):
+    scores = legend_search_index.search("la")
+    assert len(scores) > 20
+
+    statement_counter.clear()
+    response = client.get("/legends/filters", params={"name": "la", "sort": "id", "limit": 20})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == sorted(scores)[:20]
+    assert any("search_hits" in statement for statement in statement_counter)
+    assert largest_parameter_list(statement_counter) < 10, statement_counter
+
+
+@pytest.mark.parametrize("params", [{}, {"category_id": 2}])
+def test_relevance_page_queries_only_ranked_ids(client, statement_counter, params):
+    scores = legend_search_index.search("la")
+    expected = ranked_ids(scores)
+    if params:
+        with Session(engine) as session:
+            in_category = set(session.exec(select(Legend.id).where(Legend.category_id == params["category_id"])).all())
+        expected = [legend_id for legend_id in expected if legend_id in in_category]
+
+    statement_counter.clear()
+    ids, cursor = [], None
+    for _ in range(2):
+        page = client.get("/legends/filters", params={"name": "la", "limit": 10, "cursor": cursor, **params}).json()
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert ids == expected[:20]
+    # Sin otros filtros cada pagina consulta solo sus limit + 1 ids; con filtros los tramos crecen sin llegar al total.
+    bound = 11 + 2 if not params else len(scores)
+    assert largest_parameter_list(statement_counter) < bound, statement_counter
+
+
+def test_facets_and_export_with_name_match_the_search(client, statement_counter):
+    scores = legend_search_index.search("la")
+
+    statement_counter.clear()
+    facets = client.get("/legends/facets", params={"name": "la"}).json()
+    assert facets["total"] == len(scores)
+    assert largest_parameter_list(statement_counter) < 10, statement_counter
+
+    response = client.get("/legends/export", params={"name": "la"})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert sorted(int(row["id"]) for row in rows) == sorted(scores)
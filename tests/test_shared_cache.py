@@ -0,0 +1,99 @@
+import sys
+import threading
+import pytest
+from sqlmodel import Session, select
+from app.core.db import engine
+from app.core.reference_cache import get_reference_data, refresh_reference_cache
+from app.core.search_index import legend_search_index
+from app.core.shared_cache import INVALIDATION_CHANNEL, InMemoryBroker, InvalidationBus, RedisCacheBackend, SQLiteCacheBackend
+from app.models.category_model import Category
+from app.models.legend_model import Legend
+import app.services.geo_service  # noqa: F401, registra el manejador de "reference"
+import app.services.legend_service  # noqa: F401, registra el manejador de "legends"
+
+
+def test_redis_backend_without_package_fails_with_clear_error(monkeypatch):
+    monkeypatch.setitem(sys.modules, "redis", None)
+    with pytest.raises(RuntimeError, match="pip install redis"):
+        RedisCacheBackend("redis://localhost:6379/0")
+
+
+@pytest.fixture
+def workers():
+    broker = InMemoryBroker()
+    buses = InvalidationBus(broker, worker="worker-a"), InvalidationBus(broker, worker="worker-b")
+    for bus in buses:
+        bus.start()
+    yield buses
+    for bus in buses:
+        bus.stop()
+
+
+def test_legend_write_updates_the_other_workers_search_index(seeded_db, workers):
+    writer, _ = workers
+    with Session(engine) as session:
+        legend = session.exec(select(Legend).order_by(Legend.id)).first()
+    legend_search_index.remove(legend.id)
+    assert legend.id not in legend_search_index.search(legend.name)
+
+    writer.publish(Legend.__tablename__, ids=[legend.id])
+
+    assert legend.id in legend_search_index.search(legend.name)
+
+
+def test_reference_refresh_reloads_the_other_workers_cache(seeded_db, workers):
+    writer, _ = workers
+    with Session(engine) as session:
+        refresh_reference_cache(session)
+        category = Category(name="Categoria nueva")
+        session.add(category)
+        session.commit()
+        session.refresh(category)
+        assert category.id not in get_reference_data(session).categories_by_id
+        try:
+            writer.publish("reference", etag="new")
+            assert category.id in get_reference_data(session).categories_by_id
+        finally:
+            session.delete(category)
+            session.commit()
+            refresh_reference_cache(session)
+
+
+def test_bus_ignores_its_own_messages():
+    received = []
+    broker = InMemoryBroker()
+    handlers = {"legends": [received.append]}
+    own = InvalidationBus(broker, worker="worker-a", handlers=handlers)
+    other = InvalidationBus(broker, worker="worker-b", handlers={})
+    own.start()
+    try:
+        own.publish("legends", ids=[1])
+        assert received == []
+        other.publish("legends", ids=[2])
+        assert [message["ids"] for message in received] == [[2]]
+    finally:
+        own.stop()
+
+
+def test_sqlite_backend_shares_values_and_messages_between_instances(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    publisher, subscriber = SQLiteCacheBackend(path, poll_seconds=0.02), SQLiteCacheBackend(path, poll_seconds=0.02)
+
+    publisher.set("key", b"value", 60)
+    assert subscriber.get("key") == b"value"
+
+    received = []
+    delivered = threading.Event()
+
+    def callback(message: bytes):
+        received.append(message)
+        delivered.set()
+
+    unsubscribe = subscriber.subscribe(INVALIDATION_CHANNEL, callback)
+    try:
+        publisher.publish("other-channel", b"ignored")
+        publisher.publish(INVALIDATION_CHANNEL, b"message")
+        assert delivered.wait(timeout=5)
+    finally:
+        unsubscribe()
+    assert received == [b"message"]
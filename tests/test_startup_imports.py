@@ -0,0 +1,21 @@
+import json
+import os
+import subprocess
+import sys
+
+
+LAZY_MODULES = ("cloudinary", "PIL", "httpx", "redis", "msgpack")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_import_does_not_load_heavy_modules():
+    script = (
+        "import json, sys\n"
+        "import app.main\n"
+        f"print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=os.environ.copy(), capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,24 @@
+import asyncio
+import pytest
+from app.services import legend_service
+
+
+async def _failing_rows(statement, batch_size, scores=None):
+    yield ["first batch"]
+    raise RuntimeError("connection lost")
+
+
+async def _consume(iterator):
+    return [batch async for batch in iterator]
+
+
+def test_stream_legend_rows_propagates_errors(monkeypatch):
+    monkeypatch.setattr(legend_service, "_stream_rows", _failing_rows)
+    with pytest.raises(RuntimeError, match="connection lost"):
+        asyncio.run(_consume(legend_service.stream_legend_rows()))
+
+
+def test_export_legends_propagates_errors(monkeypatch):
+    monkeypatch.setattr(legend_service, "_stream_rows", _failing_rows)
+    with pytest.raises(RuntimeError, match="connection lost"):
+        asyncio.run(_consume(legend_service.export_legends(category_id=1)))
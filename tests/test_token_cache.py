@@ -0,0 +1,37 @@
+from sqlmodel import Session
+from app.core.db import engine
+from app.core.token_cache import token_cache
+from app.models.user_model import User
+
+
+def _user_selects(statements: list[str]) -> list[str]:
+    return [statement for statement in statements if "FROM users" in statement]
+
+
+def test_second_request_is_served_from_the_token_cache(client, statement_counter):
+    response = client.post("/auth/register", json={"email": "cached@example.com", "password": "cached-password"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    statement_counter.clear()
+    assert client.get("/provinces", headers=headers).status_code == 200
+    assert len(_user_selects(statement_counter)) == 1
+
+    statement_counter.clear()
+    assert client.get("/provinces", headers=headers).status_code == 200
+    assert _user_selects(statement_counter) == []
+
+
+def test_deleting_the_user_drops_its_cached_tokens(client):
+    response = client.post("/auth/register", json={"email": "deleted@example.com", "password": "deleted-password"})
+    token = response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/provinces", headers=headers).status_code == 200
+    user = token_cache.get(token)
+    assert user is not None
+
+    with Session(engine) as session:
+        session.delete(session.get(User, user.id))
+        session.commit()
+
+    assert token_cache.get(token) is None
+    assert client.get("/provinces", headers=headers).status_code == 401
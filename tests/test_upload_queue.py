@@ -0,0 +1,90 @@
+import io
+import time
+import pytest
+from PIL import Image
+from app.core import upload_queue
+from app.core.upload_queue import UPLOAD_MAX_ATTEMPTS, UploadQueue, UploadWorkerPool
+from app.services import image_service
+from app.services.image_service import IMAGE_FAILED, IMAGE_PENDING, IMAGE_READY, get_image_workers
+
+LEGEND_FORM = {
+    "name": "Leyenda en la cola",
+    "description": "Imagen cargada por la cola",
+    "category_id": "1",
+    "legend_date": "2024-01-01T00:00:00",
+    "district_id": "1",
+}
+
+
+def png_image() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (120, 80, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def workers(client):
+    """
+    Detiene los hilos de la cola de imagenes para ejecutar sus trabajos en la prueba con run_pending.
+    """
+    pool = get_image_workers()
+    pool.stop()
+    pool.run_pending()
+    yield pool
+    pool.start()
+
+
+def create_legend_with_image(client) -> dict:
+    response = client.post("/legends", data=LEGEND_FORM, files={"image_file": ("image.png", png_image(), "image/png")})
+    assert response.status_code == 202, response.text
+    assert response.json()["image_status"] == IMAGE_PENDING
+    return response.json()
+
+
+def test_queued_upload_becomes_ready_with_local_storage(client, workers):
+    legend = create_legend_with_image(client)
+
+    assert workers.run_pending() >= 1
+
+    status = client.get(f"/legends/{legend['id']}/image").json()
+    assert status["image_status"] == IMAGE_READY
+    assert status["image_url"].startswith("/media/")
+    assert client.delete(f"/legends/{legend['id']}").status_code == 200
+    workers.run_pending()
+
+
+def test_upload_failing_max_attempts_marks_image_failed(client, workers, monkeypatch):
+    class BrokenStorage:
+        def upload(self, path, folder):
+            raise ConnectionError("storage unavailable")
+
+        def delete(self, public_id):
+            return True
+
+    monkeypatch.setattr(image_service, "get_storage", lambda: BrokenStorage())
+    monkeypatch.setattr(upload_queue, "retry_delay", lambda attempts: 0)
+    legend = create_legend_with_image(client)
+
+    assert workers.run_pending() == UPLOAD_MAX_ATTEMPTS
+
+    assert client.get(f"/legends/{legend['id']}/image").json()["image_status"] == IMAGE_FAILED
+    assert client.delete(f"/legends/{legend['id']}").status_code == 200
+
+
+def test_prune_removes_only_old_finished_jobs(tmp_path):
+    queue = UploadQueue(str(tmp_path / "queue.sqlite3"))
+    pool = UploadWorkerPool(queue, handlers={"ok": lambda job: None}, workers=0)
+    done = queue.enqueue("ok", 1, {})
+    queue.enqueue("unknown", 2, {})
+    queued = queue.enqueue("ok", 3, {})
+    assert queue.claim().id == done
+    queue.complete(done)
+    pool._execute(queue.claim())
+    assert queue.counts() == {"done": 1, "failed": 1, "queued": 1}
+
+    assert pool.prune() == 0
+    assert queue.prune(done_before=time.time() + 1, failed_before=0) == 1
+    assert queue.counts() == {"failed": 1, "queued": 1}
+    assert queue.prune(done_before=0, failed_before=time.time() + 1) == 1
+    assert queue.counts() == {"queued": 1}
+    assert queue.claim().id == queued
@@ -0,0 +1,191 @@
+import asyncio
+import struct
+import tracemalloc
+import zlib
+import pytest
+from starlette.datastructures import UploadFile
+from app.core.uploads import (
+    MAX_UPLOAD_BYTES,
+    UPLOAD_CHUNK_SIZE,
+    UnsupportedUploadError,
+    UploadRejectedError,
+    UploadSizeLimitMiddleware,
+    UploadTooLargeError,
+    discard_spooled,
+    spool_upload,
+)
+
+
+def png_header(width: int, height: int) -> bytes:
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def write_payload(path, size: int, width: int = 100, height: int = 100) -> str:
+    header = png_header(width, height)
+    with open(path, "wb") as file:
+        file.write(header)
+        remaining = size - len(header)
+        block = b"\0" * UPLOAD_CHUNK_SIZE
+        while remaining > 0:
+            file.write(block[:remaining])
+            remaining -= len(block)
+    return str(path)
+
+
+def spool(path: str, **kwargs) -> str:
+    async def run():
+        with open(path, "rb") as file:
+            return await spool_upload(UploadFile(file=file, filename="image.png"), **kwargs)
+    return asyncio.run(run())
+
+
+def test_spool_upload_memory_stays_near_chunk_size(tmp_path):
+    size = 64 * UPLOAD_CHUNK_SIZE
+    path = write_payload(tmp_path / "large.png", size)
+
+    tracemalloc.start()
+    try:
+        spooled = spool(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    try:
+        with open(spooled, "rb") as file:
+            assert len(file.read()) == size
+    finally:
+        discard_spooled(spooled)
+    assert peak < 4 * UPLOAD_CHUNK_SIZE, f"peak {peak} bytes for a {size} bytes upload"
+
+
+def test_spool_upload_rejects_oversized_files(tmp_path):
+    path = write_payload(tmp_path / "large.png", 8 * UPLOAD_CHUNK_SIZE)
+    with pytest.raises(UploadTooLargeError) as error:
+        spool(path, max_bytes=4 * UPLOAD_CHUNK_SIZE)
+    assert error.value.status_code == 413
+
+
+def test_spool_upload_rejects_non_images(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not an image " * 1000)
+    with pytest.raises(UnsupportedUploadError) as error:
+        spool(str(path))
+    assert error.value.status_code == 415
+
+
+def test_spool_upload_rejects_oversized_dimensions(tmp_path):
+    path = write_payload(tmp_path / "huge.png", 1024, width=20000, height=20000)
+    with pytest.raises(UploadRejectedError) as error:
+        spool(path)
+    assert type(error.value) is UploadRejectedError
+    assert error.value.status_code == 422
+
+
+LEGEND_FORM = {
+    "name": "Leyenda con imagen",
+    "description": "Descripcion de prueba",
+    "category_id": "1",
+    "legend_date": "2024-01-01T00:00:00",
+    "district_id": "1",
+}
+
+
+@pytest.mark.parametrize("content, expected", [
+    (b"not an image " * 100, 415),
+    (png_header(20000, 20000), 422),
+])
+def test_create_legend_rejects_invalid_images(client, content, expected):
+    response = client.post("/legends", data=LEGEND_FORM, files={"image_file": ("image.png", content, "image/png")})
+    assert response.status_code == expected, response.text
+
+
+def test_create_legend_rejects_bodies_over_the_limit(client):
+    content = b"\0" * (MAX_UPLOAD_BYTES + 128 * 1024)
+    response = client.post("/legends", data=LEGEND_FORM, files={"image_file": ("image.png", content, "image/png")})
+    assert response.status_code == 413
+
+
+def chunked_form(form: dict, content: bytes, boundary: str = "legends-boundary"):
+    fields = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode()
+        for key, value in form.items()
+    )
+    file_header = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="image_file"; filename="image.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode()
+
+    def body():
+        yield fields + file_header
+        for start in range(0, len(content), UPLOAD_CHUNK_SIZE):
+            yield content[start:start + UPLOAD_CHUNK_SIZE]
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    return body(), {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def test_create_legend_rejects_chunked_bodies_over_the_limit(client):
+    body, headers = chunked_form(LEGEND_FORM, b"\0" * (MAX_UPLOAD_BYTES + 128 * 1024))
+    response = client.post("/legends", content=body, headers=headers)
+    assert response.status_code == 413, response.text
+    assert response.json() == {"detail": "Request body too large"}
+
+
+def run_middleware(app, chunks: list[bytes]) -> list[dict]:
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": [(b"content-type", b"multipart/form-data; boundary=x")]}
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages[-1]["more_body"] = False
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(UploadSizeLimitMiddleware(app, max_bytes=10)(scope, receive, send))
+    return sent
+
+
+async def read_body(receive):
+    while (await receive()).get("more_body"):
+        pass
+
+
+async def respond(send, status_code: int):
+    await send({"type": "http.response.start", "status": status_code, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def test_middleware_answers_413_when_the_limit_error_propagates():
+    async def app(scope, receive, send):
+        await read_body(receive)
+        await respond(send, 201)
+
+    sent = run_middleware(app, [b"12345", b"67890", b"abc"])
+    assert sent[0]["status"] == 413
+
+
+def test_middleware_replaces_the_response_to_the_limit_error():
+    async def app(scope, receive, send):
+        try:
+            await read_body(receive)
+        except Exception:
+            await respond(send, 400)
+            return
+        await respond(send, 201)
+
+    sent = run_middleware(app, [b"12345", b"67890", b"abc"])
+    assert [message.get("status") for message in sent if message["type"] == "http.response.start"] == [413]
+    assert sent[-1]["body"] == b'{"detail":"Request body too large"}'
+
+
+def test_middleware_passes_bodies_within_the_limit():
+    async def app(scope, receive, send):
+        await read_body(receive)
+        await respond(send, 201)
+
+    sent = run_middleware(app, [b"12345", b"678"])
+    assert sent[0]["status"] == 201